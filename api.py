@@ -146,16 +146,7 @@ async def get_all_sessions_endpoint():
         list: List of session information.
     """
     try:
-        sessions = await get_all_sessions()
-        session_info = []
-        for state in sessions:
-            session_info.append({
-                "session_id": state.session_id,
-                "current_stage": state.current_stage,
-                "created_at": state.created_at,
-                "last_updated": state.last_updated
-            })
-        return session_info
+        return await get_all_sessions()
     except Exception as e:
         print(f"Error getting sessions: {str(e)}")
         import traceback
@@ -0,0 +1,316 @@
+"""
+Completion cache for LLM generations: a bounded in-memory TTL layer in front
+of a persistent on-disk store.
+
+The on-disk store is authoritative: the in-memory layer only holds read-through
+copies of it (kept for at most MEMORY_CACHE_TTL), and the SemanticCache in
+src.LLMS.google_llm sits underneath both and only sees prompts that missed here.
+Only deterministic generations (extraction, or temperature at most
+PERSIST_MAX_TEMPERATURE) are persisted; disk entries expire after DISK_CACHE_TTL
+and the store is pruned to DISK_CACHE_MAX_BYTES, oldest first.
+
+Reads are skipped inside src.LLMS.google_llm.bypass_llm_cache, which feedback
+re-runs use so a rejected stage is sampled afresh, and SDLC_LLM_CACHE=off
+bypasses this module's layers entirely.
+"""
+import os
+import time
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+from src.LLMS.google_llm import cache_bypassed
+from src.LLMS.generate import (
+    generate_with_langchain, agenerate_with_langchain, agenerate_many,
+    generate_json_with_langchain, agenerate_json_with_langchain
+)
+
+# Directory holding cached generations, sharded by the first two key characters
+CACHE_DIR = Path("~/.sdlc_cache").expanduser()
+
+# Cache bucket for extraction-model generations, used in place of a temperature
+EXTRACTION_BUCKET = "extraction"
+
+# Sampled generations above this temperature are never written to disk
+PERSIST_MAX_TEMPERATURE = 0.2
+
+# Persistent entries older than this many seconds are treated as misses and removed
+DISK_CACHE_TTL = 7 * 24 * 3600
+
+# Maximum total size of the on-disk store, and how many writes happen between prunes
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DISK_CACHE_PRUNE_INTERVAL = 64
+
+# In-memory completion cache size and entry lifetime in seconds
+MEMORY_CACHE_SIZE = 512
+MEMORY_CACHE_TTL = 3600
+
+_memory_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+# Writes since the on-disk store was last pruned; the first write prunes
+_writes_since_prune = DISK_CACHE_PRUNE_INTERVAL
+_prune_lock = threading.Lock()
+
+def _cache_enabled() -> bool:
+    """Check whether the completion cache is enabled (SDLC_LLM_CACHE is not "off")."""
+    return os.environ.get("SDLC_LLM_CACHE", "on").lower() not in ("off", "0", "false")
+
+def _persistable(temperature: Union[float, str]) -> bool:
+    """Check whether generations for a temperature or bucket are deterministic enough to persist."""
+    return temperature == EXTRACTION_BUCKET or temperature <= PERSIST_MAX_TEMPERATURE
+
+def _cache_key(prompt: str, temperature: Union[float, str]) -> str:
+    """Get the cache key for a prompt and temperature."""
+    return hashlib.blake2b(f"{temperature}\0{prompt}".encode(), digest_size=16).hexdigest()
+
+def _cache_path(key: str) -> Path:
+    """Get the cache file path for a key."""
+    return CACHE_DIR / key[:2] / key
+
+def _remember(key: str, output: str) -> None:
+    """Store an output in the in-memory cache, evicting the least recently used entry."""
+    with _memory_lock:
+        _memory_cache[key] = (time.monotonic() + MEMORY_CACHE_TTL, output)
+        _memory_cache.move_to_end(key)
+        if len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+def _recall(key: str) -> Optional[str]:
+    """Get an unexpired output from the in-memory cache."""
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _memory_cache[key]
+            return None
+        _memory_cache.move_to_end(key)
+        return entry[1]
+
+def _prune_disk_cache() -> None:
+    """Remove expired entries from the on-disk store, then the oldest until it fits its size cap."""
+    cutoff = time.time() - DISK_CACHE_TTL
+    entries = []
+    total = 0
+    for path in CACHE_DIR.glob("*/*"):
+        try:
+            stat = path.stat()
+            if stat.st_mtime < cutoff:
+                path.unlink()
+                continue
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    
+    entries.sort()
+    for _, size, path in entries:
+        if total <= DISK_CACHE_MAX_BYTES:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            continue
+
+def read_cached(prompt: str, temperature: Union[float, str]) -> Optional[str]:
+    """
+    Read a cached generation, from memory first and then from disk.
+    
+    Args:
+        prompt (str): The prompt.
+        temperature (Union[float, str]): The temperature for generation, or a cache bucket name.
+        
+    Returns:
+        Optional[str]: The cached output, or None on a miss or when the cache is bypassed.
+    """
+    if not _cache_enabled() or cache_bypassed():
+        return None
+    
+    key = _cache_key(prompt, temperature)
+    output = _recall(key)
+    if output is not None or not _persistable(temperature):
+        return output
+    
+    path = _cache_path(key)
+    try:
+        if path.stat().st_mtime < time.time() - DISK_CACHE_TTL:
+            path.unlink()
+            return None
+        output = path.read_text()
+    except (FileNotFoundError, OSError):
+        return None
+    
+    _remember(key, output)
+    return output
+
+def write_cached(prompt: str, temperature: Union[float, str], output: str) -> None:
+    """
+    Store a generation in the cache, persisting deterministic ones and pruning the on-disk store every few writes.
+    
+    Args:
+        prompt (str): The prompt.
+        temperature (Union[float, str]): The temperature for generation, or a cache bucket name.
+        output (str): The generated content.
+    """
+    global _writes_since_prune
+    if not _cache_enabled():
+        return
+    
+    key = _cache_key(prompt, temperature)
+    _remember(key, output)
+    if not _persistable(temperature):
+        return
+    
+    path = _cache_path(key)
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(output)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing LLM cache entry: {str(e)}")
+    
+    with _prune_lock:
+        _writes_since_prune += 1
+        if _writes_since_prune < DISK_CACHE_PRUNE_INTERVAL:
+            return
+        _writes_since_prune = 0
+    _prune_disk_cache()
+
+def inputs_fingerprint(*parts: str) -> str:
+    """
+    Hash a node's inputs so it can tell whether they changed since its last run.
+    
+    Args:
+        *parts (str): The input texts.
+        
+    Returns:
+        str: The SHA-256 hex digest of the parts.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def cached_generate(prompt: Union[str, List[str]], temperature: float = 0.7) -> Union[str, List[str]]:
+    """
+    Generate content, serving identical (prompt, temperature) pairs from the cache.
+    
+    Args:
+        prompt (Union[str, List[str]]): The prompt to use, or a list of prompts to batch.
+        temperature (float): The temperature for generation.
+        
+    Returns:
+        Union[str, List[str]]: The generated content, or a list of contents for a batch.
+    """
+    if isinstance(prompt, str):
+        output = read_cached(prompt, temperature)
+        if output is None:
+            output = generate_with_langchain(prompt, temperature)
+            write_cached(prompt, temperature, output)
+        return output
+    
+    outputs = [read_cached(p, temperature) for p in prompt]
+    misses = [i for i, output in enumerate(outputs) if output is None]
+    if misses:
+        generated = generate_with_langchain([prompt[i] for i in misses], temperature)
+        for i, output in zip(misses, generated):
+            outputs[i] = output
+            write_cached(prompt[i], temperature, output)
+    return outputs
+
+async def acached_generate(prompt: str, temperature: float = 0.7) -> str:
+    """
+    Asynchronous version of cached_generate for a single prompt.
+    
+    Args:
+        prompt (str): The prompt to use.
+        temperature (float): The temperature for generation.
+        
+    Returns:
+        str: The generated content.
+    """
+    output = await asyncio.to_thread(read_cached, prompt, temperature)
+    if output is None:
+        output = await agenerate_with_langchain(prompt, temperature)
+        await asyncio.to_thread(write_cached, prompt, temperature, output)
+    return output
+
+def cached_generate_json(prompt: str) -> str:
+    """
+    Generate JSON with the extraction model, serving repeated prompts from the cache.
+    
+    Args:
+        prompt (str): The prompt describing the JSON to extract.
+        
+    Returns:
+        str: The generated JSON text.
+    """
+    output = read_cached(prompt, EXTRACTION_BUCKET)
+    if output is None:
+        output = generate_json_with_langchain(prompt)
+        write_cached(prompt, EXTRACTION_BUCKET, output)
+    return output
+
+async def acached_generate_json(prompt: str) -> str:
+    """
+    Asynchronous version of cached_generate_json.
+    
+    Args:
+        prompt (str): The prompt describing the JSON to extract.
+        
+    Returns:
+        str: The generated JSON text.
+    """
+    output = await asyncio.to_thread(read_cached, prompt, EXTRACTION_BUCKET)
+    if output is None:
+        output = await agenerate_json_with_langchain(prompt)
+        await asyncio.to_thread(write_cached, prompt, EXTRACTION_BUCKET, output)
+    return output
+
+def _write_all(entries: List[Tuple[str, str]], temperature: float) -> None:
+    """Store several (prompt, output) generations in the cache."""
+    for prompt, output in entries:
+        write_cached(prompt, temperature, output)
+
+async def acached_generate_many(prompts: List[str], temperature: float = 0.7,
+                                stream: bool = False,
+                                on_result: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """
+    Asynchronous, concurrent version of cached_generate for a list of prompts.
+    
+    Args:
+        prompts (List[str]): The prompts to use.
+        temperature (float): The temperature for generation.
+        stream (bool): Whether to stream the responses for cache misses.
+        on_result (Optional[Callable[[int, str], None]]): Called with the prompt index
+            and output as each result becomes available, cache hits first.
+        
+    Returns:
+        List[str]: The generated contents, in prompt order.
+    """
+    outputs = await asyncio.to_thread(lambda: [read_cached(p, temperature) for p in prompts])
+    misses = [i for i, output in enumerate(outputs) if output is None]
+    
+    if on_result:
+        for i, output in enumerate(outputs):
+            if output is not None:
+                on_result(i, output)
+    
+    if misses:
+        generated = await agenerate_many(
+            [prompts[i] for i in misses],
+            temperature,
+            stream=stream,
+            on_result=(lambda j, output: on_result(misses[j], output)) if on_result else None
+        )
+        for i, output in zip(misses, generated):
+            outputs[i] = output
+        await asyncio.to_thread(_write_all, [(prompts[i], outputs[i]) for i in misses], temperature)
+    return outputs
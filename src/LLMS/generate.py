@@ -0,0 +1,202 @@
+"""
+Shared LLM generation helpers for SDLC Agent nodes.
+"""
+import asyncio
+from typing import Any, Callable, Iterator, List, Optional, Union
+
+from src.LLMS.google_llm import get_cached_llm, get_extraction_llm
+
+# Maximum number of concurrent LLM requests per agenerate_many call
+MAX_CONCURRENT_GENERATIONS = 6
+
+def _text(response: Any) -> str:
+    """Get the text content of an LLM response."""
+    return getattr(response, "content", response)
+
+def generate_with_langchain(prompt: Union[str, List[str]], temperature: float = 0.7) -> Union[str, List[str]]:
+    """
+    Generate content using LLM.
+    
+    Args:
+        prompt (Union[str, List[str]]): The prompt to use, or a list of prompts to batch.
+        temperature (float): The temperature for generation.
+        
+    Returns:
+        Union[str, List[str]]: The generated content, or a list of contents for a batch.
+    """
+    llm = get_cached_llm(temperature)
+    if isinstance(prompt, list):
+        responses = llm.batch(prompt, config={"max_concurrency": len(prompt)})
+        return [_text(response) for response in responses]
+    return _text(llm.invoke(prompt))
+
+async def agenerate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
+    """
+    Asynchronous version of generate_with_langchain for a single prompt.
+    
+    Args:
+        prompt (str): The prompt to use.
+        temperature (float): The temperature for generation.
+        
+    Returns:
+        str: The generated content.
+    """
+    llm = get_cached_llm(temperature)
+    return _text(await llm.ainvoke(prompt))
+
+def stream_generate(prompt: str, temperature: float = 0.7) -> Iterator[str]:
+    """
+    Stream generated content for a single prompt.
+    
+    Args:
+        prompt (str): The prompt to use.
+        temperature (float): The temperature for generation.
+        
+    Yields:
+        str: Chunks of generated content as they arrive.
+    """
+    for chunk in get_cached_llm(temperature).stream(prompt):
+        yield _text(chunk)
+
+class _JsonCompletion:
+    """
+    Incremental tracker for whether a streamed response holds a complete JSON value.
+    
+    Each chunk is scanned once, tracking bracket depth and string state, so the
+    check stays linear in the response length however many chunks arrive. Text
+    before the first opening bracket, such as a ```json fence, is ignored.
+    """
+    
+    def __init__(self):
+        """Initialize the tracker before any chunk has arrived."""
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> bool:
+        """
+        Scan the next chunk.
+        
+        Args:
+            chunk (str): The newly streamed text.
+            
+        Returns:
+            bool: Whether the top-level JSON value has closed.
+        """
+        for char in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char in "{[":
+                self.depth += 1
+                self.started = True
+            elif not self.started:
+                continue
+            elif char == '"':
+                self.in_string = True
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+def generate_json_with_langchain(prompt: str) -> str:
+    """
+    Generate JSON with the small extraction model.
+    
+    The response is streamed and the stream is closed as soon as a complete
+    JSON value has arrived, so trailing tokens are never waited for.
+    
+    Args:
+        prompt (str): The prompt describing the JSON to extract.
+        
+    Returns:
+        str: The generated JSON text.
+    """
+    chunks = []
+    completion = _JsonCompletion()
+    stream = get_extraction_llm().stream(prompt)
+    try:
+        for chunk in stream:
+            text = _text(chunk)
+            chunks.append(text)
+            if completion.feed(text):
+                break
+    finally:
+        stream.close()
+    return "".join(chunks)
+
+async def agenerate_json_with_langchain(prompt: str) -> str:
+    """
+    Asynchronous version of generate_json_with_langchain.
+    
+    Args:
+        prompt (str): The prompt describing the JSON to extract.
+        
+    Returns:
+        str: The generated JSON text.
+    """
+    chunks = []
+    completion = _JsonCompletion()
+    stream = get_extraction_llm().astream(prompt)
+    try:
+        async for chunk in stream:
+            text = _text(chunk)
+            chunks.append(text)
+            if completion.feed(text):
+                break
+    finally:
+        await stream.aclose()
+    return "".join(chunks)
+
+async def astream_with_langchain(prompt: str, temperature: float = 0.7) -> str:
+    """
+    Generate content for a single prompt by streaming the response.
+    
+    Args:
+        prompt (str): The prompt to use.
+        temperature (float): The temperature for generation.
+        
+    Returns:
+        str: The generated content.
+    """
+    llm = get_cached_llm(temperature)
+    chunks = []
+    async for chunk in llm.astream(prompt):
+        chunks.append(_text(chunk))
+    return "".join(chunks)
+
+async def agenerate_many(prompts: List[str], temperature: float = 0.7,
+                         max_concurrency: int = MAX_CONCURRENT_GENERATIONS,
+                         stream: bool = False,
+                         on_result: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """
+    Generate content for several prompts concurrently, with bounded concurrency.
+    
+    Args:
+        prompts (List[str]): The prompts to use.
+        temperature (float): The temperature for generation.
+        max_concurrency (int): Maximum number of requests in flight at once.
+        stream (bool): Whether to stream each response instead of awaiting it whole.
+        on_result (Optional[Callable[[int, str], None]]): Called with the prompt index
+            and output as soon as each generation completes.
+        
+    Returns:
+        List[str]: The generated contents, in prompt order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    generate = astream_with_langchain if stream else agenerate_with_langchain
+    
+    async def _generate(index: int, prompt: str) -> str:
+        async with semaphore:
+            output = await generate(prompt, temperature)
+        if on_result:
+            on_result(index, output)
+        return output
+    
+    return await asyncio.gather(*[_generate(i, prompt) for i, prompt in enumerate(prompts)])
@@ -2,8 +2,15 @@
 Google Generative AI LLM integration with streaming support.
 """
 import os
-from typing import Dict, Any, List, Optional, Callable
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
 from langchain.schema.runnable import RunnableConfig
 from langchain.callbacks.base import BaseCallbackHandler
 
@@ -25,7 +32,256 @@ class StreamingCallbackHandler(BaseCallbackHandler):
         """Get the current buffer contents."""
         return self.buffer
 
-def get_llm(temperature=0.7, streaming=False, streaming_callback=None):
+# Set while regenerating a rejected stage, so every cache layer draws a fresh sample
+_CACHE_BYPASS: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+@contextmanager
+def bypass_llm_cache():
+    """
+    Skip cached responses for LLM calls made inside the block.
+    
+    Fresh responses are still stored, replacing the cached ones. The flag is a
+    context variable, so it follows the calls into tasks and worker threads.
+    """
+    token = _CACHE_BYPASS.set(True)
+    try:
+        yield
+    finally:
+        _CACHE_BYPASS.reset(token)
+
+def cache_bypassed() -> bool:
+    """Check whether the current call is inside bypass_llm_cache."""
+    return _CACHE_BYPASS.get()
+
+# Maximum cosine distance for a cached prompt to count as a semantic hit
+SEMANTIC_CACHE_THRESHOLD = 0.05
+
+# Only this many trailing characters are embedded; the embedder truncates at 256 tokens
+SEMANTIC_TAIL_CHARS = 800
+
+# Maximum number of responses kept in the exact cache and in each semantic index
+SEMANTIC_CACHE_SIZE = 256
+
+# Maximum number of (llm settings, prefix) semantic indexes kept at once
+SEMANTIC_INDEX_LIMIT = 32
+
+# Only models this deterministic get semantic matching; sampled prompts that differ
+# in a few characters (e.g. per-file code prompts) must not share answers
+SEMANTIC_MAX_TEMPERATURE = 0.2
+
+class SemanticCache(BaseCache):
+    """
+    LangChain LLM cache that serves repeated and paraphrased prompts.
+    
+    An exact (llm settings, prompt) hash match returns immediately. Otherwise
+    the prompt is split into a shared prefix and a task-specific tail: prompts
+    are bucketed by (llm settings, prefix hash), so a semantic hit requires the
+    prefix to match exactly, and only the tail is embedded and compared against
+    previously answered prompts in that bucket. Long shared requirements or
+    design context at the front of a prompt therefore can't make two different
+    tasks look alike. With ``semantic=False`` only exact matches are served.
+    
+    Attached to chat models through their ``cache`` field, so the models stay
+    ordinary Runnables. Lookups miss inside bypass_llm_cache; streaming calls
+    are not cached.
+    """
+    
+    def __init__(self, semantic: bool = True, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        """Initialize an empty cache, with or without semantic matching."""
+        self.semantic = semantic
+        self.threshold = threshold
+        self._exact: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._indexes: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._embeddings: Any = None
+        self._embeddings_unavailable = False
+        self._lock = threading.Lock()
+    
+    def _get_embeddings(self) -> Any:
+        """Lazily load the vectorstore embedder, or None if it is unavailable."""
+        with self._lock:
+            if self._embeddings is None and not self._embeddings_unavailable:
+                try:
+                    from src.vectorstore.vectorstore import initialize_embeddings
+                    self._embeddings = initialize_embeddings()
+                except Exception:
+                    # Fall back to exact-match caching only
+                    self._embeddings_unavailable = True
+            return self._embeddings
+    
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        """Get the exact-match cache key for a prompt and LLM settings."""
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode()).hexdigest()
+    
+    @staticmethod
+    def _bucket(prompt: str, llm_string: str) -> Tuple[Tuple[str, str], str]:
+        """Split a prompt into its semantic bucket (keyed on the exact prefix) and its tail."""
+        split = max(len(prompt) - SEMANTIC_TAIL_CHARS, 0)
+        prefix_hash = hashlib.sha256(prompt[:split].encode()).hexdigest()
+        return (llm_string, prefix_hash), prompt[split:]
+    
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """
+        Look up a cached response.
+        
+        Args:
+            prompt (str): The serialized prompt.
+            llm_string (str): The serialized LLM settings.
+            
+        Returns:
+            Optional[RETURN_VAL_TYPE]: The cached generations, or None on a miss.
+        """
+        if cache_bypassed():
+            return None
+        
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            if key in self._exact:
+                self._exact.move_to_end(key)
+                return self._exact[key]
+        
+        if not self.semantic:
+            return None
+        
+        bucket, tail = self._bucket(prompt, llm_string)
+        with self._lock:
+            index = self._indexes.get(bucket)
+        embeddings = self._get_embeddings()
+        if index is None or embeddings is None:
+            return None
+        
+        # Embed outside the lock; only the index search itself is serialized
+        vector = embeddings.embed_query(tail)
+        with self._lock:
+            results = index.similarity_search_with_score_by_vector(vector, k=1)
+            if not results:
+                return None
+            
+            document, score = results[0]
+            # Embeddings are normalized, so squared L2 distance is 2 * cosine distance
+            if score / 2 > self.threshold:
+                return None
+            
+            hit_key = document.metadata["key"]
+            if hit_key not in self._exact:
+                return None
+            self._exact.move_to_end(hit_key)
+            return self._exact[hit_key]
+    
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """
+        Record a response in the exact and semantic caches.
+        
+        Args:
+            prompt (str): The serialized prompt.
+            llm_string (str): The serialized LLM settings.
+            return_val (RETURN_VAL_TYPE): The generations to cache.
+        """
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            self._exact[key] = return_val
+            self._exact.move_to_end(key)
+            while len(self._exact) > SEMANTIC_CACHE_SIZE:
+                self._exact.popitem(last=False)
+        
+        if not self.semantic:
+            return
+        
+        embeddings = self._get_embeddings()
+        if embeddings is None:
+            return
+        
+        bucket, tail = self._bucket(prompt, llm_string)
+        vector = embeddings.embed_query(tail)
+        with self._lock:
+            index = self._indexes.get(bucket)
+            if index is None or index.index.ntotal >= SEMANTIC_CACHE_SIZE:
+                # Start a fresh index rather than growing a full one without bound
+                from langchain_community.vectorstores import FAISS
+                self._indexes[bucket] = FAISS.from_embeddings(
+                    [(tail, vector)], embeddings, metadatas=[{"key": key}]
+                )
+            else:
+                index.add_embeddings([(tail, vector)], metadatas=[{"key": key}])
+            self._indexes.move_to_end(bucket)
+            while len(self._indexes) > SEMANTIC_INDEX_LIMIT:
+                self._indexes.popitem(last=False)
+    
+    def clear(self, **kwargs: Any) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._exact.clear()
+            self._indexes.clear()
+
+# Shared by the cached chat models; keys include the model settings
+LLM_CACHE = SemanticCache(semantic=False)
+SEMANTIC_LLM_CACHE = SemanticCache()
+
+# gRPC keeps one persistent, multiplexed HTTP/2 channel per cached client
+TRANSPORT = "grpc"
+
+def _cache_for(temperature: float) -> SemanticCache:
+    """Get the cache for a model: semantic for deterministic temperatures, exact otherwise."""
+    return SEMANTIC_LLM_CACHE if temperature <= SEMANTIC_MAX_TEMPERATURE else LLM_CACHE
+
+@lru_cache(maxsize=8)
+def _create_chat_model(model: str, temperature: float, api_key: str, cache: bool = True) -> ChatGoogleGenerativeAI:
+    """
+    Create a non-streaming chat model, reused across calls with the same settings.
+    
+    Args:
+        model (str): The model name.
+        temperature (float): The temperature for generation.
+        api_key (str): The Google API key.
+        cache (bool): Whether to serve responses from the semantic cache.
+        
+    Returns:
+        ChatGoogleGenerativeAI: The LLM instance.
+    """
+    return ChatGoogleGenerativeAI(
+        google_api_key=api_key,
+        model=model,
+        temperature=temperature,
+        transport=TRANSPORT,
+        cache=_cache_for(temperature) if cache else False,
+    )
+
+# Smaller, cheaper model for reformatting earlier LLM output into fixed JSON schemas
+EXTRACTION_MODEL = "gemini-2.0-flash-lite"
+
+@lru_cache(maxsize=2)
+def _create_extraction_model(api_key: str) -> ChatGoogleGenerativeAI:
+    """
+    Create the JSON-mode extraction model, reused across calls.
+    
+    Args:
+        api_key (str): The Google API key.
+        
+    Returns:
+        ChatGoogleGenerativeAI: The LLM instance.
+    """
+    return ChatGoogleGenerativeAI(
+        google_api_key=api_key,
+        model=EXTRACTION_MODEL,
+        temperature=0,
+        response_mime_type="application/json",
+        transport=TRANSPORT,
+    )
+
+def get_extraction_llm() -> ChatGoogleGenerativeAI:
+    """
+    Get the LLM used for structured JSON extraction.
+    
+    Returns:
+        ChatGoogleGenerativeAI: A small model constrained to JSON output.
+    """
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY environment variable not found. Please make sure it's set.")
+    
+    return _create_extraction_model(api_key)
+
+def get_llm(temperature=0.7, streaming=False, streaming_callback=None, cache=True):
     """
     Get a Google Generative AI LLM instance.
     
@@ -33,6 +289,7 @@ def get_llm(temperature=0.7, streaming=False, streaming_callback=None):
         temperature (float): The temperature for generation.
         streaming (bool): Whether to stream the response.
         streaming_callback (Callable[[str], None]): Callback function for streaming.
+        cache (bool): Whether to serve responses from the semantic cache.
         
     Returns:
         ChatGoogleGenerativeAI: The LLM instance.
@@ -42,16 +299,37 @@ def get_llm(temperature=0.7, streaming=False, streaming_callback=None):
     if not api_key:
         raise ValueError("GOOGLE_API_KEY environment variable not found. Please make sure it's set.")
     
-    # Initialized LLM with model
-    llm = ChatGoogleGenerativeAI(
-        google_api_key=api_key,
-        model="gemini-2.0-flash",  # Use Gemini 1.5 Pro for high quality results
-        temperature=temperature,
-        streaming=streaming,
-        callbacks=[StreamingCallbackHandler(streaming_callback)] if streaming and streaming_callback else None,
-    )
+    # Streaming clients carry per-call callbacks, so only those are built fresh
+    if streaming:
+        return ChatGoogleGenerativeAI(
+            google_api_key=api_key,
+            model="gemini-2.0-flash",  # Use Gemini 1.5 Pro for high quality results
+            temperature=temperature,
+            streaming=streaming,
+            transport=TRANSPORT,
+            callbacks=[StreamingCallbackHandler(streaming_callback)] if streaming_callback else None,
+        )
     
-    return llm
+    return _create_chat_model("gemini-2.0-flash", temperature, api_key, cache)
+
+@lru_cache(maxsize=8)
+def _cached_llm(temperature_bucket: int) -> Any:
+    """Build the cached LLM for a temperature bucket (hundredths)."""
+    return get_llm(temperature=temperature_bucket / 100)
+
+def get_cached_llm(temperature: float = 0.7) -> Any:
+    """
+    Get a shared, cached LLM instance for a temperature.
+    
+    Temperatures are rounded to hundredths so equal settings share one client.
+    
+    Args:
+        temperature (float): The temperature for generation.
+        
+    Returns:
+        ChatGoogleGenerativeAI: The shared LLM instance.
+    """
+    return _cached_llm(int(round(temperature * 100)))
 
 def invoke_with_streaming(prompt: str, streaming_callback: Callable[[str], None], temperature=0.7):
     """
@@ -6,6 +6,7 @@ from typing import Dict, Any, List, Optional, Callable
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema.runnable import RunnableConfig
 from langchain.callbacks.base import BaseCallbackHandler
+from src.LLMS.google_llm import TRANSPORT, _create_chat_model
 
 class StreamingCallbackHandler(BaseCallbackHandler):
     """Callback handler for streaming LLM responses."""
@@ -25,7 +26,7 @@ class StreamingCallbackHandler(BaseCallbackHandler):
         """Get the current buffer contents."""
         return self.buffer
 
-def get_llm(temperature=0.7, streaming=False, streaming_callback=None):
+def get_llm(temperature=0.7, streaming=False, streaming_callback=None, cache=True):
     """
     Get a Google Generative AI LLM instance.
     
@@ -33,6 +34,7 @@ def get_llm(temperature=0.7, streaming=False, streaming_callback=None):
         temperature (float): The temperature for generation.
         streaming (bool): Whether to stream the response.
         streaming_callback (Callable[[str], None]): Callback function for streaming.
+        cache (bool): Whether to serve responses from the semantic cache.
         
     Returns:
         ChatGoogleGenerativeAI: The LLM instance.
@@ -42,16 +44,18 @@ def get_llm(temperature=0.7, streaming=False, streaming_callback=None):
     if not api_key:
         raise ValueError("GOOGLE_API_KEY environment variable not found. Please make sure it's set.")
     
-    # Initialized LLM with model
-    llm = ChatGoogleGenerativeAI(
-        google_api_key=api_key,
-        model="gemini-2.0-flash",  # Use Gemini 1.5 Pro for high quality results
-        temperature=temperature,
-        streaming=streaming,
-        callbacks=[StreamingCallbackHandler(streaming_callback)] if streaming and streaming_callback else None,
-    )
+    # Streaming clients carry per-call callbacks, so only those are built fresh
+    if streaming:
+        return ChatGoogleGenerativeAI(
+            google_api_key=api_key,
+            model="gemini-2.0-flash",  # Use Gemini 1.5 Pro for high quality results
+            temperature=temperature,
+            streaming=streaming,
+            transport=TRANSPORT,
+            callbacks=[StreamingCallbackHandler(streaming_callback)] if streaming_callback else None,
+        )
     
-    return llm
+    return _create_chat_model("gemini-2.0-flash", temperature, api_key, cache)
 
 def invoke_with_streaming(prompt: str, streaming_callback: Callable[[str], None], temperature=0.7):
     """
@@ -0,0 +1,373 @@
+"""
+Batched file checkpointing for the SDLC graph.
+"""
+import os
+import json
+import atexit
+import base64
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+# Flush pending checkpoints after this many seconds or this many entries
+FLUSH_INTERVAL = 0.05
+FLUSH_BATCH_SIZE = 32
+
+class BatchedCheckpoint:
+    """
+    Checkpoint store that coalesces writes and flushes them in the background.
+    
+    Each thread's latest checkpoint is kept in memory until a background writer
+    flushes it to ``<directory>/<thread_id>.json``. Repeated checkpoints for the
+    same thread between flushes are coalesced, so only the newest one hits disk.
+    Reads see pending and in-flight checkpoints until they are on disk.
+    
+    close() flushes what is pending and stops the writer; it is also registered
+    with atexit so checkpoints queued at shutdown are not lost.
+    """
+    
+    def __init__(self, directory: str, flush_interval: float = FLUSH_INTERVAL,
+                 batch_size: int = FLUSH_BATCH_SIZE):
+        """
+        Initialize the checkpoint store.
+        
+        Args:
+            directory (str): Directory to write checkpoints to.
+            flush_interval (float): Maximum seconds a checkpoint stays pending.
+            batch_size (int): Number of pending checkpoints that triggers a flush.
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        
+        self._pending: Dict[str, Any] = {}
+        self._inflight: Dict[str, Any] = {}
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+    
+    def _path(self, thread_id: str) -> str:
+        """Get the checkpoint file path for a thread."""
+        return os.path.join(self.directory, f"{os.path.basename(thread_id)}.json")
+    
+    def _write(self, thread_id: str, checkpoint: Any) -> None:
+        """Atomically write a single checkpoint to disk."""
+        path = self._path(thread_id)
+        tmp_path = f"{path}.tmp"
+        data = json.dumps(checkpoint, default=str).encode()
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    def _drain(self) -> None:
+        """Write every pending checkpoint, keeping the batch readable until it is on disk."""
+        # Drains are serialized so an older batch can never overwrite a newer one
+        with self._write_lock:
+            with self._condition:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            
+            try:
+                for thread_id, checkpoint in batch.items():
+                    try:
+                        self._write(thread_id, checkpoint)
+                    except OSError as e:
+                        print(f"Error writing checkpoint for {thread_id}: {str(e)}")
+            finally:
+                with self._condition:
+                    self._inflight = {}
+    
+    def _run(self) -> None:
+        """Background writer loop."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval
+                )
+                closed = self._closed
+            self._drain()
+            if closed:
+                return
+    
+    def put(self, thread_id: str, checkpoint: Any) -> None:
+        """
+        Queue a checkpoint for writing.
+        
+        Args:
+            thread_id (str): The thread (session) ID.
+            checkpoint (Any): The JSON-serializable checkpoint.
+        """
+        with self._condition:
+            self._pending[thread_id] = checkpoint
+            closed = self._closed
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        
+        # With the writer stopped, nothing else would flush this checkpoint
+        if closed:
+            self._drain()
+    
+    def get(self, thread_id: str) -> Optional[Any]:
+        """
+        Get the latest checkpoint for a thread.
+        
+        Args:
+            thread_id (str): The thread (session) ID.
+        
+        Returns:
+            Optional[Any]: The checkpoint, or None if there is none.
+        """
+        with self._condition:
+            if thread_id in self._pending:
+                return self._pending[thread_id]
+            if thread_id in self._inflight:
+                return self._inflight[thread_id]
+        
+        try:
+            with open(self._path(thread_id), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def flush(self) -> None:
+        """Write all pending checkpoints immediately."""
+        self._drain()
+    
+    def close(self) -> None:
+        """Flush pending checkpoints and stop the background writer."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        
+        self._writer.join()
+        atexit.unregister(self.close)
+    
+    async def aput(self, thread_id: str, checkpoint: Any) -> None:
+        """Asynchronous version of put."""
+        self.put(thread_id, checkpoint)
+    
+    async def aget(self, thread_id: str) -> Optional[Any]:
+        """Asynchronous version of get."""
+        return await asyncio.to_thread(self.get, thread_id)
+    
+    async def aflush(self) -> None:
+        """Asynchronous version of flush."""
+        await asyncio.to_thread(self.flush)
+    
+    async def aclose(self) -> None:
+        """Asynchronous version of close."""
+        await asyncio.to_thread(self.close)
+
+class BatchedCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpoint saver backed by a BatchedCheckpoint store.
+    
+    Only the latest checkpoint per (thread, namespace) is kept, together with
+    its parent config and pending writes, so ``list`` yields at most one
+    checkpoint and time travel to older checkpoints is not supported.
+    Checkpoint values are encoded with the saver's serializer and stored
+    base64-encoded inside the JSON record.
+    """
+    
+    def __init__(self, directory: str, **kwargs):
+        """
+        Initialize the saver.
+        
+        Args:
+            directory (str): Directory to write checkpoints to.
+            **kwargs: Passed through to BatchedCheckpoint.
+        """
+        super().__init__()
+        self.store = BatchedCheckpoint(directory, **kwargs)
+        # put_writes reads and rewrites a record, so updates are serialized
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _record_id(thread_id: str, checkpoint_ns: str) -> str:
+        """Get the store key for a thread and checkpoint namespace."""
+        if not checkpoint_ns:
+            return str(thread_id)
+        return f"{thread_id}-{hashlib.blake2b(checkpoint_ns.encode(), digest_size=8).hexdigest()}"
+    
+    def _encode(self, value: Any) -> Dict[str, str]:
+        """Serialize a value into a JSON-safe typed payload."""
+        type_, data = self.serde.dumps_typed(value)
+        return {"type": type_, "data": base64.b64encode(data).decode()}
+    
+    def _decode(self, payload: Dict[str, str]) -> Any:
+        """Deserialize a typed payload written by _encode."""
+        return self.serde.loads_typed((payload["type"], base64.b64decode(payload["data"])))
+    
+    def close(self) -> None:
+        """Flush pending checkpoints and stop the store's background writer."""
+        self.store.close()
+    
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Get the latest checkpoint for a thread, or the requested one if it is the latest.
+        
+        Args:
+            config (RunnableConfig): Config with the thread_id and optional checkpoint_id.
+            
+        Returns:
+            Optional[CheckpointTuple]: The checkpoint tuple, or None if there is none.
+        """
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        record = self.store.get(self._record_id(thread_id, checkpoint_ns))
+        if record is None:
+            return None
+        
+        checkpoint_id = configurable.get("checkpoint_id")
+        if checkpoint_id and checkpoint_id != record["checkpoint_id"]:
+            return None
+        
+        parent_config = None
+        if record["parent_checkpoint_id"]:
+            parent_config = {"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": record["parent_checkpoint_id"],
+            }}
+        
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": record["checkpoint_id"],
+            }},
+            checkpoint=self._decode(record["checkpoint"]),
+            metadata=self._decode(record["metadata"]),
+            parent_config=parent_config,
+            pending_writes=[
+                (task_id, channel, self._decode(value))
+                for task_id, channel, value in record["writes"]
+            ],
+        )
+    
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """
+        List checkpoints for a thread; only the latest one is stored.
+        
+        Args:
+            config (Optional[RunnableConfig]): Config with the thread_id.
+            filter (Optional[Dict[str, Any]]): Metadata key/value pairs to match.
+            before (Optional[RunnableConfig]): Only list checkpoints older than this one.
+            limit (Optional[int]): Maximum number of checkpoints to list.
+            
+        Yields:
+            CheckpointTuple: The matching checkpoint tuples.
+        """
+        if config is None or limit == 0:
+            return
+        
+        checkpoint_tuple = self.get_tuple(config)
+        if checkpoint_tuple is None:
+            return
+        
+        before_id = before["configurable"].get("checkpoint_id") if before else None
+        if before_id and checkpoint_tuple.config["configurable"]["checkpoint_id"] >= before_id:
+            return
+        if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+            return
+        
+        yield checkpoint_tuple
+    
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        """
+        Queue a checkpoint for writing, replacing the thread's previous one.
+        
+        Args:
+            config (RunnableConfig): Config of the parent checkpoint.
+            checkpoint (Checkpoint): The checkpoint to store.
+            metadata (CheckpointMetadata): The checkpoint metadata.
+            new_versions (ChannelVersions): New channel versions (unused; full checkpoints are stored).
+            
+        Returns:
+            RunnableConfig: Config pointing at the stored checkpoint.
+        """
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        record = {
+            "checkpoint_id": checkpoint["id"],
+            "parent_checkpoint_id": configurable.get("checkpoint_id"),
+            "checkpoint": self._encode(checkpoint),
+            "metadata": self._encode(metadata),
+            "writes": [],
+        }
+        
+        with self._lock:
+            self.store.put(self._record_id(thread_id, checkpoint_ns), record)
+        
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+    
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        """
+        Record intermediate writes for the thread's latest checkpoint.
+        
+        Args:
+            config (RunnableConfig): Config of the checkpoint the writes belong to.
+            writes (Sequence[Tuple[str, Any]]): (channel, value) pairs.
+            task_id (str): The task that produced the writes.
+            task_path (str): The task path (unused).
+        """
+        configurable = config["configurable"]
+        record_id = self._record_id(configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+        
+        with self._lock:
+            record = self.store.get(record_id)
+            # Writes for a checkpoint that has already been replaced are dropped
+            if record is None or record["checkpoint_id"] != configurable.get("checkpoint_id"):
+                return
+            
+            encoded = [[task_id, channel, self._encode(value)] for channel, value in writes]
+            self.store.put(record_id, {**record, "writes": record["writes"] + encoded})
+    
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Asynchronous version of get_tuple."""
+        return await asyncio.to_thread(self.get_tuple, config)
+    
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        """Asynchronous version of list."""
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+    
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        """Asynchronous version of put."""
+        return self.put(config, checkpoint, metadata, new_versions)
+    
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        """Asynchronous version of put_writes."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
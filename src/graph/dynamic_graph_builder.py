@@ -1,6 +1,7 @@
 """
 Dynamic workflow construction for SDLC Agent.
 """
+import asyncio
 from typing import Dict, Any, List, Optional
 from langgraph.graph import StateGraph, END
 
@@ -8,10 +9,10 @@ from src.state.sdlc_state import SDLCState
 from src.nodes.requirement_analyzer import requirement_analysis_node
 from src.nodes.user_story_generator import user_story_generator_node
 from src.nodes.design_document_generator import design_document_generator_node
-from src.nodes.code_generator import code_generator_node
-from src.nodes.security_reviewer import security_review_node
-from src.nodes.test_generator import test_generator_node
-from src.nodes.multimodal_processor import process_design_with_image
+from src.nodes.code_generator import code_generator_node_async
+from src.nodes.security_reviewer import security_review_node_async
+from src.nodes.test_generator import test_generator_node_async
+from src.nodes.multimodal_processor import process_design_with_image_async
 from langchain_google_genai import ChatGoogleGenerativeAI
 from src.LLMS.google_llm import get_llm
 
@@ -63,18 +64,36 @@ def analyze_project_complexity(requirements: str) -> Dict[str, Any]:
     # For now, return the default analysis
     return default_analysis
 
-def build_sdlc_graph(requirements: str):
+async def security_and_test_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the security review and test generation concurrently.
+    
+    Args:
+        state (Dict[str, Any]): The current state
+        
+    Returns:
+        Dict[str, Any]: Combined state update, with test generation deciding the next stage
+    """
+    security_update, test_update = await asyncio.gather(
+        security_review_node_async(state),
+        test_generator_node_async(state)
+    )
+    return {**security_update, **test_update}
+
+def build_sdlc_graph(requirements: str, analysis: Optional[Dict[str, Any]] = None):
     """
     Dynamically build SDLC graph based on requirements analysis.
     
     Args:
         requirements (str): Project requirements
+        analysis (Optional[Dict[str, Any]]): Precomputed complexity analysis
         
     Returns:
         Callable: Compiled LangGraph workflow
     """
     # Analyze requirements to determine needed nodes
-    analysis = analyze_project_complexity(requirements)
+    if analysis is None:
+        analysis = analyze_project_complexity(requirements)
     
     # Initialize state graph
     graph = StateGraph(SDLCState)
@@ -83,8 +102,7 @@ def build_sdlc_graph(requirements: str):
     graph.add_node("requirements", requirement_analysis_node)
     graph.add_node("user_stories", user_story_generator_node)
     graph.add_node("design", design_document_generator_node)
-    graph.add_node("code", code_generator_node)
-    graph.add_node("test", test_generator_node)
+    graph.add_node("code", code_generator_node_async)
     
     # Always add these core edges
     graph.add_edge("requirements", "user_stories")
@@ -93,7 +111,7 @@ def build_sdlc_graph(requirements: str):
     # Add conditional nodes based on project complexity
     if analysis.get("complexity") == "high":
         # Add architectural review node for complex projects
-        graph.add_node("architecture_review", process_design_with_image)
+        graph.add_node("architecture_review", process_design_with_image_async)
         # Modify the edges to include architectural review
         graph.add_edge("design", "architecture_review")
         graph.add_edge("architecture_review", "code")
@@ -103,32 +121,32 @@ def build_sdlc_graph(requirements: str):
     
     # Add security nodes if project is security critical
     if analysis.get("security_critical"):
-        graph.add_node("security", security_review_node)
-        
-        # Add security review after code generation
-        graph.add_edge("code", "security")
-        graph.add_edge("security", "test")
+        # Security review and test generation both only need the code, so run them together
+        graph.add_node("security_and_test", security_and_test_node)
+        graph.add_edge("code", "security_and_test")
+        graph.add_edge("security_and_test", END)
     else:
         # Skip security review for non-security-critical projects
+        graph.add_node("test", test_generator_node_async)
         graph.add_edge("code", "test")
-    
-    # Final edge to end
-    graph.add_edge("test", END)
+        graph.add_edge("test", END)
     
     # Compile graph
     return graph.compile()
 
-def get_dynamic_graph_description(requirements: str) -> str:
+def get_dynamic_graph_description(requirements: str, analysis: Optional[Dict[str, Any]] = None) -> str:
     """
     Get a textual description of the dynamically built graph.
     
     Args:
         requirements (str): Project requirements
+        analysis (Optional[Dict[str, Any]]): Precomputed complexity analysis
         
     Returns:
         str: Description of the graph structure
     """
-    analysis = analyze_project_complexity(requirements)
+    if analysis is None:
+        analysis = analyze_project_complexity(requirements)
     
     description = "SDLC Workflow:\n"
     description += "1. Requirements Analysis\n"
@@ -144,10 +162,10 @@ def get_dynamic_graph_description(requirements: str) -> str:
     if analysis.get("security_critical"):
         if analysis.get("complexity") == "high":
             description += "6. Security Review (added for security-critical project)\n"
-            description += "7. Test Generation\n"
+            description += "7. Test Generation (runs alongside the security review)\n"
         else:
             description += "5. Security Review (added for security-critical project)\n"
-            description += "6. Test Generation\n"
+            description += "6. Test Generation (runs alongside the security review)\n"
     else:
         if analysis.get("complexity") == "high":
             description += "6. Test Generation\n"
@@ -1,14 +1,24 @@
 """
 LangGraph implementation of the SDLC process.
+
+Not used by the application, which builds its graph with
+src.graph.dynamic_graph_builder.build_sdlc_graph. This module cannot be
+imported as it stands: analyze_requirements, generate_user_stories,
+process_user_stories_feedback, generate_design_documents and
+process_design_feedback do not exist in src.nodes.
 """
-from typing import Dict, Any, List, Optional, Union, Annotated, TypedDict
+from typing import Dict, Any, List, Optional, Union, Annotated, TypedDict, Callable, Awaitable
 from langgraph.graph import StateGraph, END
 from langgraph.graph import MessagesState
-from langgraph.checkpoint import JsonCheckpoint
+from langgraph.types import Command
 import os
 import asyncio
 import json
+import operator
+from collections import Counter
+from functools import wraps
 
+from src.graph.checkpoint import BatchedCheckpointSaver
 from src.nodes.requirement_analyzer import analyze_requirements
 from src.nodes.user_story_generator import generate_user_stories, process_user_stories_feedback
 from src.nodes.design_document_generator import generate_design_documents, process_design_feedback
@@ -38,6 +48,131 @@ def should_retry_operation(state: Dict[str, Any]) -> bool:
     # Allow up to 3 retries
     return retries < 3
 
+def merge_retries(left: Optional[Dict[str, int]], right: Optional[Dict[str, int]]) -> Counter:
+    """
+    Reducer that adds retry count deltas into the accumulated retry counts.
+    
+    Args:
+        left (Optional[Dict[str, int]]): The accumulated retry counts.
+        right (Optional[Dict[str, int]]): The retry count delta.
+        
+    Returns:
+        Counter: The merged retry counts.
+    """
+    merged = Counter(left or {})
+    merged.update(right or {})
+    return merged
+
+def retryable(operation: str, description: str):
+    """
+    Wrap a graph node with the shared retry bookkeeping.
+    
+    The wrapped node records itself as the current operation, adds a retry
+    count delta when re-entered after an error, and converts raised exceptions
+    into a state error. Only changed fields are returned, so the additive
+    ``history`` and ``retries`` reducers don't re-append passed-through values.
+    The node routes itself by returning a Command whose target comes from the
+    TRANSITIONS table.
+    
+    Args:
+        operation (str): The operation name used as the retries key.
+        description (str): Human-readable operation name for error messages.
+        
+    Returns:
+        Callable: Decorator for async node functions.
+    """
+    def decorator(node: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+        @wraps(node)
+        async def wrapper(state: Dict[str, Any]) -> Command:
+            update = {"current_operation": operation}
+            
+            # If there's an error and we should retry, increment retry count
+            if state.get("error") and should_retry_operation(state):
+                update["retries"] = Counter({operation: 1})
+                update["error"] = None
+            
+            node_state = {**state, **update}
+            if "retries" in update:
+                node_state["retries"] = merge_retries(state.get("retries"), update["retries"])
+            
+            try:
+                result = await node(node_state)
+            except Exception as e:
+                update["error"] = f"Error in {description}: {str(e)}"
+                return Command(update=update, goto="error_handler")
+            
+            # Drop values the node passed through unchanged
+            changed = {key: value for key, value in result.items() if value is not node_state.get(key)}
+            return Command(
+                update={**update, **changed},
+                goto=next_node(operation, {**node_state, **changed})
+            )
+        
+        return wrapper
+    
+    return decorator
+
+# Transition table for routing after each operation:
+# operation -> (next operation, feedback stage, feedback operation, requires approval).
+# With no feedback recorded, operations that require approval loop on their
+# feedback operation; the others advance.
+TRANSITIONS = {
+    "analyze_requirements": ("generate_user_stories", None, None, False),
+    "generate_user_stories": ("generate_design_documents", "USER_STORIES", "process_user_stories_feedback", False),
+    "process_user_stories_feedback": ("generate_design_documents", "USER_STORIES", "process_user_stories_feedback", True),
+    "generate_design_documents": (END, "DESIGN", "process_design_feedback", False),  # End for now (will add more nodes later)
+    "process_design_feedback": (END, "DESIGN", "process_design_feedback", True),
+}
+
+# Operation to resume from after an unrecoverable error, by current stage
+STAGE_TRANSITIONS = {
+    "REQUIREMENTS": "generate_user_stories",
+    "USER_STORIES": "generate_design_documents",
+    "DESIGN": END,  # End for now (will add more nodes later)
+}
+
+def next_node(operation: str, state: Dict[str, Any]) -> str:
+    """
+    Determine the next node after an operation.
+    
+    Args:
+        operation (str): The operation that just ran.
+        state (Dict[str, Any]): The current state.
+        
+    Returns:
+        str: The next node.
+    """
+    if state.get("error"):
+        return "error_handler"
+    
+    next_operation, feedback_stage, feedback_operation, requires_approval = TRANSITIONS[operation]
+    if feedback_stage is None:
+        return next_operation
+    
+    # Check if there's feedback for the stage
+    approved = state.get("feedback_approved", {}).get(feedback_stage)
+    if approved is None:
+        approved = not requires_approval
+    
+    return next_operation if approved else feedback_operation
+
+def next_after_error_handler(state: Dict[str, Any]) -> str:
+    """
+    Determine next node after error handling.
+    
+    Args:
+        state (Dict[str, Any]): The state after error handling.
+        
+    Returns:
+        str: The next node.
+    """
+    # If error is still present and should retry, return to current operation
+    if state.get("error") and should_retry_operation(state):
+        return state.get("current_operation", "analyze_requirements")
+    
+    # If no error or max retries exceeded, proceed based on current stage
+    return STAGE_TRANSITIONS.get(state.get("current_stage", "REQUIREMENTS"), END)
+
 def create_sdlc_graph(llm: Any, vectorstore: Any):
     """
     Create the SDLC graph.
@@ -65,13 +200,14 @@ def create_sdlc_graph(llm: Any, vectorstore: Any):
         security_findings: Optional[str]
         test_cases: Optional[str]
         test_results: Optional[str]
-        feedback: Dict[str, Dict[str, Any]]
-        history: List[Dict[str, Any]]
+        feedback_approved: Dict[str, bool]
+        feedback_comments: Dict[str, List[str]]
+        history: Annotated[List[Dict[str, Any]], operator.add]
         created_at: str
         last_updated: str
         completed: bool
         error: Optional[str]
-        retries: Dict[str, int]
+        retries: Annotated[Dict[str, int], merge_retries]
     
     # Create graph
     graph = StateGraph(SDLCGraphState)
@@ -79,112 +215,32 @@ def create_sdlc_graph(llm: Any, vectorstore: Any):
     # Add nodes
     
     # Requirements Analysis Node
+    @retryable("analyze_requirements", "requirements analysis")
     async def requirements_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        # Set current operation
-        state["current_operation"] = "analyze_requirements"
-        
-        # If there's an error and we should retry, increment retry count
-        if state.get("error") and should_retry_operation(state):
-            retries = state.get("retries", {})
-            current_retries = retries.get("analyze_requirements", 0)
-            retries["analyze_requirements"] = current_retries + 1
-            state["retries"] = retries
-            state["error"] = None
-        
-        # Analyze requirements
-        try:
-            state = await analyze_requirements(state, llm)
-            return state
-        except Exception as e:
-            state["error"] = f"Error in requirements analysis: {str(e)}"
-            return state
+        return await analyze_requirements(state, llm)
     
     # User Stories Generation Node
+    @retryable("generate_user_stories", "user stories generation")
     async def user_stories_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        # Set current operation
-        state["current_operation"] = "generate_user_stories"
-        
-        # If there's an error and we should retry, increment retry count
-        if state.get("error") and should_retry_operation(state):
-            retries = state.get("retries", {})
-            current_retries = retries.get("generate_user_stories", 0)
-            retries["generate_user_stories"] = current_retries + 1
-            state["retries"] = retries
-            state["error"] = None
-        
-        # Generate user stories
-        try:
-            state = await generate_user_stories(state, llm, vectorstore)
-            return state
-        except Exception as e:
-            state["error"] = f"Error in user stories generation: {str(e)}"
-            return state
+        return await generate_user_stories(state, llm, vectorstore)
     
     # User Stories Feedback Node
+    @retryable("process_user_stories_feedback", "user stories feedback processing")
     async def user_stories_feedback_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        # Set current operation
-        state["current_operation"] = "process_user_stories_feedback"
-        
-        # If there's an error and we should retry, increment retry count
-        if state.get("error") and should_retry_operation(state):
-            retries = state.get("retries", {})
-            current_retries = retries.get("process_user_stories_feedback", 0)
-            retries["process_user_stories_feedback"] = current_retries + 1
-            state["retries"] = retries
-            state["error"] = None
-        
-        # Process user stories feedback
-        try:
-            state = await process_user_stories_feedback(state, llm, vectorstore)
-            return state
-        except Exception as e:
-            state["error"] = f"Error in user stories feedback processing: {str(e)}"
-            return state
+        return await process_user_stories_feedback(state, llm, vectorstore)
     
     # Design Documents Generation Node
+    @retryable("generate_design_documents", "design document generation")
     async def design_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        # Set current operation
-        state["current_operation"] = "generate_design_documents"
-        
-        # If there's an error and we should retry, increment retry count
-        if state.get("error") and should_retry_operation(state):
-            retries = state.get("retries", {})
-            current_retries = retries.get("generate_design_documents", 0)
-            retries["generate_design_documents"] = current_retries + 1
-            state["retries"] = retries
-            state["error"] = None
-        
-        # Generate design documents
-        try:
-            state = await generate_design_documents(state, llm, vectorstore)
-            return state
-        except Exception as e:
-            state["error"] = f"Error in design document generation: {str(e)}"
-            return state
+        return await generate_design_documents(state, llm, vectorstore)
     
     # Design Feedback Node
+    @retryable("process_design_feedback", "design feedback processing")
     async def design_feedback_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        # Set current operation
-        state["current_operation"] = "process_design_feedback"
-        
-        # If there's an error and we should retry, increment retry count
-        if state.get("error") and should_retry_operation(state):
-            retries = state.get("retries", {})
-            current_retries = retries.get("process_design_feedback", 0)
-            retries["process_design_feedback"] = current_retries + 1
-            state["retries"] = retries
-            state["error"] = None
-        
-        # Process design feedback
-        try:
-            state = await process_design_feedback(state, llm, vectorstore)
-            return state
-        except Exception as e:
-            state["error"] = f"Error in design feedback processing: {str(e)}"
-            return state
+        return await process_design_feedback(state, llm, vectorstore)
     
     # Error Handler Node
-    async def error_handler_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    async def error_handler_node(state: Dict[str, Any]) -> Command:
         # Get error
         error = state.get("error", "Unknown error")
         
@@ -198,18 +254,19 @@ def create_sdlc_graph(llm: Any, vectorstore: Any):
         print(f"Error in operation {operation} (retry {retries}): {error}")
         
         # If max retries exceeded, add error to history and continue
+        update = {}
         if retries >= 3:
-            history = state.get("history", [])
-            history.append({
-                "type": "error",
-                "operation": operation,
-                "error": error,
-                "retries": retries
-            })
-            state["history"] = history
-            state["error"] = None
-        
-        return state
+            update = {
+                "history": [{
+                    "type": "error",
+                    "operation": operation,
+                    "error": error,
+                    "retries": retries
+                }],
+                "error": None
+            }
+        
+        return Command(update=update, goto=next_after_error_handler({**state, **update}))
     
     # Add nodes to graph
     graph.add_node("analyze_requirements", requirements_node)
@@ -219,142 +276,16 @@ def create_sdlc_graph(llm: Any, vectorstore: Any):
     graph.add_node("process_design_feedback", design_feedback_node)
     graph.add_node("error_handler", error_handler_node)
     
-    # Define conditional edges
-    
-    # Start with requirements analysis
+    # Start with requirements analysis; nodes route themselves via Command
     graph.set_entry_point("analyze_requirements")
     
-    # Define edge conditions
-    
-    def has_error(state: Dict[str, Any]) -> str:
-        """Check if state has an error."""
-        if state.get("error"):
-            return "error_handler"
-        return None
-    
-    def next_after_requirements(state: Dict[str, Any]) -> str:
-        """Determine next node after requirements analysis."""
-        if state.get("error"):
-            return "error_handler"
-        return "generate_user_stories"
-    
-    def next_after_user_stories(state: Dict[str, Any]) -> str:
-        """Determine next node after user stories generation."""
-        if state.get("error"):
-            return "error_handler"
-        
-        # Check if there's feedback for USER_STORIES stage
-        feedback = state.get("feedback", {}).get("USER_STORIES")
-        
-        if feedback:
-            # If not approved, process feedback
-            if not feedback.get("approved", False):
-                return "process_user_stories_feedback"
-        
-        # Move to design stage
-        return "generate_design_documents"
-    
-    def next_after_user_stories_feedback(state: Dict[str, Any]) -> str:
-        """Determine next node after user stories feedback processing."""
-        if state.get("error"):
-            return "error_handler"
-        
-        # Check if user stories feedback is approved
-        feedback = state.get("feedback", {}).get("USER_STORIES")
-        
-        if feedback and feedback.get("approved", False):
-            return "generate_design_documents"
-        
-        # Stay in user stories feedback
-        return "process_user_stories_feedback"
-    
-    def next_after_design(state: Dict[str, Any]) -> str:
-        """Determine next node after design document generation."""
-        if state.get("error"):
-            return "error_handler"
-        
-        # Check if there's feedback for DESIGN stage
-        feedback = state.get("feedback", {}).get("DESIGN")
-        
-        if feedback:
-            # If not approved, process feedback
-            if not feedback.get("approved", False):
-                return "process_design_feedback"
-        
-        # End for now (will add more nodes later)
-        return END
-    
-    def next_after_design_feedback(state: Dict[str, Any]) -> str:
-        """Determine next node after design feedback processing."""
-        if state.get("error"):
-            return "error_handler"
-        
-        # Check if design feedback is approved
-        feedback = state.get("feedback", {}).get("DESIGN")
-        
-        if feedback and feedback.get("approved", False):
-            return END
-        
-        # Stay in design feedback
-        return "process_design_feedback"
-    
-    def next_after_error_handler(state: Dict[str, Any]) -> Union[str, None]:
-        """Determine next node after error handling."""
-        # If error is still present and should retry, return to current operation
-        if state.get("error") and should_retry_operation(state):
-            return state.get("current_operation", "analyze_requirements")
-        
-        # If no error or max retries exceeded, proceed based on current stage
-        current_stage = state.get("current_stage", "REQUIREMENTS")
-        
-        if current_stage == "REQUIREMENTS":
-            return "generate_user_stories"
-        elif current_stage == "USER_STORIES":
-            return "generate_design_documents"
-        elif current_stage == "DESIGN":
-            return END  # End for now (will add more nodes later)
-        
-        # Default: end
-        return END
-    
-    # Add edges
-    graph.add_conditional_edges(
-        "analyze_requirements",
-        next_after_requirements
-    )
-    
-    graph.add_conditional_edges(
-        "generate_user_stories",
-        next_after_user_stories
-    )
-    
-    graph.add_conditional_edges(
-        "process_user_stories_feedback",
-        next_after_user_stories_feedback
-    )
-    
-    graph.add_conditional_edges(
-        "generate_design_documents",
-        next_after_design
-    )
-    
-    graph.add_conditional_edges(
-        "process_design_feedback",
-        next_after_design_feedback
-    )
-    
-    graph.add_conditional_edges(
-        "error_handler",
-        next_after_error_handler
-    )
-    
     # Create checkpoint directory for this graph
     session_checkpoint_dir = os.path.join(CHECKPOINT_DIR, "sdlc_graph")
     os.makedirs(session_checkpoint_dir, exist_ok=True)
     
-    # Create and return checkpointed graph
-    checkpointed_graph = graph.with_checkpointer(
-        JsonCheckpoint(session_checkpoint_dir)
+    # Compile with the batched saver so checkpoints are written off the hot path
+    checkpointed_graph = graph.compile(
+        checkpointer=BatchedCheckpointSaver(session_checkpoint_dir)
     )
     
     return checkpointed_graph
\ No newline at end of file
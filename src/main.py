@@ -4,19 +4,23 @@ Main application entry point for SDLC Agent.
 import os
 from typing import Dict, Any, List, Optional
 import json
+import orjson
 from datetime import datetime
 import uuid
+import time
 import asyncio
-from functools import wraps
+from functools import wraps, lru_cache
+import hashlib
+from collections import OrderedDict
 import logging
 
 from dotenv import load_dotenv
 from langchain.chains import ConversationChain
 
-from src.LLMS.google_llm import get_llm
+from src.LLMS.google_llm import get_llm, bypass_llm_cache
 from src.state.sdlc_state import SDLCState, SDLCStage
 from src.graph.dynamic_graph_builder import build_sdlc_graph, get_dynamic_graph_description, analyze_project_complexity
-from src.monitoring.workflow_monitor import monitor_workflow_progress, get_monitoring_summary
+from src.monitoring.workflow_monitor import monitor_workflow_progress, get_monitoring_summary, MonitorView
 
 # Load environment variables
 load_dotenv()
@@ -25,8 +29,215 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Fields that graph results may update on the session state
+_STATE_FIELDS = frozenset(SDLCState.model_fields.keys())
+
+# Graph node to rerun for each stage when feedback is not approved
+STAGE_NODE = {
+    SDLCStage.REQUIREMENTS: "requirements",
+    SDLCStage.USER_STORIES: "user_stories",
+    SDLCStage.DESIGN: "design",
+    SDLCStage.CODE: "code",
+    SDLCStage.TESTING: "test"
+}
+
+# Security-critical graphs review security and generate tests in one combined node
+SECURITY_CRITICAL_STAGE_NODE = {
+    **STAGE_NODE,
+    SDLCStage.SECURITY: "security_and_test",
+    SDLCStage.TESTING: "security_and_test"
+}
+
+# Input-hash field that lets a stage's node reuse its last output; cleared when the stage is rejected
+STAGE_INPUTS_HASH = {
+    SDLCStage.USER_STORIES: "user_stories_inputs_hash",
+    SDLCStage.SECURITY: "security_review_inputs_hash"
+}
+
+@lru_cache(maxsize=256)
+def _compile(requirements_hash: bytes, requirements: str):
+    """
+    Analyze requirements and compile their SDLC graph, memoized per requirements.
+    
+    Args:
+        requirements_hash (bytes): Digest of the requirements.
+        requirements (str): The user requirements.
+        
+    Returns:
+        tuple: (graph, graph_description, complexity_analysis)
+    """
+    complexity_analysis = analyze_project_complexity(requirements)
+    graph = build_sdlc_graph(requirements, complexity_analysis)
+    description = get_dynamic_graph_description(requirements, complexity_analysis)
+    return graph, description, complexity_analysis
+
+def compile_sdlc_graph(requirements: str, session_id: str):
+    """
+    Get the compiled SDLC graph for requirements, bound to a session.
+    
+    Args:
+        requirements (str): The user requirements.
+        session_id (str): The session ID.
+        
+    Returns:
+        tuple: (graph, graph_description, complexity_analysis)
+    """
+    requirements_hash = hashlib.blake2b(requirements.encode(), digest_size=16).digest()
+    graph, description, complexity_analysis = _compile(requirements_hash, requirements)
+    
+    # The compiled graph is shared, so isolate per-session checkpoints via config
+    session_graph = graph.with_config({"configurable": {"session_id": session_id}})
+    
+    return session_graph, description, dict(complexity_analysis)
+
+# Directory for sessions evicted from memory
+SESSION_SPILL_DIR = "/tmp/sdlc_checkpoints/sessions"
+
+# Spilled sessions untouched for this many seconds are deleted
+SESSION_SPILL_TTL = 24 * 3600
+
+# Session fields listed by get_all_sessions
+_SUMMARY_FIELDS = ("session_id", "current_stage", "created_at", "last_updated")
+
+class SessionCache:
+    """
+    Bounded LRU store for active sessions.
+    
+    Only the most recently used sessions are kept in memory. Colder sessions
+    are spilled to disk as JSON and rehydrated on access, with their graph
+    rebuilt from the stored requirements rather than serialized.
+    
+    Spill files only extend this process's memory: files left by earlier
+    processes are removed at startup, spilled sessions expire after
+    SESSION_SPILL_TTL, and listing sessions reads a small in-memory index
+    rather than the files.
+    """
+    
+    def __init__(self, capacity: int = 64, spill_dir: str = SESSION_SPILL_DIR):
+        """
+        Initialize the session cache.
+        
+        Args:
+            capacity (int): Maximum number of sessions kept in memory.
+            spill_dir (str): Directory for spilled sessions.
+        """
+        self._sessions = OrderedDict()
+        self._capacity = capacity
+        self._spill_dir = spill_dir
+        # Summaries of spilled sessions, with the monotonic time they were spilled
+        self._spilled: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(spill_dir, exist_ok=True)
+        
+        # Sessions spilled by an earlier process can't be listed or resumed consistently
+        for file_name in os.listdir(spill_dir):
+            if file_name.endswith(".json"):
+                self._remove(file_name[:-len(".json")])
+    
+    def _path(self, session_id: str) -> str:
+        """Get the spill file path for a session."""
+        return os.path.join(self._spill_dir, f"{os.path.basename(session_id)}.json")
+    
+    def _remove(self, session_id: str) -> None:
+        """Delete a spilled session's file and index entry."""
+        self._spilled.pop(session_id, None)
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+    
+    def _spill(self, session_id: str, session: Dict[str, Any]) -> None:
+        """Write a session to disk and record its summary in the index."""
+        state = session["state"]
+        with open(self._path(session_id), "wb") as f:
+            f.write(b'{"state":')
+            f.write(state.to_json().encode())
+            f.write(b',"graph_description":')
+            f.write(orjson.dumps(session.get("graph_description")))
+            f.write(b'}')
+        self._spilled[session_id] = {
+            "summary": {field: getattr(state, field) for field in _SUMMARY_FIELDS},
+            "spilled_at": time.monotonic()
+        }
+    
+    def _expire(self) -> None:
+        """Delete spilled sessions older than SESSION_SPILL_TTL."""
+        cutoff = time.monotonic() - SESSION_SPILL_TTL
+        for session_id in [sid for sid, entry in self._spilled.items() if entry["spilled_at"] < cutoff]:
+            self._remove(session_id)
+    
+    def _read(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Read a spilled session's JSON, or None if it isn't on disk."""
+        try:
+            with open(self._path(session_id), "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a session, rehydrating it from disk if it was spilled.
+        
+        Args:
+            session_id (str): The session ID.
+            
+        Returns:
+            Optional[Dict[str, Any]]: The session, or None if not found.
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            return session
+        
+        if session_id not in self._spilled:
+            return None
+        data = self._read(session_id)
+        if data is None:
+            self._spilled.pop(session_id, None)
+            return None
+        
+        state = SDLCState.model_validate(data["state"])
+        session = {
+            "state": state,
+            "graph": compile_sdlc_graph(state.requirements or "", session_id)[0],
+            "graph_description": data.get("graph_description")
+        }
+        self._remove(session_id)
+        self.put(session_id, session)
+        return session
+    
+    def put(self, session_id: str, session: Dict[str, Any]) -> None:
+        """
+        Store a session, spilling the least recently used one if over capacity.
+        
+        Args:
+            session_id (str): The session ID.
+            session (Dict[str, Any]): The session.
+        """
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        
+        while len(self._sessions) > self._capacity:
+            cold_id, cold_session = self._sessions.popitem(last=False)
+            self._spill(cold_id, cold_session)
+        self._expire()
+    
+    def summaries(self) -> List[Dict[str, Any]]:
+        """
+        Get a summary of every session, in memory and spilled, without reading spill files.
+        
+        Returns:
+            List[Dict[str, Any]]: The session_id, current_stage, created_at and last_updated of each session.
+        """
+        self._expire()
+        summaries = [
+            {field: getattr(session["state"], field) for field in _SUMMARY_FIELDS}
+            for session in self._sessions.values()
+        ]
+        summaries.extend(entry["summary"] for entry in self._spilled.values())
+        return summaries
+
 # Global state storage
-sessions = {}
+SESSION_CACHE = SessionCache()
 
 async def initialize_agent():
     """
@@ -43,6 +254,23 @@ async def initialize_agent():
     
     return llm, sdlc_graph
 
+# Agent shared across requests, initialized on first use
+_AGENT = None
+_AGENT_LOCK = asyncio.Lock()
+
+async def get_agent():
+    """
+    Get the shared SDLC Agent, initializing it once.
+    
+    Returns:
+        tuple: (llm, sdlc_graph)
+    """
+    global _AGENT
+    async with _AGENT_LOCK:
+        if _AGENT is None:
+            _AGENT = await initialize_agent()
+    return _AGENT
+
 async def process_requirements(requirements: str, session_id: Optional[str] = None):
     """
     Process user requirements to start a new SDLC process.
@@ -58,50 +286,50 @@ async def process_requirements(requirements: str, session_id: Optional[str] = No
     if not session_id:
         session_id = str(uuid.uuid4())
     
-    # Initialize LLM
-    llm, _ = await initialize_agent()
+    # Get the shared LLM
+    llm, _ = await get_agent()
     
     # Create initial state
+    now = datetime.now().isoformat()
     state = SDLCState(
         session_id=session_id,
         current_stage=SDLCStage.REQUIREMENTS,
-        requirements=requirements
+        requirements=requirements,
+        created_at=now,
+        last_updated=now
     )
     
-    # Analyze complexity to determine dynamic workflow
-    complexity_analysis = analyze_project_complexity(requirements)
-    
-    # Build dynamic graph based on requirements
-    sdlc_graph = build_sdlc_graph(requirements)
+    # Analyze complexity and build the dynamic graph (memoized per requirements)
+    sdlc_graph, graph_description, complexity_analysis = compile_sdlc_graph(requirements, session_id)
     
     # Add complexity analysis to state
     state.complexity_analysis = complexity_analysis
     
     # Record state
-    sessions[session_id] = {
+    session = {
         "state": state,
         "graph": sdlc_graph,
-        "graph_description": get_dynamic_graph_description(requirements)
+        "graph_description": graph_description
     }
+    SESSION_CACHE.put(session_id, session)
     
     # Run the first step (requirements analysis)
-    result = sdlc_graph.invoke({
+    result = await sdlc_graph.ainvoke({
         "session_id": session_id,
         "current_stage": SDLCStage.REQUIREMENTS,
         "requirements": requirements
     })
     
     # Update state with result
-    for key, value in result.items():
-        if hasattr(state, key):
-            setattr(state, key, value)
+    state = state.model_copy(update={key: value for key, value in result.items() if key in _STATE_FIELDS})
     
     # Apply monitoring
-    monitoring_result = monitor_workflow_progress(state.dict())
+    monitoring_result = await monitor_workflow_progress(MonitorView(state.current_stage, state.history_stages, state.history_timestamps))
     state.monitoring = monitoring_result.get("monitoring")
     
     # Update state in sessions
-    sessions[session_id]["state"] = state
+    session["state"] = state
+    SESSION_CACHE.put(session_id, session)
     
     return state
 
@@ -119,7 +347,7 @@ async def process_feedback(session_id: str, stage: str, approved: bool, comments
         SDLCState: The updated SDLC state.
     """
     # Get session
-    session = sessions.get(session_id)
+    session = SESSION_CACHE.get(session_id)
     if not session:
         raise ValueError(f"Session {session_id} not found.")
     
@@ -128,7 +356,7 @@ async def process_feedback(session_id: str, stage: str, approved: bool, comments
     sdlc_graph = session["graph"]
     
     # Add feedback to state
-    state.add_feedback(stage, comments)
+    state.add_feedback(stage, comments, approved)
     
     if approved:
         # If approved, move to next stage
@@ -136,44 +364,41 @@ async def process_feedback(session_id: str, stage: str, approved: bool, comments
         state.update_stage(next_stage)
         
         # Run the next step
-        current_state = state.dict()
-        result = sdlc_graph.invoke(current_state)
+        current_state = state.model_dump(exclude={"monitoring"})
+        result = await sdlc_graph.ainvoke(current_state)
         
         # Update state with result
-        for key, value in result.items():
-            if hasattr(state, key):
-                setattr(state, key, value)
+        state = state.model_copy(update={key: value for key, value in result.items() if key in _STATE_FIELDS})
     else:
         # If not approved, regenerate the current stage with feedback
-        current_state = state.dict()
-        current_state["feedback"] = {stage: state.feedback.get(stage, [])}
+        current_state = state.model_dump(exclude={"monitoring"})
+        current_state["feedback_comments"] = {stage: state.feedback_comments.get(stage, [])}
         
-        # Determine which node to rerun based on stage
-        stage_node_mapping = {
-            SDLCStage.REQUIREMENTS: "requirements",
-            SDLCStage.USER_STORIES: "user_stories",
-            SDLCStage.DESIGN: "design",
-            SDLCStage.CODE: "code", 
-            SDLCStage.SECURITY: "security",
-            SDLCStage.TESTING: "test"
-        }
+        # The stage's inputs are unchanged, so its node would otherwise reuse the rejected output
+        if stage in STAGE_INPUTS_HASH:
+            current_state[STAGE_INPUTS_HASH[stage]] = None
         
-        node_name = stage_node_mapping.get(stage)
+        # Determine which node to rerun based on stage
+        # Graphs without a security review have no node for the SECURITY stage
+        security_critical = (state.complexity_analysis or {}).get("security_critical")
+        stage_nodes = SECURITY_CRITICAL_STAGE_NODE if security_critical else STAGE_NODE
+        node_name = stage_nodes.get(stage)
         if node_name:
-            # Rerun the specific node with feedback
-            result = sdlc_graph.invoke(current_state, {"target_node": node_name})
+            # Rerun the specific node with feedback; cached generations would just
+            # return the rejected output, so draw fresh ones
+            with bypass_llm_cache():
+                result = await sdlc_graph.ainvoke(current_state, {"target_node": node_name})
             
             # Update state with result
-            for key, value in result.items():
-                if hasattr(state, key):
-                    setattr(state, key, value)
+            state = state.model_copy(update={key: value for key, value in result.items() if key in _STATE_FIELDS})
     
     # Apply monitoring
-    monitoring_result = monitor_workflow_progress(state.dict())
+    monitoring_result = await monitor_workflow_progress(MonitorView(state.current_stage, state.history_stages, state.history_timestamps))
     state.monitoring = monitoring_result.get("monitoring")
     
     # Update state in sessions
-    sessions[session_id]["state"] = state
+    session["state"] = state
+    SESSION_CACHE.put(session_id, session)
     
     return state
 
@@ -188,7 +413,7 @@ async def get_session(session_id: str):
         SDLCState: The SDLC state.
     """
     # Get session
-    session = sessions.get(session_id)
+    session = SESSION_CACHE.get(session_id)
     if not session:
         raise ValueError(f"Session {session_id} not found.")
     
@@ -196,11 +421,12 @@ async def get_session(session_id: str):
     state = session["state"]
     
     # Apply monitoring
-    monitoring_result = monitor_workflow_progress(state.dict())
+    monitoring_result = await monitor_workflow_progress(MonitorView(state.current_stage, state.history_stages, state.history_timestamps))
     state.monitoring = monitoring_result.get("monitoring")
     
     # Update state in sessions
-    sessions[session_id]["state"] = state
+    session["state"] = state
+    SESSION_CACHE.put(session_id, session)
     
     return state
 
@@ -209,9 +435,9 @@ async def get_all_sessions():
     Get a list of all active sessions.
     
     Returns:
-        list: List of SDLCState objects.
+        list: List of session summaries (session_id, current_stage, created_at, last_updated).
     """
-    return [session["state"] for session in sessions.values()]
+    return SESSION_CACHE.summaries()
 
 async def get_monitoring_information(session_id: str):
     """
@@ -224,7 +450,7 @@ async def get_monitoring_information(session_id: str):
         str: Markdown formatted monitoring summary.
     """
     # Get session
-    session = sessions.get(session_id)
+    session = SESSION_CACHE.get(session_id)
     if not session:
         raise ValueError(f"Session {session_id} not found.")
     
@@ -232,14 +458,15 @@ async def get_monitoring_information(session_id: str):
     state = session["state"]
     
     # Apply monitoring
-    monitoring_result = monitor_workflow_progress(state.dict())
+    monitoring_result = await monitor_workflow_progress(MonitorView(state.current_stage, state.history_stages, state.history_timestamps), wait_for_insights=True)
     state.monitoring = monitoring_result.get("monitoring")
     
     # Update state in sessions
-    sessions[session_id]["state"] = state
+    session["state"] = state
+    SESSION_CACHE.put(session_id, session)
     
     # Get monitoring summary
-    summary = get_monitoring_summary(state.dict())
+    summary = get_monitoring_summary({"monitoring": state.monitoring})
     
     return summary
 
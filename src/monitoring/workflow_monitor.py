@@ -1,14 +1,56 @@
 """
 State introspection and self-monitoring for SDLC Agent workflow.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
 import time
 import json
-from collections import defaultdict
+import asyncio
+import orjson
+import hashlib
+import re
+
+import numpy as np
 
 from src.LLMS.google_llm import get_llm
 
+# Maximum number of monitoring snapshots whose insights are kept
+INSIGHT_CACHE_SIZE = 128
+
+# Insights keyed by a hash of the monitoring snapshot they were generated for, least recently used first
+_INSIGHT_CACHE: "OrderedDict[bytes, Any]" = OrderedDict()
+# In-flight insight generation tasks, keyed like _INSIGHT_CACHE
+_PENDING_INSIGHTS: Dict[bytes, asyncio.Task] = {}
+
+# Cheap prefilter for ISO 8601 timestamps, avoiding exception-driven fallbacks
+_ISO_RE = re.compile(r"\d{4}-\d{2}-\d{2}T")
+
+PENDING_INSIGHTS_MESSAGE = "Insights are being generated. Check back shortly."
+
+# LLM used for insight generation, created on first use
+_MONITOR_LLM = None
+
+def _get_monitor_llm():
+    """
+    Get the shared monitoring LLM, creating it on first use.
+    
+    Returns:
+        LLM: The monitoring LLM
+    """
+    global _MONITOR_LLM
+    if _MONITOR_LLM is None:
+        _MONITOR_LLM = get_llm(temperature=0.7, cache=False)
+    return _MONITOR_LLM
+
+@dataclass
+class MonitorView:
+    """Read-only view of the state fields the workflow monitor needs."""
+    current_stage: str
+    history_stages: List[str]
+    history_timestamps: List[str]
+
 def parse_datetime(datetime_str: str) -> datetime:
     """
     Parse datetime string to datetime object.
@@ -19,6 +61,9 @@ def parse_datetime(datetime_str: str) -> datetime:
     Returns:
         datetime: Parsed datetime object
     """
+    if not datetime_str or not _ISO_RE.match(datetime_str):
+        return datetime.now()
+    
     try:
         return datetime.fromisoformat(datetime_str)
     except ValueError:
@@ -35,16 +80,25 @@ def analyze_workflow_efficiency(phase_times: Dict[str, float]) -> Dict[str, Any]
     Returns:
         Dict[str, Any]: Analysis results
     """
-    total_time = sum(phase_times.values())
-    phase_percentages = {phase: (time / total_time) * 100 for phase, time in phase_times.items()}
+    phases = list(phase_times)
+    times = np.fromiter(phase_times.values(), dtype=np.float64, count=len(phases))
+    total_time = float(times.sum())
+    
+    if not phases or total_time <= 0:
+        percentages = np.zeros(len(phases))
+    else:
+        percentages = times * (100.0 / total_time)
+    phase_percentages = dict(zip(phases, percentages.tolist()))
     
     # Identify bottlenecks (phases taking more than 30% of total time)
-    bottlenecks = [phase for phase, percentage in phase_percentages.items() if percentage > 30]
+    bottlenecks = [phases[i] for i in np.nonzero(percentages > 30)[0]]
     
     # Calculate efficiency score
     # Lower score is better, indicating more balanced time distribution
-    time_variance = sum((percentage - (100 / len(phase_times))) ** 2 for percentage in phase_percentages.values())
-    efficiency_score = time_variance / len(phase_times)
+    if phases:
+        efficiency_score = float(((percentages - 100.0 / len(phases)) ** 2).sum() / len(phases))
+    else:
+        efficiency_score = 0.0
     
     return {
         "total_time_seconds": total_time,
@@ -54,79 +108,172 @@ def analyze_workflow_efficiency(phase_times: Dict[str, float]) -> Dict[str, Any]
         "balanced": efficiency_score < 400  # Threshold for considering workflow balanced
     }
 
-def monitor_workflow_progress(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Self-monitoring node to analyze workflow progress.
-    
-    Args:
-        state (Dict[str, Any]): Current workflow state
-        
-    Returns:
-        Dict[str, Any]: Updated state with monitoring data
-    """
-    current_stage = state.get("current_stage", "")
-    history = state.get("history", [])
-    
-    # Calculate time spent in each phase
-    phase_times = defaultdict(float)
-    
-    if len(history) > 1:
-        for i in range(1, len(history)):
-            phase = history[i-1].get("stage", "UNKNOWN")
-            start_time = parse_datetime(history[i-1].get("timestamp", datetime.now().isoformat()))
-            end_time = parse_datetime(history[i].get("timestamp", datetime.now().isoformat()))
-            
-            time_diff = (end_time - start_time).total_seconds()
-            phase_times[phase] += time_diff
-    
-    # Add current phase time
-    if history:
-        last_stage = history[-1].get("stage", "UNKNOWN")
-        start_time = parse_datetime(history[-1].get("timestamp", datetime.now().isoformat()))
-        current_time = datetime.now()
-        
-        time_diff = (current_time - start_time).total_seconds()
-        phase_times[last_stage] += time_diff
-    
-    # Analyze workflow efficiency
-    analysis = analyze_workflow_efficiency(dict(phase_times))
-    
-    # Generate insights using LLM
-    if history and len(phase_times) > 1:
-        prompt = f"""
+_INSIGHT_PROMPT = """
         You are an AI workflow efficiency expert. Analyze the following data about an SDLC workflow:
         
         Current stage: {current_stage}
         
         Time spent in each phase (seconds):
-        {json.dumps(dict(phase_times), indent=2)}
+        {phase_times}
         
         Efficiency analysis:
-        {json.dumps(analysis, indent=2)}
+        {analysis}
         
         History summary:
-        {json.dumps([{"stage": h.get("stage"), "timestamp": h.get("timestamp")} for h in history[-5:]], indent=2)}
+        {history}
         
         Provide 3-5 concise, actionable insights to improve workflow efficiency.
         Format each insight as a bullet point.
         """
+
+def _render_insight_prompt(current_stage: str, phase_times: Dict[str, float], analysis: Dict[str, Any],
+                           recent_history: List[Tuple[str, str]]) -> str:
+    """
+    Render the insight prompt for a monitoring snapshot.
+    
+    Args:
+        current_stage (str): Current SDLC stage
+        phase_times (Dict[str, float]): Time spent in each phase
+        analysis (Dict[str, Any]): Efficiency analysis of the phase times
+        recent_history (List[Tuple[str, str]]): Last (stage, timestamp) history entries
+        
+    Returns:
+        str: The rendered prompt
+    """
+    return _INSIGHT_PROMPT.format(
+        current_stage=current_stage,
+        phase_times=orjson.dumps(phase_times, option=orjson.OPT_INDENT_2).decode(),
+        analysis=orjson.dumps(analysis, option=orjson.OPT_INDENT_2).decode(),
+        history=orjson.dumps(
+            [{"stage": stage, "timestamp": timestamp} for stage, timestamp in recent_history],
+            option=orjson.OPT_INDENT_2
+        ).decode()
+    )
+
+def get_insight_key(current_stage: str, phase_times: Dict[str, float]) -> bytes:
+    """
+    Build a stable cache key for a monitoring snapshot.
+    
+    Args:
+        current_stage (str): Current SDLC stage
+        phase_times (Dict[str, float]): Time spent in each completed phase
+        
+    Returns:
+        bytes: Snapshot digest
+    """
+    snapshot = orjson.dumps({"s": current_stage, "p": sorted(phase_times.items())})
+    return hashlib.blake2b(snapshot).digest()
+
+async def _compute_insights(prompt: str, key: bytes) -> Any:
+    """
+    Generate workflow insights with the LLM and cache them.
+    
+    Args:
+        prompt (str): Insight generation prompt
+        key (bytes): Snapshot cache key
         
-        llm = get_llm(temperature=0.7)
-        insights = llm.invoke(prompt)
+    Returns:
+        Any: Generated insights
+    """
+    try:
+        insights = await _get_monitor_llm().ainvoke(prompt)
+        _INSIGHT_CACHE[key] = insights
+        if len(_INSIGHT_CACHE) > INSIGHT_CACHE_SIZE:
+            _INSIGHT_CACHE.popitem(last=False)
+        return insights
+    finally:
+        _PENDING_INSIGHTS.pop(key, None)
+
+def _log_insight_failure(task: asyncio.Task) -> None:
+    """
+    Log the exception of a background insight task, if it failed.
+    
+    Args:
+        task (asyncio.Task): The finished insight generation task
+    """
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error generating workflow insights: {str(task.exception())}")
+
+async def monitor_workflow_progress(view: MonitorView, wait_for_insights: bool = False) -> Dict[str, Any]:
+    """
+    Self-monitoring node to analyze workflow progress.
+    
+    LLM insights are advisory, so they are generated in a background task and
+    memoized per monitoring snapshot. Until they are ready the insights field
+    holds a placeholder message.
+    
+    Args:
+        view (MonitorView): Stage and stage history of the current workflow state
+        wait_for_insights (bool): Whether to block until insights are generated
+        
+    Returns:
+        Dict[str, Any]: Monitoring data under the "monitoring" key
+    """
+    current_stage = view.current_stage or ""
+    history_stages = view.history_stages or []
+    history_timestamps = view.history_timestamps or []
+    
+    # Calculate time spent in each phase in a single pass: each history entry's
+    # phase lasts until the next entry, and the last one until now
+    phase_index: Dict[str, int] = {}
+    stage_ids = np.fromiter(
+        (phase_index.setdefault(stage or "UNKNOWN", len(phase_index)) for stage in history_stages),
+        dtype=np.intp,
+        count=len(history_stages)
+    )
+    timestamps = np.fromiter(
+        (parse_datetime(timestamp).timestamp() for timestamp in history_timestamps),
+        dtype=np.float64,
+        count=len(history_timestamps)
+    )
+    durations = np.diff(timestamps, append=datetime.now().timestamp())
+    phases = list(phase_index)
+    
+    # Key insights on completed phases so the live phase timer doesn't defeat the cache
+    completed_times = np.bincount(stage_ids[:-1], weights=durations[:-1], minlength=len(phases))
+    insight_key = get_insight_key(current_stage, {
+        phase: time for phase, time in zip(phases, completed_times.tolist()) if time
+    })
+    
+    phase_times = dict(zip(phases, np.bincount(stage_ids, weights=durations, minlength=len(phases)).tolist()))
+    
+    # Analyze workflow efficiency
+    analysis = analyze_workflow_efficiency(phase_times)
+    
+    # Generate insights using LLM
+    if history_stages and len(phase_times) > 1:
+        insights = _INSIGHT_CACHE.get(insight_key)
+        if insights is not None:
+            _INSIGHT_CACHE.move_to_end(insight_key)
+        else:
+            task = _PENDING_INSIGHTS.get(insight_key)
+            if task is None:
+                prompt = _render_insight_prompt(
+                    current_stage,
+                    phase_times,
+                    analysis,
+                    list(zip(history_stages[-5:], history_timestamps[-5:]))
+                )
+                task = asyncio.create_task(_compute_insights(prompt, insight_key))
+                task.add_done_callback(_log_insight_failure)
+                _PENDING_INSIGHTS[insight_key] = task
+            
+            if wait_for_insights:
+                insights = await task
+            else:
+                insights = PENDING_INSIGHTS_MESSAGE
     else:
         insights = "Not enough data to generate meaningful insights yet."
     
-    # Update state with monitoring data
-    new_state = state.copy()
-    new_state["monitoring"] = {
-        "phase_times": dict(phase_times),
-        "efficiency_analysis": analysis,
-        "bottlenecks": analysis.get("bottlenecks", []),
-        "insights": insights,
-        "last_monitored": datetime.now().isoformat()
+    return {
+        "monitoring": {
+            "phase_times": phase_times,
+            "efficiency_analysis": analysis,
+            "bottlenecks": analysis.get("bottlenecks", []),
+            "insights": insights,
+            "last_monitored": datetime.now().isoformat()
+        }
     }
-    
-    return new_state
 
 def get_monitoring_summary(state: Dict[str, Any]) -> str:
     """
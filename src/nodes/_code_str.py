@@ -0,0 +1,48 @@
+"""
+Shared rendering of code artifacts for review and testing prompts.
+"""
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from src.utils.code_compress import compact
+
+# Markdown section for one file in a review or test prompt
+FILE_SECTION = "\n\n### File: {name}\n```\n{code}\n```\n"
+
+# Plain section for one component in a QA execution prompt
+COMPONENT_SECTION = "# Component: {name}\n\n{code}\n\n"
+
+@lru_cache(maxsize=32)
+def _render(items: Tuple[Tuple[str, str], ...], section: str, skip_extensions: Tuple[str, ...],
+            compress: bool) -> str:
+    """Render a tuple of (name, code) pairs; cached so every node reuses the result."""
+    parts = []
+    for name, code in items:
+        if skip_extensions and name.endswith(skip_extensions):
+            continue
+        if compress:
+            code = compact(code, name)
+            if not code:
+                continue
+        parts.append(section.format(name=name, code=code))
+    return "".join(parts)
+
+def render_code_artifacts(artifacts: Dict[str, str], section: str = FILE_SECTION,
+                          skip_extensions: Tuple[str, ...] = (), compress: bool = True) -> str:
+    """
+    Render code artifacts into a single string for an LLM prompt.
+    
+    The result is memoized on the artifact contents, so the security review,
+    test generation and QA nodes of one pipeline run render the code only once.
+    
+    Args:
+        artifacts (Dict[str, str]): Mapping of file name to code.
+        section (str): Format string for one file, with {name} and {code} fields.
+        skip_extensions (Tuple[str, ...]): File extensions to leave out.
+        compress (bool): Whether to drop non-code files and compact the code
+            (see src.utils.code_compress.compact) to save input tokens.
+    
+    Returns:
+        str: The rendered code.
+    """
+    return _render(tuple(artifacts.items()), section, skip_extensions, compress)
@@ -1,12 +1,28 @@
 """
 Code generator node for SDLC Agent.
 """
-from typing import Dict, Any, List, Optional, Tuple
-import json
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from datetime import datetime
+from itertools import islice
+import asyncio
 import re
 
-from src.LLMS.google_llm import get_llm
+from langgraph.config import get_stream_writer
+from src.LLMS.cache import cached_generate, acached_generate_many
+from src.utils.json_utils import parse_json_block
+
+# Supported programming languages, in display order, plus a set for membership tests
+SUPPORTED_LANGUAGES = (
+    "Python",
+    "JavaScript",
+    "TypeScript",
+    "Java",
+    "Go",
+    "Rust",
+    "C#",
+    "PHP"
+)
+_SUPPORTED_LANGUAGE_SET = frozenset(SUPPORTED_LANGUAGES)
 
 def get_supported_languages() -> List[str]:
     """
@@ -15,45 +31,61 @@ def get_supported_languages() -> List[str]:
     Returns:
         List[str]: List of supported languages.
     """
-    return [
-        "Python",
-        "JavaScript",
-        "TypeScript",
-        "Java",
-        "Go",
-        "Rust",
-        "C#",
-        "PHP"
-    ]
+    return list(SUPPORTED_LANGUAGES)
+
+# Languages of files that are not generated as code (lowercase)
+_NON_CODE_LANGUAGES = frozenset({"text", "markdown"})
+
+# Maximum number of code files generated per run
+MAX_GENERATED_FILES = 5
 
-def create_code_generation_prompt(requirements: str, functional_design: str, 
-                               non_functional_design: str, file_name: str,
-                               language: str) -> str:
+# Opening markdown code fence of a generated file, possibly after some prose
+_FENCE_OPEN = re.compile(r"```[a-zA-Z0-9#+]*\n")
+
+# Shared prompt prefix for every generation call in a run. Keeping the large,
+# unchanging documents at the front lets provider prompt caching reuse it.
+CODE_GENERATION_PREAMBLE = """
+    You are an expert software developer working from the following requirements and design brief.
     """
-    Create a prompt for code generation.
+
+def create_project_context(requirements: str, design_brief: str) -> str:
+    """
+    Create the static prompt prefix shared by all code generation prompts.
     
     Args:
         requirements (str): The user requirements.
-        functional_design (str): The functional design document.
-        non_functional_design (str): The non-functional design document.
-        file_name (str): The name of the file to generate.
-        language (str): The programming language to use.
+        design_brief (str): The condensed design brief.
         
     Returns:
-        str: The prompt for code generation.
+        str: The shared prompt prefix.
     """
-    return f"""
-    You are an expert software developer. Generate production-quality code for the following file
-    based on the provided requirements and design documents.
-    
+    return f"""{CODE_GENERATION_PREAMBLE}
     Requirements:
     {requirements}
     
-    Functional Design:
-    {functional_design}
+    Design Brief:
+    {design_brief}
     
-    Non-Functional Design:
-    {non_functional_design}
+    ---
+    """
+
+def create_code_generation_prompt(requirements: str, design_brief: str,
+                                  file_name: str, language: str) -> str:
+    """
+    Create a prompt for code generation.
+    
+    Args:
+        requirements (str): The user requirements.
+        design_brief (str): The condensed design brief.
+        file_name (str): The name of the file to generate.
+        language (str): The programming language to use.
+        
+    Returns:
+        str: The prompt for code generation.
+    """
+    context = create_project_context(requirements, design_brief)
+    return f"""{context}
+    Generate production-quality code for the following file.
     
     File to Generate: {file_name}
     Programming Language: {language}
@@ -110,22 +142,11 @@ def extract_required_files(functional_design: str, non_functional_design: str) -
     """
     
     # Get file list
-    files_str = generate_with_langchain(prompt, temperature=0.2)
+    files_str = cached_generate(prompt, temperature=0.2)
     
-    # Try to parse JSON, use default if parsing fails
-    try:
-        # Extract JSON if it's wrapped in markdown code blocks
-        if "```json" in files_str:
-            json_start = files_str.find("```json") + 7
-            json_end = files_str.find("```", json_start)
-            files_str = files_str[json_start:json_end].strip()
-        elif "```" in files_str:
-            json_start = files_str.find("```") + 3
-            json_end = files_str.find("```", json_start)
-            files_str = files_str[json_start:json_end].strip()
-        
-        required_files = json.loads(files_str)
-    except (json.JSONDecodeError, ValueError):
+    # Parse JSON, use default if parsing fails
+    required_files = parse_json_block(files_str)
+    if required_files is None:
         # Default files if parsing fails
         required_files = [
             {
@@ -188,58 +209,38 @@ def extract_required_files(functional_design: str, non_functional_design: str) -
     
     return required_files
 
-def generate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
-    """
-    Generate content using LLM.
-    
-    Args:
-        prompt (str): The prompt to use.
-        temperature (float): The temperature for generation.
-        
-    Returns:
-        str: The generated content.
-    """
-    llm = get_llm(temperature=temperature)
-    return llm.invoke(prompt)
-
 def clean_code(code: str, language: str) -> str:
     """
     Clean generated code to remove any non-code elements.
     
     Args:
         code (str): The generated code.
-        language (str): The programming language.
+        language (str): The programming language (the fence tag is stripped whatever it is).
         
     Returns:
         str: The cleaned code.
     """
-    # Remove markdown code blocks if present
-    if "```" in code:
-        # Extract language identifier if present
-        language_pattern = r"```([a-zA-Z0-9#+]*)\n"
-        match = re.search(language_pattern, code)
-        if match:
-            language_identifier = match.group(1)
-            # Remove the opening code block with language
-            code = re.sub(r"```" + language_identifier + r"\n", "", code, 1)
-        else:
-            # Remove the opening code block without language
-            code = re.sub(r"```\n", "", code, 1)
-        
-        # Remove the closing code block
-        code = re.sub(r"\n```", "", code)
+    # Keep what lies between the first opening fence and the last closing fence,
+    # dropping any prose around them; fences nested inside the file are kept
+    match = _FENCE_OPEN.search(code)
+    if match:
+        code = code[match.end():]
+        close = code.rfind("```")
+        if close != -1:
+            code = code[:close]
     
     return code.strip()
 
-def code_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def _prepare_code_generation(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Generate code artifacts and update state.
+    Work out which files to generate and build their prompts.
     
     Args:
         state (Dict[str, Any]): The current state.
         
     Returns:
-        Dict[str, Any]: The updated state.
+        Dict[str, Any]: Either an "error" state update, or the "code_files",
+        "prompts" (one per code file, then the README) and "primary_language".
     """
     # Extract design documents from state
     requirements = state.get("requirements", "")
@@ -248,63 +249,54 @@ def code_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     
     if not functional_design or not non_functional_design:
         return {
-            "code_artifacts": {},
-            "current_stage": "DESIGN",  # Go back to design stage
-            "code_generation_error": "Missing design documents."
+            "error": {
+                "code_artifacts": {},
+                "current_stage": "DESIGN",  # Go back to design stage
+                "code_generation_error": "Missing design documents."
+            }
         }
     
     # Extract required files
     required_files = extract_required_files(functional_design, non_functional_design)
     
     # Determine primary language
-    languages = {}
+    language_counts = {}
+    primary_language, best_count = "Python", 0
     for file in required_files:
         lang = file.get("language", "")
-        if lang in get_supported_languages():
-            languages[lang] = languages.get(lang, 0) + 1
-    
-    primary_language = max(languages.items(), key=lambda x: x[1])[0] if languages else "Python"
-    
-    # Generate high-importance files first (limit to 5 to avoid hitting token limits)
-    high_importance_files = [f for f in required_files if f.get("importance", "") == "High"]
-    selected_files = high_importance_files[:5]
-    
-    # Generate code for each file
-    code_artifacts = {}
+        if lang in _SUPPORTED_LANGUAGE_SET:
+            count = language_counts[lang] = language_counts.get(lang, 0) + 1
+            if count > best_count:
+                primary_language, best_count = lang, count
+    
+    # Generate high-importance files first, topped up with medium ones (limit to avoid hitting token limits)
+    selected_files = list(islice(
+        (f for f in required_files if f.get("importance", "") == "High"), MAX_GENERATED_FILES
+    ))
+    if len(selected_files) < MAX_GENERATED_FILES:
+        selected_files.extend(islice(
+            (f for f in required_files if f.get("importance", "") == "Medium"),
+            MAX_GENERATED_FILES - len(selected_files)
+        ))
+    
+    # Build one prompt per code file (skipping non-code files)
+    code_files = []
     for file in selected_files:
-        file_name = file.get("file_name", "")
         language = file.get("language", primary_language)
-        
-        # Skip non-code files
-        if language.lower() in ["text", "markdown"]:
-            continue
-        
-        # Generate code
-        prompt = create_code_generation_prompt(
-            requirements, 
-            functional_design, 
-            non_functional_design,
-            file_name,
-            language
-        )
-        
-        code = generate_with_langchain(prompt, temperature=0.3)
-        cleaned_code = clean_code(code, language)
-        
-        code_artifacts[file_name] = cleaned_code
-    
-    # Generate README.md
-    readme_prompt = f"""
-    Create a comprehensive README.md file for the project described in the following requirements and design documents.
+        if language.lower() not in _NON_CODE_LANGUAGES:
+            code_files.append((file.get("file_name", ""), language))
     
-    Requirements:
-    {requirements}
+    # Older states have no design brief, so fall back to the full documents
+    design_brief = state.get("design_brief") or f"{functional_design}\n\n{non_functional_design}"
     
-    Functional Design:
-    {functional_design}
+    prompts = [
+        create_code_generation_prompt(requirements, design_brief, file_name, language)
+        for file_name, language in code_files
+    ]
     
-    Non-Functional Design:
-    {non_functional_design}
+    # README.md prompt
+    readme_prompt = f"""{create_project_context(requirements, design_brief)}
+    Create a comprehensive README.md file for the project described above.
     
     The README should include:
     1. Project title and overview
@@ -319,15 +311,34 @@ def code_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Format the README using proper Markdown syntax.
     """
     
-    readme = generate_with_langchain(readme_prompt, temperature=0.7)
-    code_artifacts["README.md"] = clean_code(readme, "Markdown")
+    return {
+        "code_files": code_files,
+        "prompts": prompts + [readme_prompt],
+        "primary_language": primary_language
+    }
+
+def _collect_code_artifacts(plan: Dict[str, Any], outputs: List[str]) -> Dict[str, Any]:
+    """
+    Turn generated outputs into code artifacts and the state update.
+    
+    Args:
+        plan (Dict[str, Any]): The result of _prepare_code_generation.
+        outputs (List[str]): The generated contents, in prompt order.
+        
+    Returns:
+        Dict[str, Any]: The updated state.
+    """
+    code_artifacts = {}
+    for (file_name, language), code in zip(plan["code_files"], outputs):
+        code_artifacts[file_name] = clean_code(code, language)
+    code_artifacts["README.md"] = clean_code(outputs[-1], "Markdown")
     
     # Generate code metadata
     code_metadata = {
         "generated_files": list(code_artifacts.keys()),
-        "primary_language": primary_language,
+        "primary_language": plan["primary_language"],
         "file_count": len(code_artifacts),
-        "total_code_lines": sum(len(code.split("\n")) for code in code_artifacts.values()),
+        "total_code_lines": sum(code.count("\n") + 1 for code in code_artifacts.values()),
         "code_generation_timestamp": datetime.now().isoformat()
     }
     
@@ -337,4 +348,61 @@ def code_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "code_metadata": code_metadata,
         "current_stage": "SECURITY",
         "last_updated": datetime.now().isoformat()
-    }
\ No newline at end of file
+    }
+
+def code_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate code artifacts and update state.
+    
+    Args:
+        state (Dict[str, Any]): The current state.
+        
+    Returns:
+        Dict[str, Any]: The updated state.
+    """
+    plan = _prepare_code_generation(state)
+    if "error" in plan:
+        return plan["error"]
+    
+    # Generate all files and the README in a single batch
+    outputs = cached_generate(plan["prompts"], temperature=0.3)
+    return _collect_code_artifacts(plan, outputs)
+
+def _get_progress_writer() -> Optional[Callable[[Any], None]]:
+    """Get the LangGraph custom stream writer, or None outside a graph run."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return None
+
+async def code_generator_node_async(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Asynchronous version of code_generator_node.
+    
+    File prompts are streamed concurrently (bounded by a semaphore) rather than
+    sent as one provider batch, so wall time tracks the slowest file. Each
+    completed file is reported on the graph's custom stream for UI progress.
+    
+    Args:
+        state (Dict[str, Any]): The current state.
+        
+    Returns:
+        Dict[str, Any]: The updated state.
+    """
+    plan = await asyncio.to_thread(_prepare_code_generation, state)
+    if "error" in plan:
+        return plan["error"]
+    
+    file_names = [file_name for file_name, _ in plan["code_files"]] + ["README.md"]
+    writer = _get_progress_writer()
+    
+    def _report(index: int, output: str) -> None:
+        writer({"generated_file": file_names[index], "total_files": len(file_names)})
+    
+    outputs = await acached_generate_many(
+        plan["prompts"],
+        temperature=0.3,
+        stream=True,
+        on_result=_report if writer else None
+    )
+    return _collect_code_artifacts(plan, outputs)
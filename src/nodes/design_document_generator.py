@@ -1,36 +1,18 @@
 """
 Design document generator node for SDLC Agent.
 """
-from typing import Dict, Any, List, Optional
-import json
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+import re
 
-from src.LLMS.google_llm import get_llm
+from src.LLMS.cache import cached_generate
+from src.utils.json_utils import parse_json_block
 
-def create_design_document_prompt(requirements: str, user_stories: str, is_functional: bool = True) -> str:
-    """
-    Create a prompt for design document generation.
-    
-    Args:
-        requirements (str): The user requirements.
-        user_stories (str): The user stories.
-        is_functional (bool): Whether to generate functional or non-functional design.
-        
-    Returns:
-        str: The prompt for design document generation.
-    """
-    if is_functional:
-        return f"""
-        You are an expert software architect. Create a comprehensive functional design document
-        based on the following requirements and user stories.
-        
-        Requirements:
-        {requirements}
-        
-        User Stories:
-        {user_stories}
-        
-        Your functional design document should include:
+# Target length of the design brief handed to code generation
+DESIGN_BRIEF_TOKENS = 800
+
+# Contents of each design document, shared by the single and combined prompts
+FUNCTIONAL_DESIGN_OUTLINE = """
         1. Introduction and purpose
         2. System overview and architecture
         3. Data models and database schema
@@ -42,21 +24,9 @@ def create_design_document_prompt(requirements: str, user_stories: str, is_funct
         9. Error handling
         
         For each diagram or visual element, provide a detailed textual description.
-        Format your response using Markdown with clear sections and code snippets where appropriate.
-        Include placeholders for diagrams that would be helpful.
-        """
-    else:
-        return f"""
-        You are an expert software architect. Create a comprehensive non-functional design document
-        based on the following requirements and user stories.
-        
-        Requirements:
-        {requirements}
-        
-        User Stories:
-        {user_stories}
-        
-        Your non-functional design document should include:
+        Include placeholders for diagrams that would be helpful."""
+
+NON_FUNCTIONAL_DESIGN_OUTLINE = """
         1. Performance requirements
         2. Scalability considerations
         3. Security requirements and approaches
@@ -65,11 +35,105 @@ def create_design_document_prompt(requirements: str, user_stories: str, is_funct
         6. Deployment strategy
         7. Monitoring and observability
         8. Configuration management
-        9. Documentation requirements
+        9. Documentation requirements"""
+
+# Sentinels delimiting each document in the combined design response
+_FUNCTIONAL_RE = re.compile(r"<<<FUNCTIONAL>>>(.*?)<<<END_FUNCTIONAL>>>", re.DOTALL)
+_NON_FUNCTIONAL_RE = re.compile(r"<<<NON_FUNCTIONAL>>>(.*?)<<<END_NON_FUNCTIONAL>>>", re.DOTALL)
+
+def create_design_context(requirements: str, user_stories: str) -> str:
+    """
+    Create the static prompt prefix shared by all design prompts.
+    
+    Args:
+        requirements (str): The user requirements.
+        user_stories (str): The user stories.
+        
+    Returns:
+        str: The shared prompt prefix.
+    """
+    return f"""
+    You are an expert software architect working from the following requirements and user stories.
+    
+    Requirements:
+    {requirements}
+    
+    User Stories:
+    {user_stories}
+    
+    ---
+    """
+
+def create_design_document_prompt(requirements: str, user_stories: str, is_functional: bool = True) -> str:
+    """
+    Create a prompt for design document generation.
+    
+    Args:
+        requirements (str): The user requirements.
+        user_stories (str): The user stories.
+        is_functional (bool): Whether to generate functional or non-functional design.
+        
+    Returns:
+        str: The prompt for design document generation.
+    """
+    context = create_design_context(requirements, user_stories)
+    kind = "functional" if is_functional else "non-functional"
+    outline = FUNCTIONAL_DESIGN_OUTLINE if is_functional else NON_FUNCTIONAL_DESIGN_OUTLINE
+    
+    return f"""{context}
+        Create a comprehensive {kind} design document for the project described above.
+        
+        Your {kind} design document should include:{outline}
         
         Format your response using Markdown with clear sections and code snippets where appropriate.
         """
 
+def create_combined_design_prompt(requirements: str, user_stories: str) -> str:
+    """
+    Create a single prompt that asks for both design documents.
+    
+    Args:
+        requirements (str): The user requirements.
+        user_stories (str): The user stories.
+        
+    Returns:
+        str: The prompt for combined design document generation.
+    """
+    context = create_design_context(requirements, user_stories)
+    return f"""{context}
+        Create two comprehensive design documents for the project described above.
+        
+        The functional design document should include:{FUNCTIONAL_DESIGN_OUTLINE}
+        
+        The non-functional design document should include:{NON_FUNCTIONAL_DESIGN_OUTLINE}
+        
+        Format each document using Markdown with clear sections and code snippets where appropriate.
+        Wrap the documents in these exact markers, with nothing outside them:
+        <<<FUNCTIONAL>>>
+        (functional design document)
+        <<<END_FUNCTIONAL>>>
+        <<<NON_FUNCTIONAL>>>
+        (non-functional design document)
+        <<<END_NON_FUNCTIONAL>>>
+        """
+
+def split_combined_design(output: str) -> Optional[Tuple[str, str]]:
+    """
+    Split a combined design response into its two documents.
+    
+    Args:
+        output (str): The LLM response to the combined design prompt.
+        
+    Returns:
+        Optional[Tuple[str, str]]: The functional and non-functional designs,
+        or None if either marker pair is missing.
+    """
+    functional = _FUNCTIONAL_RE.search(output)
+    non_functional = _NON_FUNCTIONAL_RE.search(output)
+    if not functional or not non_functional:
+        return None
+    return functional.group(1).strip(), non_functional.group(1).strip()
+
 def design_document_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate design documents and update state.
@@ -91,24 +155,32 @@ def design_document_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "current_stage": "USER_STORIES" if not user_stories else "REQUIREMENTS"
         }
     
-    # Create prompts for design document generation
-    functional_prompt = create_design_document_prompt(requirements, user_stories, is_functional=True)
-    non_functional_prompt = create_design_document_prompt(requirements, user_stories, is_functional=False)
+    # Generate both design documents in a single call
+    combined_prompt = create_combined_design_prompt(requirements, user_stories)
+    designs = split_combined_design(cached_generate(combined_prompt, temperature=0.7))
+    
+    # Fall back to separate prompts if the response lost its markers
+    if designs is None:
+        functional_prompt = create_design_document_prompt(requirements, user_stories, is_functional=True)
+        non_functional_prompt = create_design_document_prompt(requirements, user_stories, is_functional=False)
+        designs = cached_generate(
+            [functional_prompt, non_functional_prompt],
+            temperature=0.7
+        )
     
-    # Generate design documents
-    functional_design = generate_with_langchain(functional_prompt, temperature=0.7)
-    non_functional_design = generate_with_langchain(non_functional_prompt, temperature=0.7)
+    functional_design, non_functional_design = designs
     
     # Generate design metadata
     metadata_prompt = f"""
-    Analyze the following functional and non-functional design documents and extract key metadata.
-    
     Functional Design:
     {functional_design}
     
     Non-Functional Design:
     {non_functional_design}
     
+    ---
+    Analyze the functional and non-functional design documents above and extract key metadata.
+    
     Please provide a JSON object with the following structure:
     {{
         "architecture_type": "<architecture_pattern>",
@@ -126,23 +198,26 @@ def design_document_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Provide only the JSON object, no other text.
     """
     
-    # Get metadata
-    metadata_str = generate_with_langchain(metadata_prompt, temperature=0.2)
-    
-    # Try to parse JSON, use default if parsing fails
-    try:
-        # Extract JSON if it's wrapped in markdown code blocks
-        if "```json" in metadata_str:
-            json_start = metadata_str.find("```json") + 7
-            json_end = metadata_str.find("```", json_start)
-            metadata_str = metadata_str[json_start:json_end].strip()
-        elif "```" in metadata_str:
-            json_start = metadata_str.find("```") + 3
-            json_end = metadata_str.find("```", json_start)
-            metadata_str = metadata_str[json_start:json_end].strip()
-        
-        design_metadata = json.loads(metadata_str)
-    except (json.JSONDecodeError, ValueError):
+    # Condensed design brief, so downstream code generation prompts stay small
+    brief_prompt = f"""
+    Functional Design:
+    {functional_design}
+    
+    Non-Functional Design:
+    {non_functional_design}
+    
+    ---
+    Summarize the design documents above into a design brief of at most {DESIGN_BRIEF_TOKENS} tokens.
+    Preserve the file and component list, API endpoints, data models, and key technology choices.
+    Format the brief using Markdown.
+    """
+    
+    # Get metadata and the design brief in one batch
+    metadata_str, design_brief = cached_generate([metadata_prompt, brief_prompt], temperature=0.2)
+    
+    # Parse JSON, use default if parsing fails
+    design_metadata = parse_json_block(metadata_str)
+    if design_metadata is None:
         # Default values if parsing fails
         design_metadata = {
             "architecture_type": "Microservices",
@@ -162,20 +237,7 @@ def design_document_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "functional_design": functional_design,
         "non_functional_design": non_functional_design,
         "design_metadata": design_metadata,
+        "design_brief": design_brief,
         "current_stage": "CODE",
         "last_updated": datetime.now().isoformat()
     }
-
-def generate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
-    """
-    Generate content using LLM.
-    
-    Args:
-        prompt (str): The prompt to use.
-        temperature (float): The temperature for generation.
-        
-    Returns:
-        str: The generated content.
-    """
-    llm = get_llm(temperature=temperature)
-    return llm.invoke(prompt)
\ No newline at end of file
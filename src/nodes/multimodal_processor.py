@@ -2,7 +2,8 @@
 Multi-modal node processor for handling text and images in design reviews.
 """
 import base64
-import os
+import asyncio
+import re
 from typing import Dict, List, Any, Optional
 import io
 from datetime import datetime
@@ -12,6 +13,28 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from src.LLMS.google_llm import get_llm
 
+def _encode_blank_diagram(width: int = 800, height: int = 600) -> str:
+    """
+    Encode a blank placeholder diagram as a base64 PNG, entirely in memory.
+    
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        
+    Returns:
+        str: The base64 encoded PNG
+    """
+    image = Image.new('RGB', (width, height), color=(255, 255, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=False, compress_level=1)
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+# A diagram section: a "## Diagram:" header up to the next "##" header or the end
+_DIAGRAM_SECTION = re.compile(r"^[ \t]*#{2,}[ \t]*Diagram:.*?(?=^[ \t]*##|\Z)", re.DOTALL | re.MULTILINE)
+
+# Placeholder diagram image, encoded once at import
+_BLANK_DIAGRAM_B64 = _encode_blank_diagram()
+
 def extract_diagrams_from_design(design_document: str) -> List[str]:
     """
     Extract diagram descriptions from design document and convert to image.
@@ -20,58 +43,20 @@ def extract_diagrams_from_design(design_document: str) -> List[str]:
     2. Use a text-to-diagram tool to generate actual diagrams
     3. Return these as base64 encoded images
     
+    The document is scanned in place with one regex sweep; it is never split
+    into lines, so callers should pass the original string.
+    
     Args:
         design_document (str): The design document text
         
     Returns:
         List[str]: List of base64 encoded diagram images
     """
-    # Create a diagram folder if it doesn't exist
-    diagrams_dir = os.path.join(os.path.dirname(__file__), "..", "..", "diagrams")
-    os.makedirs(diagrams_dir, exist_ok=True)
-    
     # Extract diagram sections - in a real implementation this would be more sophisticated
-    diagram_sections = []
-    lines = design_document.split("\n")
-    current_section = []
-    in_diagram_section = False
-    
-    for line in lines:
-        if "## Diagram:" in line or "### Diagram:" in line:
-            in_diagram_section = True
-            if current_section:
-                diagram_sections.append("\n".join(current_section))
-                current_section = []
-        elif in_diagram_section and line.strip() and "##" in line and not "Diagram" in line:
-            in_diagram_section = False
-            if current_section:
-                diagram_sections.append("\n".join(current_section))
-                current_section = []
-        
-        if in_diagram_section and line.strip():
-            current_section.append(line)
-    
-    # Add the last section if needed
-    if current_section:
-        diagram_sections.append("\n".join(current_section))
-    
-    # Generate simple placeholder images for diagrams
-    base64_images = []
-    for i, section in enumerate(diagram_sections):
-        # Create a simple image with text
-        width, height = 800, 600
-        image = Image.new('RGB', (width, height), color=(255, 255, 255))
-        
-        # Save the image
-        img_path = os.path.join(diagrams_dir, f"diagram_{i}.png")
-        image.save(img_path)
-        
-        # Convert to base64
-        with open(img_path, "rb") as img_file:
-            base64_image = base64.b64encode(img_file.read()).decode('utf-8')
-            base64_images.append(base64_image)
+    diagram_sections = [match.group(0) for match in _DIAGRAM_SECTION.finditer(design_document)]
     
-    return base64_images
+    # Every diagram is currently the same blank placeholder image
+    return [_BLANK_DIAGRAM_B64] * len(diagram_sections)
 
 def get_multimodal_llm():
     """
@@ -85,27 +70,19 @@ def get_multimodal_llm():
     # For now, we'll use the standard LLM with a special prompt
     return get_llm()
 
-def process_design_with_image(state: Dict[str, Any]) -> Dict[str, Any]:
+def create_design_review_prompt(design_document: str, diagram_count: int) -> str:
     """
-    Process design documents with accompanying diagrams.
+    Create a prompt for reviewing a design document with its diagrams.
     
     Args:
-        state (Dict[str, Any]): The current state
+        design_document (str): The design document text
+        diagram_count (int): Number of diagrams extracted from the document
         
     Returns:
-        Dict[str, Any]: Updated state with design review
+        str: The design review prompt
     """
-    # Extract design document from state
-    design_document = state.get("functional_design", "")
-    if not design_document:
-        return {"design_review": "No design document available for review."}
-    
-    # Extract diagrams from design
-    diagrams = extract_diagrams_from_design(design_document)
-    
-    # Prepare design review prompt
-    diagram_descriptions = [f"[Diagram {i+1}]" for i in range(len(diagrams))]
-    review_prompt = f"""
+    diagram_descriptions = [f"[Diagram {i+1}]" for i in range(diagram_count)]
+    return f"""
     You are an expert software architect reviewing a design document with associated diagrams.
     
     Design Document:
@@ -123,6 +100,25 @@ def process_design_with_image(state: Dict[str, Any]) -> Dict[str, Any]:
     
     Format your response using Markdown with clear sections.
     """
+
+def process_design_with_image(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process design documents with accompanying diagrams.
+    
+    Args:
+        state (Dict[str, Any]): The current state
+        
+    Returns:
+        Dict[str, Any]: Updated state with design review
+    """
+    # Extract design document from state
+    design_document = state.get("functional_design", "")
+    if not design_document:
+        return {"design_review": "No design document available for review."}
+    
+    # Extract diagrams from design
+    diagrams = extract_diagrams_from_design(design_document)
+    review_prompt = create_design_review_prompt(design_document, len(diagrams))
     
     # Get LLM response
     llm = get_multimodal_llm()
@@ -137,12 +133,26 @@ async def process_design_with_image_async(state: Dict[str, Any]) -> Dict[str, An
     """
     Asynchronous version of process_design_with_image.
     
+    Diagram extraction runs in a worker thread and the LLM call is awaited,
+    so concurrent reviews don't block the event loop.
+    
     Args:
         state (Dict[str, Any]): The current state
         
     Returns:
         Dict[str, Any]: Updated state with design review
     """
-    # This would be implemented with async calls to the LLM
-    # For now, we'll use the synchronous version
-    return process_design_with_image(state)
\ No newline at end of file
+    # Extract design document from state
+    design_document = state.get("functional_design", "")
+    if not design_document:
+        return {"design_review": "No design document available for review."}
+    
+    # Extract diagrams from design off the event loop
+    diagrams = await asyncio.to_thread(extract_diagrams_from_design, design_document)
+    review_prompt = create_design_review_prompt(design_document, len(diagrams))
+    
+    # Get LLM response
+    llm = get_multimodal_llm()
+    response = await llm.ainvoke(review_prompt)
+    
+    return {"design_review": response}
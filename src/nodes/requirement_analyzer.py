@@ -2,10 +2,10 @@
 Requirement analysis node for SDLC Agent.
 """
 from typing import Dict, Any, List, Optional
-import json
 from datetime import datetime
 
-from src.LLMS.google_llm import get_llm
+from src.LLMS.cache import cached_generate
+from src.utils.json_utils import parse_json_block
 
 def create_requirement_analysis_prompt(requirements: str) -> str:
     """
@@ -18,12 +18,13 @@ def create_requirement_analysis_prompt(requirements: str) -> str:
         str: The prompt for requirement analysis.
     """
     return f"""
-    You are an expert software requirements analyst. Analyze the following requirements
-    and provide a structured analysis with categories, priorities, and stakeholders.
-    
     Requirements:
     {requirements}
     
+    ---
+    You are an expert software requirements analyst. Analyze the requirements above
+    and provide a structured analysis with categories, priorities, and stakeholders.
+    
     Your analysis should include:
     1. A summary of the core requirements
     2. Categorized requirements (functional, non-functional, etc.)
@@ -35,20 +36,6 @@ def create_requirement_analysis_prompt(requirements: str) -> str:
     Format your response using Markdown with clear sections.
     """
 
-def generate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
-    """
-    Generate content using LLM.
-    
-    Args:
-        prompt (str): The prompt to use.
-        temperature (float): The temperature for generation.
-        
-    Returns:
-        str: The generated content.
-    """
-    llm = get_llm(temperature=temperature)
-    return llm.invoke(prompt)
-
 def requirement_analysis_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze requirements and update state.
@@ -71,18 +58,20 @@ def requirement_analysis_node(state: Dict[str, Any]) -> Dict[str, Any]:
     prompt = create_requirement_analysis_prompt(requirements)
     
     # Generate analysis
-    analysis = generate_with_langchain(prompt, temperature=0.5)
+    analysis = cached_generate(prompt, temperature=0.5)
     
     # Extract important elements from analysis for complexity assessment
     complexity_prompt = f"""
-    Based on the following requirements and analysis, assess the project complexity.
-    
     Requirements:
     {requirements}
     
+    ---
     Analysis:
     {analysis}
     
+    ---
+    Based on the requirements and analysis above, assess the project complexity.
+    
     Please provide a JSON object with the following attributes:
     {{
         "complexity": "low"|"medium"|"high",
@@ -101,22 +90,11 @@ def requirement_analysis_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     
     # Get complexity assessment
-    complexity_assessment_str = generate_with_langchain(complexity_prompt, temperature=0.2)
+    complexity_assessment_str = cached_generate(complexity_prompt, temperature=0.2)
     
-    # Try to parse JSON, use default if parsing fails
-    try:
-        # Extract JSON if it's wrapped in markdown code blocks
-        if "```json" in complexity_assessment_str:
-            json_start = complexity_assessment_str.find("```json") + 7
-            json_end = complexity_assessment_str.find("```", json_start)
-            complexity_assessment_str = complexity_assessment_str[json_start:json_end].strip()
-        elif "```" in complexity_assessment_str:
-            json_start = complexity_assessment_str.find("```") + 3
-            json_end = complexity_assessment_str.find("```", json_start)
-            complexity_assessment_str = complexity_assessment_str[json_start:json_end].strip()
-        
-        complexity_assessment = json.loads(complexity_assessment_str)
-    except (json.JSONDecodeError, ValueError):
+    # Parse JSON, use default if parsing fails
+    complexity_assessment = parse_json_block(complexity_assessment_str)
+    if complexity_assessment is None:
         # Default values if parsing fails
         complexity_assessment = {
             "complexity": "medium",
@@ -2,10 +2,34 @@
 Security review node for SDLC Agent.
 """
 from typing import Dict, Any, List, Optional
-import json
+import copy
 from datetime import datetime
 
-from src.LLMS.google_llm import get_llm
+from src.LLMS.cache import acached_generate, acached_generate_json, inputs_fingerprint
+from src.utils.json_utils import parse_json_block, split_json_tail
+from src.nodes._code_str import render_code_artifacts
+
+# JSON structure of a findings categorization
+CATEGORIZATION_SCHEMA = """{
+    "total_findings": <number>,
+    "risk_levels": {
+        "critical": <number>,
+        "high": <number>,
+        "medium": <number>,
+        "low": <number>
+    },
+    "vulnerability_categories": [
+        {
+            "category": "<category_name>",
+            "count": <number>,
+            "highest_risk": "<risk_level>"
+        },
+        ...
+    ],
+    "most_affected_files": ["<file_name>", ...],
+    "overall_risk_rating": "critical"|"high"|"medium"|"low",
+    "remediation_priority": ["<vulnerability1>", "<vulnerability2>", ...]
+}"""
 
 def create_security_review_prompt(code_artifacts: Dict[str, str], requirements: str) -> str:
     """
@@ -18,21 +42,21 @@ def create_security_review_prompt(code_artifacts: Dict[str, str], requirements:
     Returns:
         str: The prompt for security review.
     """
-    # Convert code artifacts to a single formatted string
-    code_str = ""
-    for file_name, code in code_artifacts.items():
-        code_str += f"\n\n### File: {file_name}\n```\n{code}\n```\n"
+    # Convert code artifacts to a single compacted string
+    code_str = render_code_artifacts(code_artifacts)
     
     return f"""
-    You are an expert security reviewer. Analyze the following code for security vulnerabilities
-    and provide a comprehensive security assessment.
-    
     Requirements:
     {requirements}
     
+    ---
     Code:
     {code_str}
     
+    ---
+    You are an expert security reviewer. Analyze the code above for security vulnerabilities
+    and provide a comprehensive security assessment.
+    
     Your security assessment should include:
     1. Executive summary
     2. Risk rating (Critical, High, Medium, Low)
@@ -41,114 +65,137 @@ def create_security_review_prompt(code_artifacts: Dict[str, str], requirements:
     5. Security best practices that should be implemented
     
     Format your response using Markdown with clear sections.
+    
+    After the report, categorize your findings in a fenced ```json block with this structure:
+    {CATEGORIZATION_SCHEMA}
     """
 
-def categorize_findings(security_findings: str) -> Dict[str, Any]:
+def create_categorization_prompt(security_findings: str) -> str:
     """
-    Categorize security findings.
+    Create a prompt for categorizing security findings.
     
     Args:
         security_findings (str): The security findings.
         
     Returns:
-        Dict[str, Any]: Categorized findings.
+        str: The prompt for findings categorization.
     """
-    prompt = f"""
+    return f"""
     Analyze the following security findings and categorize them.
     
     Security Findings:
     {security_findings}
     
     Please provide a JSON object with the following structure:
-    {{
-        "total_findings": <number>,
-        "risk_levels": {{
-            "critical": <number>,
-            "high": <number>,
-            "medium": <number>,
-            "low": <number>
-        }},
-        "vulnerability_categories": [
-            {{
-                "category": "<category_name>",
-                "count": <number>,
-                "highest_risk": "<risk_level>"
-            }},
-            ...
-        ],
-        "most_affected_files": ["<file_name>", ...],
-        "overall_risk_rating": "critical"|"high"|"medium"|"low",
-        "remediation_priority": ["<vulnerability1>", "<vulnerability2>", ...]
-    }}
+    {CATEGORIZATION_SCHEMA}
     
     Provide only the JSON object, no other text.
     """
+
+# Categorization used when the findings cannot be categorized
+DEFAULT_CATEGORIZATION = {
+    "total_findings": 5,
+    "risk_levels": {
+        "critical": 0,
+        "high": 1,
+        "medium": 2,
+        "low": 2
+    },
+    "vulnerability_categories": [
+        {
+            "category": "Input Validation",
+            "count": 2,
+            "highest_risk": "high"
+        },
+        {
+            "category": "Authentication",
+            "count": 1,
+            "highest_risk": "medium"
+        },
+        {
+            "category": "Error Handling",
+            "count": 2,
+            "highest_risk": "low"
+        }
+    ],
+    "most_affected_files": ["app.py", "utils.py"],
+    "overall_risk_rating": "medium",
+    "remediation_priority": ["Input validation", "Authentication", "Error handling"]
+}
+
+# Findings shorter than this carry nothing worth extracting, so the LLM call is skipped
+MIN_FINDINGS_LENGTH = 200
+
+def parse_categorized_findings(categorization_str: str) -> Dict[str, Any]:
+    """
+    Parse the findings categorization returned by the LLM.
     
-    # Get categorization
-    categorization_str = generate_with_langchain(prompt, temperature=0.2)
-    
-    # Try to parse JSON, use default if parsing fails
-    try:
-        # Extract JSON if it's wrapped in markdown code blocks
-        if "```json" in categorization_str:
-            json_start = categorization_str.find("```json") + 7
-            json_end = categorization_str.find("```", json_start)
-            categorization_str = categorization_str[json_start:json_end].strip()
-        elif "```" in categorization_str:
-            json_start = categorization_str.find("```") + 3
-            json_end = categorization_str.find("```", json_start)
-            categorization_str = categorization_str[json_start:json_end].strip()
+    Args:
+        categorization_str (str): The LLM response.
         
-        categorized_findings = json.loads(categorization_str)
-    except (json.JSONDecodeError, ValueError):
+    Returns:
+        Dict[str, Any]: Categorized findings, or defaults if parsing fails.
+    """
+    # Parse JSON, use default if parsing fails
+    categorized_findings = parse_json_block(categorization_str)
+    if categorized_findings is None:
         # Default values if parsing fails
-        categorized_findings = {
-            "total_findings": 5,
-            "risk_levels": {
-                "critical": 0,
-                "high": 1,
-                "medium": 2,
-                "low": 2
-            },
-            "vulnerability_categories": [
-                {
-                    "category": "Input Validation",
-                    "count": 2,
-                    "highest_risk": "high"
-                },
-                {
-                    "category": "Authentication",
-                    "count": 1,
-                    "highest_risk": "medium"
-                },
-                {
-                    "category": "Error Handling",
-                    "count": 2,
-                    "highest_risk": "low"
-                }
-            ],
-            "most_affected_files": ["app.py", "utils.py"],
-            "overall_risk_rating": "medium",
-            "remediation_priority": ["Input validation", "Authentication", "Error handling"]
-        }
+        categorized_findings = copy.deepcopy(DEFAULT_CATEGORIZATION)
     
     return categorized_findings
 
-def generate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
+async def acategorize_findings(security_findings: str) -> Dict[str, Any]:
     """
-    Generate content using LLM.
+    Categorize security findings with the extraction model.
     
     Args:
-        prompt (str): The prompt to use.
-        temperature (float): The temperature for generation.
+        security_findings (str): The security findings.
         
     Returns:
-        str: The generated content.
+        Dict[str, Any]: Categorized findings.
     """
-    llm = get_llm(temperature=temperature)
-    return llm.invoke(prompt)
+    # Nothing to extract from empty or placeholder input
+    if len(security_findings.strip()) < MIN_FINDINGS_LENGTH or "No code artifacts" in security_findings:
+        return copy.deepcopy(DEFAULT_CATEGORIZATION)
+    
+    categorization_str = await acached_generate_json(create_categorization_prompt(security_findings))
+    return parse_categorized_findings(categorization_str)
 
-def security_review_node(state: Dict[str, Any]) -> Dict[str, Any]:
+def security_review_inputs_hash(code_artifacts: Dict[str, str], requirements: str) -> str:
+    """
+    Hash the inputs of a security review.
+    
+    Args:
+        code_artifacts (Dict[str, str]): The code artifacts.
+        requirements (str): The user requirements.
+        
+    Returns:
+        str: The inputs hash.
+    """
+    return inputs_fingerprint(requirements, *(part for item in sorted(code_artifacts.items()) for part in item))
+
+def reuse_security_review(state: Dict[str, Any], inputs_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the previous security review if it was made for the same inputs.
+    
+    Args:
+        state (Dict[str, Any]): The current state.
+        inputs_hash (str): Hash of the current review inputs.
+        
+    Returns:
+        Optional[Dict[str, Any]]: The state update reusing the previous review, or None.
+    """
+    if state.get("security_review_inputs_hash") != inputs_hash or not state.get("security_findings"):
+        return None
+    
+    return {
+        "security_findings": state["security_findings"],
+        "security_metadata": state.get("security_metadata"),
+        "current_stage": "TESTING",
+        "last_updated": datetime.now().isoformat()
+    }
+
+async def security_review_node_async(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Perform security review and update state.
     
@@ -169,19 +216,25 @@ def security_review_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "security_review_error": "Missing code artifacts."
         }
     
-    # Create prompt for security review
-    prompt = create_security_review_prompt(code_artifacts, requirements)
+    # Reuse the previous review on retries with unchanged inputs
+    inputs_hash = security_review_inputs_hash(code_artifacts, requirements)
+    previous_review = reuse_security_review(state, inputs_hash)
+    if previous_review is not None:
+        return previous_review
     
-    # Generate security findings
-    security_findings = generate_with_langchain(prompt, temperature=0.7)
+    # Generate security findings with their categorization in the trailing JSON block
+    prompt = create_security_review_prompt(code_artifacts, requirements)
+    security_findings, categorized_findings = split_json_tail(await acached_generate(prompt, temperature=0.7), DEFAULT_CATEGORIZATION)
     
-    # Categorize findings
-    categorized_findings = categorize_findings(security_findings)
+    # Categorize findings separately only if the JSON block is missing
+    if categorized_findings is None:
+        categorized_findings = await acategorize_findings(security_findings)
     
     # Update state with security findings and categorization
     return {
         "security_findings": security_findings,
         "security_metadata": categorized_findings,
+        "security_review_inputs_hash": inputs_hash,
         "current_stage": "TESTING",
         "last_updated": datetime.now().isoformat()
-    }
\ No newline at end of file
+    }
@@ -1,10 +1,137 @@
 """
 Node for generating and executing test cases.
 """
+import re
 from typing import Any, Dict
-from langchain.chains import LLMChain
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from src.state.sdlc_state import SDLCStage
 from src.vectorstore.vectorstore import add_to_vectorstore
+from src.nodes._code_str import render_code_artifacts, COMPONENT_SECTION
+
+# Prompt for the test cases of a single component
+COMPONENT_TEST_TEMPLATE = """
+        Generate comprehensive test cases for the following {component} component code:
+        
+        {code}
+        
+        Include the following types of tests where applicable:
+        1. Unit tests
+        2. Integration tests
+        3. Functional tests
+        4. Edge case tests
+        
+        For each test case, provide:
+        - Test ID
+        - Description
+        - Preconditions
+        - Test steps
+        - Expected results
+        - Actual code implementation of the test (in the appropriate testing framework)
+        """
+
+# Prompt for the test cases of several components in one call
+BATCH_TEST_TEMPLATE = """
+        Generate comprehensive test cases for each of the following components. Each
+        component is given under a "## <component>" header with its code:
+        {all_code}
+        
+        For each component below, emit a "## <component>" section (using the exact
+        component name) with its test cases. Include the following types of tests where applicable:
+        1. Unit tests
+        2. Integration tests
+        3. Functional tests
+        4. Edge case tests
+        
+        For each test case, provide:
+        - Test ID
+        - Description
+        - Preconditions
+        - Test steps
+        - Expected results
+        - Actual code implementation of the test (in the appropriate testing framework)
+        """
+
+# Prompt for revising test cases from feedback
+FEEDBACK_TEMPLATE = """
+    You previously generated the following test cases:
+    
+    {test_cases}
+    
+    However, there was feedback that needs to be incorporated:
+    
+    {feedback}
+    
+    Please update the test cases, incorporating the feedback. Ensure your test cases are:
+    1. Comprehensive
+    2. Well-structured
+    3. Address all the feedback points
+    
+    Provide the complete updated test cases.
+    """
+
+# Prompt for simulating test execution against the code
+QA_EXECUTION_TEMPLATE = """
+    Simulate the execution of the following test cases against the code:
+    
+    Test Cases:
+    {test_cases}
+    
+    Code:
+    {code}
+    
+    Provide a detailed test execution report including:
+    1. Test case ID
+    2. Status (Passed/Failed)
+    3. Execution details
+    4. Issues found (if any)
+    5. Recommendations for fixing failed tests
+    
+    Format the report in a clear, readable structure.
+    """
+
+# Templates are parsed once; each call pipes them into the caller's LLM
+COMPONENT_TEST_PROMPT = PromptTemplate.from_template(COMPONENT_TEST_TEMPLATE)
+BATCH_TEST_PROMPT = PromptTemplate.from_template(BATCH_TEST_TEMPLATE)
+FEEDBACK_PROMPT = PromptTemplate.from_template(FEEDBACK_TEMPLATE)
+QA_EXECUTION_PROMPT = PromptTemplate.from_template(QA_EXECUTION_TEMPLATE)
+
+_PARSER = StrOutputParser()
+
+# "## <component>" section headers in a batched test case response
+_COMPONENT_HEADER_RE = re.compile(r"^##[ \t]+(.+?)[ \t]*$", re.MULTILINE)
+
+def split_component_test_cases(response: str, code_artifacts: Dict[str, str]) -> str:
+    """
+    Reassemble a batched test case response into per-component sections.
+    
+    Args:
+        response (str): The LLM response with one "## <component>" section per component.
+        code_artifacts (Dict[str, str]): The code artifacts the tests were generated for.
+        
+    Returns:
+        str: The test cases, one "# Test Cases for <component>" section per component,
+        or the raw response if it has no recognizable component sections.
+    """
+    # Only headers naming a component delimit sections, so sub-headers stay in their section
+    headers = [
+        (header, header.group(1).strip("`*"))
+        for header in _COMPONENT_HEADER_RE.finditer(response)
+        if header.group(1).strip("`*") in code_artifacts
+    ]
+    
+    sections = {}
+    for i, (header, component) in enumerate(headers):
+        end = headers[i + 1][0].start() if i + 1 < len(headers) else len(response)
+        sections[component] = response[header.end():end].strip()
+    
+    if not sections:
+        return response
+    
+    return "".join(
+        f"# Test Cases for {component}\n\n{component_test_cases}\n\n"
+        for component, component_test_cases in sections.items()
+    )
 
 def generate_test_cases(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Dict[str, Any]:
     """
@@ -21,49 +148,37 @@ def generate_test_cases(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Di
     # Check if code artifacts are present
     if not state.get("code_artifacts"):
         return {
-            **state,
             "error": "Code not generated",
-            "execution_order": state.get("execution_order", []) + ["generate_test_cases"]
+            "execution_order": ["generate_test_cases"]
         }
     
-    # Generate test cases for each component
-    test_cases = ""
+    code_artifacts = state["code_artifacts"]
     
-    for component, code in state["code_artifacts"].items():
-        template = """
-        Generate comprehensive test cases for the following {component} component code:
+    # A single component keeps the dedicated per-component prompt
+    if len(code_artifacts) == 1:
+        component, code = next(iter(code_artifacts.items()))
+        chain = COMPONENT_TEST_PROMPT | llm | _PARSER
         
-        {code}
-        
-        Include the following types of tests where applicable:
-        1. Unit tests
-        2. Integration tests
-        3. Functional tests
-        4. Edge case tests
-        
-        For each test case, provide:
-        - Test ID
-        - Description
-        - Preconditions
-        - Test steps
-        - Expected results
-        - Actual code implementation of the test (in the appropriate testing framework)
-        """
+        # Execute the chain
+        component_test_cases = chain.invoke({
+            "component": component,
+            "code": code
+        })
         
-        prompt = {
-            "input_variables": ["component", "code"],
-            "template": template
-        }
+        test_cases = f"# Test Cases for {component}\n\n{component_test_cases}\n\n"
+    else:
+        # Generate test cases for all components in one call
+        all_code = "".join(
+            f"\n\n## {component}\n```\n{code}\n```\n"
+            for component, code in code_artifacts.items()
+        )
         
-        chain = LLMChain(llm=llm, prompt=prompt)
+        chain = BATCH_TEST_PROMPT | llm | _PARSER
         
         # Execute the chain
-        component_test_cases = chain.run(
-            component=component,
-            code=code
-        )
+        response = chain.invoke({"all_code": all_code})
         
-        test_cases += f"# Test Cases for {component}\n\n{component_test_cases}\n\n"
+        test_cases = split_component_test_cases(response, code_artifacts)
     
     # Add to vector store for future reference
     add_to_vectorstore(
@@ -77,10 +192,9 @@ def generate_test_cases(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Di
     
     # Update the state
     return {
-        **state,
         "test_cases": test_cases,
         "current_stage": SDLCStage.TESTING.name,
-        "execution_order": state.get("execution_order", []) + ["generate_test_cases"]
+        "execution_order": ["generate_test_cases"]
     }
 
 def process_test_feedback(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Dict[str, Any]:
@@ -98,16 +212,14 @@ def process_test_feedback(state: Dict[str, Any], llm: Any, vectorstore: Any) ->
     # Check if test cases and feedback are present
     if not state.get("test_cases"):
         return {
-            **state,
             "error": "Test cases not generated",
-            "execution_order": state.get("execution_order", []) + ["process_test_feedback"]
+            "execution_order": ["process_test_feedback"]
         }
     
     if not state.get("testing_feedback"):
         return {
-            **state,
             "error": "No feedback provided for test cases",
-            "execution_order": state.get("execution_order", []) + ["process_test_feedback"]
+            "execution_order": ["process_test_feedback"]
         }
     
     feedback = state["testing_feedback"]
@@ -115,41 +227,18 @@ def process_test_feedback(state: Dict[str, Any], llm: Any, vectorstore: Any) ->
     # If feedback is approved, move to the next stage
     if feedback.get("approved", False):
         return {
-            **state,
             "current_stage": SDLCStage.COMPLETE.name,
-            "execution_order": state.get("execution_order", []) + ["process_test_feedback"]
+            "execution_order": ["process_test_feedback"]
         }
     
     # If feedback is not approved, update the test cases
-    template = """
-    You previously generated the following test cases:
-    
-    {test_cases}
-    
-    However, there was feedback that needs to be incorporated:
-    
-    {feedback}
-    
-    Please update the test cases, incorporating the feedback. Ensure your test cases are:
-    1. Comprehensive
-    2. Well-structured
-    3. Address all the feedback points
-    
-    Provide the complete updated test cases.
-    """
-    
-    prompt = {
-        "input_variables": ["test_cases", "feedback"],
-        "template": template
-    }
-    
-    chain = LLMChain(llm=llm, prompt=prompt)
+    chain = FEEDBACK_PROMPT | llm | _PARSER
     
     # Execute the chain
-    updated_test_cases = chain.run(
-        test_cases=state["test_cases"],
-        feedback=feedback.get("comments", "")
-    )
+    updated_test_cases = chain.invoke({
+        "test_cases": state["test_cases"],
+        "feedback": feedback.get("comments", "")
+    })
     
     # Add to vector store for future reference
     add_to_vectorstore(
@@ -164,9 +253,8 @@ def process_test_feedback(state: Dict[str, Any], llm: Any, vectorstore: Any) ->
     
     # Update the state
     return {
-        **state,
         "test_cases": updated_test_cases,
-        "execution_order": state.get("execution_order", []) + ["process_test_feedback"]
+        "execution_order": ["process_test_feedback"]
     }
 
 def execute_qa_testing(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Dict[str, Any]:
@@ -184,48 +272,21 @@ def execute_qa_testing(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Dic
     # Check if test cases are present
     if not state.get("test_cases"):
         return {
-            **state,
             "error": "Test cases not generated",
-            "execution_order": state.get("execution_order", []) + ["execute_qa_testing"]
+            "execution_order": ["execute_qa_testing"]
         }
     
-    # Simulate test execution by analyzing the test cases and code
-    template = """
-    Simulate the execution of the following test cases against the code:
-    
-    Test Cases:
-    {test_cases}
-    
-    Code:
-    {code}
-    
-    Provide a detailed test execution report including:
-    1. Test case ID
-    2. Status (Passed/Failed)
-    3. Execution details
-    4. Issues found (if any)
-    5. Recommendations for fixing failed tests
-    
-    Format the report in a clear, readable structure.
-    """
-    
     # Combine all code artifacts
-    combined_code = ""
-    for component, code in state["code_artifacts"].items():
-        combined_code += f"# Component: {component}\n\n{code}\n\n"
+    combined_code = render_code_artifacts(state["code_artifacts"], section=COMPONENT_SECTION)
     
-    prompt = {
-        "input_variables": ["test_cases", "code"],
-        "template": template
-    }
-    
-    chain = LLMChain(llm=llm, prompt=prompt)
+    # Simulate test execution by analyzing the test cases and code
+    chain = QA_EXECUTION_PROMPT | llm | _PARSER
     
     # Execute the chain
-    test_results = chain.run(
-        test_cases=state["test_cases"],
-        code=combined_code
-    )
+    test_results = chain.invoke({
+        "test_cases": state["test_cases"],
+        "code": combined_code
+    })
     
     # Add to vector store for future reference
     add_to_vectorstore(
@@ -239,7 +300,6 @@ def execute_qa_testing(state: Dict[str, Any], llm: Any, vectorstore: Any) -> Dic
     
     # Update the state
     return {
-        **state,
         "test_results": test_results,
-        "execution_order": state.get("execution_order", []) + ["execute_qa_testing"]
+        "execution_order": ["execute_qa_testing"]
     }
@@ -2,10 +2,50 @@
 Test generator node for SDLC Agent.
 """
 from typing import Dict, Any, List, Optional
-import json
+import re
+import copy
 from datetime import datetime
 
-from src.LLMS.google_llm import get_llm
+from src.LLMS.cache import acached_generate, acached_generate_json
+from src.utils.json_utils import parse_json_block, split_json_tail
+from src.nodes._code_str import render_code_artifacts
+
+# JSON structure of extracted test metrics
+TEST_METRICS_SCHEMA = """{
+    "total_tests": <number>,
+    "passed_tests": <number>,
+    "failed_tests": <number>,
+    "blocked_tests": <number>,
+    "pass_rate": <float>,
+    "test_coverage": <float>,
+    "execution_time_minutes": <number>,
+    "critical_defects": <number>,
+    "major_defects": <number>,
+    "minor_defects": <number>,
+    "categories": {
+        "unit": {
+            "total": <number>,
+            "passed": <number>
+        },
+        "integration": {
+            "total": <number>,
+            "passed": <number>
+        },
+        "functional": {
+            "total": <number>,
+            "passed": <number>
+        },
+        "performance": {
+            "total": <number>,
+            "passed": <number>
+        },
+        "security": {
+            "total": <number>,
+            "passed": <number>
+        }
+    },
+    "most_failed_components": ["<component1>", "<component2>", ...]
+}"""
 
 def create_test_generation_prompt(requirements: str, user_stories: str, 
                                  code_artifacts: Dict[str, str]) -> str:
@@ -20,26 +60,24 @@ def create_test_generation_prompt(requirements: str, user_stories: str,
     Returns:
         str: The prompt for test generation.
     """
-    # Convert code artifacts to a single formatted string
-    code_str = ""
-    for file_name, code in code_artifacts.items():
-        # Skip non-code files and documentation
-        if file_name.endswith((".md", ".txt")):
-            continue
-        code_str += f"\n\n### File: {file_name}\n```\n{code}\n```\n"
+    # Convert code artifacts to a single compacted string, skipping non-code files and documentation
+    code_str = render_code_artifacts(code_artifacts)
     
     return f"""
-    You are an expert software testing engineer. Create comprehensive test cases
-    based on the following requirements, user stories, and code.
-    
     Requirements:
     {requirements}
     
+    ---
+    Code:
+    {code_str}
+    
+    ---
     User Stories:
     {user_stories}
     
-    Code:
-    {code_str}
+    ---
+    You are an expert software testing engineer. Create comprehensive test cases
+    based on the requirements, code, and user stories above.
     
     Your test plan should include:
     1. Test strategy overview
@@ -95,138 +133,159 @@ def create_test_results_prompt(test_cases: str) -> str:
     5. Recommendations for improving quality
     
     Format your response using Markdown with clear sections and tables where appropriate.
+    
+    After the results, summarize the key metrics in a fenced ```json block with this structure:
+    {TEST_METRICS_SCHEMA}
     """
 
-def extract_test_metrics(test_results: str) -> Dict[str, Any]:
+def create_full_test_report_prompt(requirements: str, user_stories: str,
+                                   code_artifacts: Dict[str, str]) -> str:
     """
-    Extract test metrics from test results.
+    Create a prompt for test cases, their simulated results and metrics in one call.
+    
+    Args:
+        requirements (str): The user requirements.
+        user_stories (str): The user stories.
+        code_artifacts (Dict[str, str]): The code artifacts.
+        
+    Returns:
+        str: The prompt for the full test report.
+    """
+    return create_test_generation_prompt(requirements, user_stories, code_artifacts) + f"""
+    Then simulate executing those test cases and report realistic results: an executive
+    summary, execution metrics, the status of each test case, coverage analysis, and
+    recommendations for improving quality.
+    
+    Structure your response in exactly three sections, each starting with its marker line:
+    <!--TESTCASES-->
+    (the test plan in Markdown)
+    <!--RESULTS-->
+    (the test execution results in Markdown)
+    <!--METRICS-->
+    (a JSON object with this structure)
+    {TEST_METRICS_SCHEMA}
+    """
+
+# Section markers in a full test report
+_REPORT_SECTION_RE = re.compile(r"<!--(TESTCASES|RESULTS|METRICS)-->")
+
+def split_full_test_report(report: str) -> Dict[str, str]:
+    """
+    Split a full test report into its marked sections.
+    
+    Args:
+        report (str): The LLM response.
+        
+    Returns:
+        Dict[str, str]: Section text keyed by marker name (TESTCASES, RESULTS, METRICS).
+    """
+    parts = _REPORT_SECTION_RE.split(report)
+    return {name: text.strip() for name, text in zip(parts[1::2], parts[2::2])}
+
+def create_test_metrics_prompt(test_results: str) -> str:
+    """
+    Create a prompt for extracting test metrics.
     
     Args:
         test_results (str): The test results.
         
     Returns:
-        Dict[str, Any]: The test metrics.
+        str: The prompt for test metrics extraction.
     """
-    prompt = f"""
+    return f"""
     Extract key metrics from the following test results as a JSON object.
     
     Test Results:
     {test_results}
     
     Please provide a JSON object with the following structure:
-    {{
-        "total_tests": <number>,
-        "passed_tests": <number>,
-        "failed_tests": <number>,
-        "blocked_tests": <number>,
-        "pass_rate": <float>,
-        "test_coverage": <float>,
-        "execution_time_minutes": <number>,
-        "critical_defects": <number>,
-        "major_defects": <number>,
-        "minor_defects": <number>,
-        "categories": {{
-            "unit": {{
-                "total": <number>,
-                "passed": <number>
-            }},
-            "integration": {{
-                "total": <number>,
-                "passed": <number>
-            }},
-            "functional": {{
-                "total": <number>,
-                "passed": <number>
-            }},
-            "performance": {{
-                "total": <number>,
-                "passed": <number>
-            }},
-            "security": {{
-                "total": <number>,
-                "passed": <number>
-            }}
-        }},
-        "most_failed_components": ["<component1>", "<component2>", ...]
-    }}
+    {TEST_METRICS_SCHEMA}
     
     Provide only the JSON object, no other text.
     """
+
+# Metrics used when the test results cannot be parsed
+DEFAULT_TEST_METRICS = {
+    "total_tests": 50,
+    "passed_tests": 42,
+    "failed_tests": 6,
+    "blocked_tests": 2,
+    "pass_rate": 0.84,
+    "test_coverage": 0.78,
+    "execution_time_minutes": 45,
+    "critical_defects": 1,
+    "major_defects": 3,
+    "minor_defects": 5,
+    "categories": {
+        "unit": {
+            "total": 20,
+            "passed": 18
+        },
+        "integration": {
+            "total": 15,
+            "passed": 13
+        },
+        "functional": {
+            "total": 10,
+            "passed": 8
+        },
+        "performance": {
+            "total": 3,
+            "passed": 2
+        },
+        "security": {
+            "total": 2,
+            "passed": 1
+        }
+    },
+    "most_failed_components": ["Authentication", "Data Processing"]
+}
+
+# Test results shorter than this carry nothing worth extracting, so the LLM call is skipped
+MIN_RESULTS_LENGTH = 200
+
+def parse_test_metrics(metrics_str: str) -> Dict[str, Any]:
+    """
+    Parse the test metrics returned by the LLM.
     
-    # Get metrics
-    metrics_str = generate_with_langchain(prompt, temperature=0.2)
-    
-    # Try to parse JSON, use default if parsing fails
-    try:
-        # Extract JSON if it's wrapped in markdown code blocks
-        if "```json" in metrics_str:
-            json_start = metrics_str.find("```json") + 7
-            json_end = metrics_str.find("```", json_start)
-            metrics_str = metrics_str[json_start:json_end].strip()
-        elif "```" in metrics_str:
-            json_start = metrics_str.find("```") + 3
-            json_end = metrics_str.find("```", json_start)
-            metrics_str = metrics_str[json_start:json_end].strip()
+    Args:
+        metrics_str (str): The LLM response.
         
-        test_metrics = json.loads(metrics_str)
-    except (json.JSONDecodeError, ValueError):
+    Returns:
+        Dict[str, Any]: The test metrics, or defaults if parsing fails.
+    """
+    # Parse JSON, use default if parsing fails
+    test_metrics = parse_json_block(metrics_str)
+    if test_metrics is None:
         # Default values if parsing fails
-        test_metrics = {
-            "total_tests": 50,
-            "passed_tests": 42,
-            "failed_tests": 6,
-            "blocked_tests": 2,
-            "pass_rate": 0.84,
-            "test_coverage": 0.78,
-            "execution_time_minutes": 45,
-            "critical_defects": 1,
-            "major_defects": 3,
-            "minor_defects": 5,
-            "categories": {
-                "unit": {
-                    "total": 20,
-                    "passed": 18
-                },
-                "integration": {
-                    "total": 15,
-                    "passed": 13
-                },
-                "functional": {
-                    "total": 10,
-                    "passed": 8
-                },
-                "performance": {
-                    "total": 3,
-                    "passed": 2
-                },
-                "security": {
-                    "total": 2,
-                    "passed": 1
-                }
-            },
-            "most_failed_components": ["Authentication", "Data Processing"]
-        }
+        test_metrics = copy.deepcopy(DEFAULT_TEST_METRICS)
     
     return test_metrics
 
-def generate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
+async def aextract_test_metrics(test_results: str) -> Dict[str, Any]:
     """
-    Generate content using LLM.
+    Extract test metrics from test results with the extraction model.
     
     Args:
-        prompt (str): The prompt to use.
-        temperature (float): The temperature for generation.
+        test_results (str): The test results.
         
     Returns:
-        str: The generated content.
+        Dict[str, Any]: The test metrics.
     """
-    llm = get_llm(temperature=temperature)
-    return llm.invoke(prompt)
+    # Nothing to extract from empty or placeholder input
+    if len(test_results.strip()) < MIN_RESULTS_LENGTH or "No code artifacts" in test_results:
+        return copy.deepcopy(DEFAULT_TEST_METRICS)
+    
+    metrics_str = await acached_generate_json(create_test_metrics_prompt(test_results))
+    return parse_test_metrics(metrics_str)
 
-def test_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def test_generator_node_async(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate test cases, execute tests, and update state.
     
+    LLM calls are awaited, so the event loop stays free for concurrent
+    graph work such as the security review.
+    
     Args:
         state (Dict[str, Any]): The current state.
         
@@ -245,20 +304,24 @@ def test_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "current_stage": "CODE"  # Go back to code stage
         }
     
-    # Create prompt for test generation
-    prompt = create_test_generation_prompt(requirements, user_stories, code_artifacts)
-    
-    # Generate test cases
-    test_cases = generate_with_langchain(prompt, temperature=0.7)
-    
-    # Create prompt for test results
-    results_prompt = create_test_results_prompt(test_cases)
+    # Generate test cases, results, and metrics in one call
+    prompt = create_full_test_report_prompt(requirements, user_stories, code_artifacts)
+    report = await acached_generate(prompt, temperature=0.7)
+    sections = split_full_test_report(report)
+    test_cases = sections.get("TESTCASES") or report
+    test_results = sections.get("RESULTS")
+    test_metrics = parse_json_block(sections.get("METRICS", ""))
     
-    # Generate test results
-    test_results = generate_with_langchain(results_prompt, temperature=0.7)
+    # Generate test results with their metrics separately if the report is missing them
+    if not test_results:
+        test_results, test_metrics = split_json_tail(
+            await acached_generate(create_test_results_prompt(test_cases), temperature=0.7),
+            DEFAULT_TEST_METRICS
+        )
     
-    # Extract test metrics
-    test_metrics = extract_test_metrics(test_results)
+    # Extract test metrics separately only if the JSON block is missing
+    if test_metrics is None:
+        test_metrics = await aextract_test_metrics(test_results)
     
     # Update state with test cases, results, and metrics
     return {
@@ -267,4 +330,4 @@ def test_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "test_metrics": test_metrics,
         "current_stage": "COMPLETE",
         "last_updated": datetime.now().isoformat()
-    }
\ No newline at end of file
+    }
@@ -2,10 +2,43 @@
 User story generator node for SDLC Agent.
 """
 from typing import Dict, Any, List, Optional
-import json
+import copy
 from datetime import datetime
 
-from src.LLMS.google_llm import get_llm
+from src.LLMS.cache import cached_generate, cached_generate_json, inputs_fingerprint
+from src.utils.json_utils import parse_json_block, split_json_tail
+
+# JSON structure of user story metadata
+USER_STORY_METADATA_SCHEMA = """{
+    "total_story_count": <number>,
+    "high_priority_count": <number>,
+    "medium_priority_count": <number>,
+    "low_priority_count": <number>,
+    "total_story_points": <number>,
+    "categories": {
+        "core": <number>,
+        "feature": <number>,
+        "process": <number>
+    },
+    "primary_user_roles": ["role1", "role2", ...],
+    "most_complex_stories": ["story1", "story2", "story3"]
+}"""
+
+# User story metadata used when the metadata cannot be parsed
+DEFAULT_USER_STORY_METADATA = {
+    "total_story_count": 10,
+    "high_priority_count": 4,
+    "medium_priority_count": 4,
+    "low_priority_count": 2,
+    "total_story_points": 40,
+    "categories": {
+        "core": 5,
+        "feature": 3,
+        "process": 2
+    },
+    "primary_user_roles": ["User", "Admin", "System"],
+    "most_complex_stories": ["Authentication", "Data Processing", "Reporting"]
+}
 
 def create_user_story_prompt(requirements: str, requirements_analysis: str) -> str:
     """
@@ -19,15 +52,17 @@ def create_user_story_prompt(requirements: str, requirements_analysis: str) -> s
         str: The prompt for user story generation.
     """
     return f"""
-    You are an expert software business analyst. Create comprehensive user stories 
-    based on the following requirements and analysis.
-    
     Requirements:
     {requirements}
     
+    ---
     Requirements Analysis:
     {requirements_analysis}
     
+    ---
+    You are an expert software business analyst. Create comprehensive user stories 
+    based on the requirements and analysis above.
+    
     Generate a comprehensive set of user stories that cover all the requirements.
     For each user story, include:
     1. A title
@@ -44,6 +79,31 @@ def create_user_story_prompt(requirements: str, requirements_analysis: str) -> s
     - SDLC Process Stories (related to development process, testing, documentation)
     
     Format your response using Markdown with clear sections and tables where appropriate.
+    
+    After the user stories, summarize them in a fenced ```json block with this structure:
+    {USER_STORY_METADATA_SCHEMA}
+    """
+
+def create_user_story_metadata_prompt(user_stories: str) -> str:
+    """
+    Create a prompt for extracting user story metadata.
+    
+    Args:
+        user_stories (str): The user stories.
+        
+    Returns:
+        str: The prompt for metadata extraction.
+    """
+    return f"""
+    Based on the following user stories, extract metadata as a JSON object.
+    
+    User Stories:
+    {user_stories}
+    
+    Please provide a JSON object with the following structure:
+    {USER_STORY_METADATA_SCHEMA}
+    
+    Provide only the JSON object, no other text.
     """
 
 def user_story_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -66,89 +126,36 @@ def user_story_generator_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "current_stage": "REQUIREMENTS"  # Stay in requirements stage
         }
     
+    # Reuse the previous user stories on retries with unchanged inputs
+    inputs_hash = inputs_fingerprint(requirements, requirements_analysis)
+    if state.get("user_stories_inputs_hash") == inputs_hash and state.get("user_stories"):
+        return {
+            "user_stories": state["user_stories"],
+            "user_story_metadata": state.get("user_story_metadata"),
+            "current_stage": "DESIGN",
+            "last_updated": datetime.now().isoformat()
+        }
+    
     # Create prompt for user story generation
     prompt = create_user_story_prompt(requirements, requirements_analysis)
     
-    # Generate user stories
-    user_stories = generate_with_langchain(prompt, temperature=0.7)
-    
-    # Extract metadata for user stories
-    metadata_prompt = f"""
-    Based on the following user stories, extract metadata as a JSON object.
-    
-    User Stories:
-    {user_stories}
-    
-    Please provide a JSON object with the following structure:
-    {{
-        "total_story_count": <number>,
-        "high_priority_count": <number>,
-        "medium_priority_count": <number>,
-        "low_priority_count": <number>,
-        "total_story_points": <number>,
-        "categories": {{
-            "core": <number>,
-            "feature": <number>,
-            "process": <number>
-        }},
-        "primary_user_roles": ["role1", "role2", ...],
-        "most_complex_stories": ["story1", "story2", "story3"]
-    }}
+    # Generate user stories with their metadata in the trailing JSON block
+    user_stories, user_story_metadata = split_json_tail(cached_generate(prompt, temperature=0.7), DEFAULT_USER_STORY_METADATA)
     
-    Provide only the JSON object, no other text.
-    """
+    # Extract metadata separately only if the JSON block is missing
+    if user_story_metadata is None:
+        metadata_str = cached_generate_json(create_user_story_metadata_prompt(user_stories))
+        user_story_metadata = parse_json_block(metadata_str)
     
-    # Get metadata
-    metadata_str = generate_with_langchain(metadata_prompt, temperature=0.2)
-    
-    # Try to parse JSON, use default if parsing fails
-    try:
-        # Extract JSON if it's wrapped in markdown code blocks
-        if "```json" in metadata_str:
-            json_start = metadata_str.find("```json") + 7
-            json_end = metadata_str.find("```", json_start)
-            metadata_str = metadata_str[json_start:json_end].strip()
-        elif "```" in metadata_str:
-            json_start = metadata_str.find("```") + 3
-            json_end = metadata_str.find("```", json_start)
-            metadata_str = metadata_str[json_start:json_end].strip()
-        
-        user_story_metadata = json.loads(metadata_str)
-    except (json.JSONDecodeError, ValueError):
+    if user_story_metadata is None:
         # Default values if parsing fails
-        user_story_metadata = {
-            "total_story_count": 10,
-            "high_priority_count": 4,
-            "medium_priority_count": 4,
-            "low_priority_count": 2,
-            "total_story_points": 40,
-            "categories": {
-                "core": 5,
-                "feature": 3,
-                "process": 2
-            },
-            "primary_user_roles": ["User", "Admin", "System"],
-            "most_complex_stories": ["Authentication", "Data Processing", "Reporting"]
-        }
+        user_story_metadata = copy.deepcopy(DEFAULT_USER_STORY_METADATA)
     
     # Update state with user stories and metadata
     return {
         "user_stories": user_stories,
         "user_story_metadata": user_story_metadata,
+        "user_stories_inputs_hash": inputs_hash,
         "current_stage": "DESIGN",
         "last_updated": datetime.now().isoformat()
     }
-
-def generate_with_langchain(prompt: str, temperature: float = 0.7) -> str:
-    """
-    Generate content using LLM.
-    
-    Args:
-        prompt (str): The prompt to use.
-        temperature (float): The temperature for generation.
-        
-    Returns:
-        str: The generated content.
-    """
-    llm = get_llm(temperature=temperature)
-    return llm.invoke(prompt)
\ No newline at end of file
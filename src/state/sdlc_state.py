@@ -1,11 +1,13 @@
 """
 State management for SDLC Agent workflow.
 """
+import operator
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel, Field
+from enum import StrEnum
+from typing import Annotated, Dict, List, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, computed_field
 
-class SDLCStage:
+class SDLCStage(StrEnum):
     """SDLC stages enumeration."""
     REQUIREMENTS = "REQUIREMENTS"
     USER_STORIES = "USER_STORIES"
@@ -15,11 +17,37 @@ class SDLCStage:
     TESTING = "TESTING"
     COMPLETE = "COMPLETE"
 
+# Stage that follows each stage; COMPLETE is terminal
+_NEXT_STAGE = {
+    SDLCStage.REQUIREMENTS: SDLCStage.USER_STORIES,
+    SDLCStage.USER_STORIES: SDLCStage.DESIGN,
+    SDLCStage.DESIGN: SDLCStage.CODE,
+    SDLCStage.CODE: SDLCStage.SECURITY,
+    SDLCStage.SECURITY: SDLCStage.TESTING,
+    SDLCStage.TESTING: SDLCStage.COMPLETE,
+    SDLCStage.COMPLETE: SDLCStage.COMPLETE,
+}
+
+# Fields returned by SDLCState.get_all_artifacts
+_ARTIFACT_FIELDS = (
+    "requirements",
+    "user_stories",
+    "functional_design",
+    "non_functional_design",
+    "code_artifacts",
+    "security_findings",
+    "test_cases",
+    "test_results",
+)
+
 class SDLCState(BaseModel):
     """State for SDLC Agent workflow."""
     
+    # Assignments on the hot path (update_stage, add_feedback) skip revalidation
+    model_config = ConfigDict(validate_assignment=False)
+    
     # Core state attributes
-    session_id: str = Field(..., description="Unique session identifier")
+    session_id: str = Field(..., frozen=True, description="Unique session identifier")
     current_stage: str = Field(SDLCStage.REQUIREMENTS, description="Current SDLC stage")
     requirements: Optional[str] = Field(None, description="Project requirements")
     
@@ -27,26 +55,87 @@ class SDLCState(BaseModel):
     user_stories: Optional[str] = Field(None, description="Generated user stories")
     functional_design: Optional[str] = Field(None, description="Functional design document")
     non_functional_design: Optional[str] = Field(None, description="Non-functional design document")
+    design_brief: Optional[str] = Field(None, description="Condensed design summary used in code generation prompts")
     code_artifacts: Optional[Dict[str, str]] = Field(None, description="Generated code artifacts")
     security_findings: Optional[str] = Field(None, description="Security analysis findings")
     test_cases: Optional[str] = Field(None, description="Generated test cases")
     test_results: Optional[str] = Field(None, description="Test execution results")
+    user_story_metadata: Optional[Dict[str, Any]] = Field(None, description="Metadata extracted from the user stories")
+    security_metadata: Optional[Dict[str, Any]] = Field(None, description="Categorized security findings")
+    
+    # Hashes of the inputs the artifacts were generated from, used to skip regeneration
+    user_stories_inputs_hash: Optional[str] = Field(None, description="Hash of the user story inputs")
+    security_review_inputs_hash: Optional[str] = Field(None, description="Hash of the security review inputs")
     
     # Feedback
-    feedback: Dict[str, List[str]] = Field(default_factory=dict, description="User feedback by stage")
+    feedback_comments: Dict[str, List[str]] = Field(default_factory=dict, description="User feedback comments by stage")
+    feedback_approved: Dict[str, bool] = Field(default_factory=dict, description="Latest approval decision by stage")
     
     # Metadata
-    created_at: str = Field(default_factory=lambda: datetime.now().isoformat(), description="Creation timestamp")
-    last_updated: str = Field(default_factory=lambda: datetime.now().isoformat(), description="Last update timestamp")
-    history: List[Dict[str, Any]] = Field(default_factory=list, description="State history for monitoring")
+    # Set by the creator from a single clock read, see src.main.process_requirements
+    created_at: str = Field("", frozen=True, description="Creation timestamp")
+    last_updated: str = Field("", description="Last update timestamp")
+    history_stages: List[str] = Field(default_factory=list, description="Stages left, in order, for monitoring")
+    history_timestamps: List[str] = Field(default_factory=list, description="Timestamps of the stages in history_stages")
+    # Nodes return only their own name; the operator.add reducer appends it
+    execution_order: Annotated[List[str], operator.add] = Field(default_factory=list, description="Names of the nodes run, in order")
     
     # Advanced attributes
     monitoring: Optional[Dict[str, Any]] = Field(None, description="Workflow monitoring data")
     complexity_analysis: Optional[Dict[str, Any]] = Field(None, description="Requirements complexity analysis")
     
+    # Cached JSON serialization, cleared whenever a field is assigned; fields are
+    # therefore updated by assignment, never mutated in place
+    _json_cache: Optional[str] = PrivateAttr(None)
+    
+    def __setattr__(self, name: str, value: Any):
+        """Set an attribute and mark the state dirty."""
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self._json_cache = None
+    
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False) -> "SDLCState":
+        """Copy the state without revalidating, marking the copy dirty if fields were updated."""
+        copy = super().model_copy(update=update, deep=deep)
+        if update:
+            copy._json_cache = None
+        return copy
+    
     def to_dict(self) -> Dict[str, Any]:
-        """Convert state to dictionary."""
-        return self.dict()
+        """
+        Convert state to dictionary.
+        
+        Returns:
+            Dict[str, Any]: A fresh copy of the state, safe for callers to mutate.
+        """
+        return self.model_dump()
+    
+    def to_json(self) -> str:
+        """
+        Convert state to JSON, reusing the last serialization if unchanged.
+        
+        Returns:
+            str: The JSON-serialized state.
+        """
+        if self._json_cache is None:
+            self._json_cache = self.model_dump_json()
+        return self._json_cache
+    
+    # Serialized under their pre-split names so the to_dict()/API payload keeps its keys
+    @computed_field
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        """State history as a list of stage/timestamp records."""
+        return [
+            {"stage": stage, "timestamp": timestamp}
+            for stage, timestamp in zip(self.history_stages, self.history_timestamps)
+        ]
+    
+    @computed_field
+    @property
+    def feedback(self) -> Dict[str, List[str]]:
+        """User feedback comments by stage."""
+        return self.feedback_comments
     
     def update_stage(self, new_stage: str):
         """
@@ -55,28 +144,30 @@ class SDLCState(BaseModel):
         Args:
             new_stage (str): The new stage.
         """
-        # Record current state in history
-        self.history.append({
-            "stage": self.current_stage,
-            "timestamp": datetime.now().isoformat()
-        })
+        # Record current state in history; lists are replaced, not appended to,
+        # so shallow model copies never see each other's history
+        self.history_stages = [*self.history_stages, self.current_stage]
+        self.history_timestamps = [*self.history_timestamps, datetime.now().isoformat()]
         
-        # Update stage
+        # Update stage (also marks the state dirty)
         self.current_stage = new_stage
         self.last_updated = datetime.now().isoformat()
     
-    def add_feedback(self, stage: str, feedback_text: str):
+    def add_feedback(self, stage: str, feedback_text: str, approved: bool = False):
         """
         Add feedback for a specific stage.
         
         Args:
             stage (str): The SDLC stage.
             feedback_text (str): The feedback text.
+            approved (bool): Whether the stage was approved.
         """
-        if stage not in self.feedback:
-            self.feedback[stage] = []
-        
-        self.feedback[stage].append(feedback_text)
+        # Replace rather than mutate, like update_stage
+        self.feedback_comments = {
+            **self.feedback_comments,
+            stage: [*self.feedback_comments.get(stage, []), feedback_text]
+        }
+        self.feedback_approved = {**self.feedback_approved, stage: approved}
         self.last_updated = datetime.now().isoformat()
     
     def get_next_stage(self) -> str:
@@ -86,38 +177,14 @@ class SDLCState(BaseModel):
         Returns:
             str: The next stage.
         """
-        stages = [
-            SDLCStage.REQUIREMENTS,
-            SDLCStage.USER_STORIES,
-            SDLCStage.DESIGN,
-            SDLCStage.CODE,
-            SDLCStage.SECURITY,
-            SDLCStage.TESTING,
-            SDLCStage.COMPLETE
-        ]
-        
-        try:
-            current_index = stages.index(self.current_stage)
-            if current_index < len(stages) - 1:
-                return stages[current_index + 1]
-            return SDLCStage.COMPLETE
-        except ValueError:
-            return SDLCStage.REQUIREMENTS
+        # Stages are str enums, so plain stage strings look up the same entries
+        return _NEXT_STAGE.get(self.current_stage, SDLCStage.REQUIREMENTS)
     
     def get_all_artifacts(self) -> Dict[str, Any]:
         """
         Get all artifacts in the state.
         
         Returns:
-            Dict[str, Any]: All artifacts.
+            Dict[str, Any]: All artifacts, in a new dictionary per call.
         """
-        return {
-            "requirements": self.requirements,
-            "user_stories": self.user_stories,
-            "functional_design": self.functional_design,
-            "non_functional_design": self.non_functional_design,
-            "code_artifacts": self.code_artifacts,
-            "security_findings": self.security_findings,
-            "test_cases": self.test_cases,
-            "test_results": self.test_results
-        }
\ No newline at end of file
+        return {field: getattr(self, field) for field in _ARTIFACT_FIELDS}
\ No newline at end of file
@@ -1,10 +1,455 @@
 """
 Custom tools for SDLC specific tasks.
 """
-from typing import Dict, Any, List, Optional, Type
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from functools import cached_property, lru_cache, wraps
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, Type
 from langchain.tools import BaseTool
+import os
 import re
-import json
+import bisect
+import copy
+import ast
+import asyncio
+import orjson
+import hashlib
+import threading
+
+# Function and class definitions
+_FUNC_DEF = re.compile(r"def\s+(\w+)\s*\(([^)]*)\)(?:\s*->\s*([^:]+))?:")
+_SIMPLE_FUNC_DEF = re.compile(r"def\s+(\w+)\s*\([^)]*\):")
+_CLASS_DEF = re.compile(r"class\s+(\w+)(?:\([^)]*\))?:")
+_DEF_OR_CLASS = re.compile(r"(def|class)\s+")
+
+# Code structure and quality markers
+_IMPORT_NAMES = re.compile(r"import\s+(\w+)|from\s+[\w.]+\s+import\s+(\w+)(?:\s*,\s*(\w+))*")
+_IMPORT_LINE = re.compile(r"(import\s+.*|from\s+.*import\s+.*)")
+_IDENTIFIER = re.compile(r"\b[A-Za-z_]\w*\b")
+
+# Structural tokens gathered by one combined scan, dispatched on the matched group name
+_SCAN = re.compile(
+    r"(?P<func>\bdef\s+\w+\s*\()"
+    r"|(?P<bare_def>\bdef\s+\w+)"
+    r"|(?P<cls>\bclass\s+\w+\s*[:\(])"
+    r"|(?P<ctrl>\b(?:if|for|while|elif|else)\b)"
+    r"|(?P<try>try\s*:)"
+)
+
+# Rest of a function signature with a return annotation, matched from the opening parenthesis
+_RETURN_HINT = re.compile(r"[^)]*\)\s*->\s*\w+\s*:")
+
+# Security patterns, shared by the code analysis and security scan tools
+_CREDS = re.compile(r"(password|api_key|secret|token)\s*=\s*['\"][^'\"]+['\"]", re.IGNORECASE)
+_SQL_FORMAT = re.compile(r"execute\(\s*f?['\"].*\{.*\}.*['\"]")
+_SQL_PERCENT = re.compile(r"execute\(\s*['\"].*\%s.*['\"].*%")
+_COMMAND = re.compile(r"os\.system\(|subprocess\.call\(|subprocess\.run\(|subprocess\.Popen\(")
+_DESERIALIZATION = re.compile(r"pickle\.loads|yaml\.load\s*\((?!.*Loader=yaml\.SafeLoader)")
+_FILE_WRITE = re.compile(r"open\(\s*.*\+\s*['\"]w['\"]")
+_REQUEST_INPUT = re.compile(r"request\.form|request\.args|request\.json")
+_VALIDATION = re.compile(r"validate|sanitize|clean")
+
+# All security patterns in one alternation, keyed by group name. Each one is
+# wrapped in a lookahead so a long match never hides another pattern that
+# starts inside it, giving the same hits as searching for each separately.
+_SECURITY_PATTERNS = {
+    "sql_format": _SQL_FORMAT,
+    "sql_percent": _SQL_PERCENT,
+    "command": _COMMAND,
+    "creds": _CREDS,
+    "deserialization": _DESERIALIZATION,
+    "file_write": _FILE_WRITE,
+    "request_input": _REQUEST_INPUT,
+    "validation": _VALIDATION,
+}
+_SECURITY_SCAN = re.compile("|".join(
+    f"(?=(?P<{name}>(?{'i' if pattern.flags & re.IGNORECASE else '-i'}:{pattern.pattern})))"
+    for name, pattern in _SECURITY_PATTERNS.items()
+))
+
+# Documentation extraction
+_MODULE_DOCSTRING = re.compile(r'^"""(.*?)"""', re.DOTALL)
+_DOCSTRING = re.compile(r'"""(.*?)"""', re.DOTALL)
+_CLASS_BLOCK = re.compile(r"class\s+(\w+)(?:\([^)]*\))?:(.*?)(?=\n\S|\Z)", re.DOTALL)
+_METHOD_BLOCK = re.compile(r"def\s+(\w+)\s*\(([^)]*)\)(?:\s*->\s*([^:]+))?:(.*?)(?=\n\s*def|\n\S|\Z)", re.DOTALL)
+_FUNCTION_BLOCK = re.compile(r"^def\s+(\w+)\s*\(([^)]*)\)(?:\s*->\s*([^:]+))?:(.*?)(?=^def|\Z)", re.DOTALL | re.MULTILINE)
+
+# Number of results each tool keeps, keyed by a hash of the code and the options
+TOOL_CACHE_SIZE = 256
+
+def _memoized_run(run: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Cache a tool method's results, since every tool is a pure function of its arguments.
+    
+    Results are keyed by a BLAKE2b digest of the code plus the other arguments,
+    so workflow retries reuse them without holding the source strings. Callers
+    get a deep copy, so mutating a returned dict or list can't corrupt the cache.
+    
+    Args:
+        run (Callable[..., Any]): The tool method.
+        
+    Returns:
+        Callable[..., Any]: The memoized method.
+    """
+    cache: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+    lock = threading.Lock()
+    
+    @wraps(run)
+    def wrapper(self, code: str, *args, **kwargs) -> Any:
+        key = (hashlib.blake2b(code.encode(), digest_size=16).digest(), args, tuple(sorted(kwargs.items())))
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return copy.deepcopy(cache[key])
+        
+        result = run(self, code, *args, **kwargs)
+        with lock:
+            cache[key] = result
+            if len(cache) > TOOL_CACHE_SIZE:
+                cache.popitem(last=False)
+        return copy.deepcopy(result)
+    
+    return wrapper
+
+def _dumps(data: Any) -> str:
+    """
+    Serialize a tool report as indented JSON.
+    
+    Args:
+        data (Any): The report.
+        
+    Returns:
+        str: The JSON text.
+    """
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
+# Findings reported by the security scan, in report order, keyed by the
+# _SECURITY_SCAN groups that trigger them
+_VULNERABILITIES = (
+    (("sql_format", "sql_percent"), {
+        "severity": "critical",
+        "type": "sql_injection",
+        "description": "Potential SQL injection vulnerability detected",
+        "recommendation": "Use parameterized queries instead of string formatting"
+    }),
+    (("command",), {
+        "severity": "high",
+        "type": "command_injection",
+        "description": "Potential command injection vulnerability detected",
+        "recommendation": "Validate and sanitize user input before using it in system commands"
+    }),
+    (("creds",), {
+        "severity": "high",
+        "type": "hardcoded_credentials",
+        "description": "Hardcoded credentials detected",
+        "recommendation": "Use environment variables or a secure vault for storing credentials"
+    }),
+    (("deserialization",), {
+        "severity": "high",
+        "type": "insecure_deserialization",
+        "description": "Insecure deserialization detected",
+        "recommendation": "Use secure deserialization methods (pickle.loads with trusted data only, yaml.safe_load)"
+    }),
+    (("file_write",), {
+        "severity": "medium",
+        "type": "insecure_file_operations",
+        "description": "Insecure file operations detected",
+        "recommendation": "Ensure proper file permissions and validate file paths"
+    }),
+    (("missing_input_validation",), {
+        "severity": "medium",
+        "type": "missing_input_validation",
+        "description": "Missing input validation detected",
+        "recommendation": "Add input validation for all user-provided data"
+    }),
+)
+
+# Placeholder argument values for generated tests, tried in order against the
+# parameter's type annotation
+_DEFAULTS = {
+    "int": "0",
+    "float": "0.0",
+    "str": '""',
+    "bool": "False",
+    "list": "[]",
+    "List": "[]",
+    "dict": "{}",
+    "Dict": "{}",
+}
+
+def _parse_params(parameters: str) -> List[Tuple[str, str]]:
+    """
+    Split a parameter list into names and placeholder test values.
+    
+    Args:
+        parameters (str): The text between a function's parentheses.
+        
+    Returns:
+        List[Tuple[str, str]]: (name, value) pairs, one per parameter.
+    """
+    params = []
+    for param in parameters.split(","):
+        if not param.strip():
+            continue
+        pieces = param.split(":")
+        param_type = pieces[-1].strip() if len(pieces) > 1 else "Any"
+        value = next((v for k, v in _DEFAULTS.items() if k in param_type), "None")
+        params.append((pieces[0].strip(), value))
+    return params
+
+# Test code fragments for each supported framework. "function" and "class"
+# open a test for a function or class; function tests then get Arrange/Act/
+# Assert sections indented by "indent".
+_TEST_TEMPLATES = {
+    "pytest": {
+        "import": "import pytest\n",
+        "function": "def test_{name}():\n",
+        "indent": "    ",
+        "assert_not_none": "assert result is not None",
+        "assert_none": "assert result is None",
+        "class": (
+            "class TestClass{name}:\n"
+            "    def test_init(self):\n"
+            "        # Arrange & Act\n"
+            "        instance = {name}()\n"
+            "        \n        # Assert\n"
+            "        assert instance is not None\n"
+        ),
+        "footer": "",
+    },
+    "unittest": {
+        "import": "import unittest\n",
+        "function": "class Test{title}(unittest.TestCase):\n    def test_{name}(self):\n",
+        "indent": "        ",
+        "assert_not_none": "self.assertIsNotNone(result)",
+        "assert_none": "self.assertIsNone(result)",
+        "class": (
+            "class Test{name}(unittest.TestCase):\n"
+            "    def test_init(self):\n"
+            "        # Arrange & Act\n"
+            "        instance = {name}()\n"
+            "        \n        # Assert\n"
+            "        self.assertIsNotNone(instance)\n"
+        ),
+        "footer": "if __name__ == '__main__':\n    unittest.main()\n",
+    },
+}
+
+# Maximum number of files scanned at once by the batch tool runners
+MAX_TOOL_WORKERS = os.cpu_count() or 4
+
+# Practices listed with every security scan
+SECURE_CODING_CHECKLIST = [
+    "Use parameterized queries for database operations",
+    "Validate and sanitize all user inputs",
+    "Store credentials in environment variables",
+    "Implement proper error handling",
+    "Use HTTPS for all external communications",
+    "Implement proper authentication and authorization",
+    "Keep dependencies up to date"
+]
+
+async def _gather_in_threads(func: Callable[[str], Any], codes: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Apply a per-file function to several files in worker threads, with bounded concurrency.
+    
+    Args:
+        func (Callable[[str], Any]): The per-file function.
+        codes (Dict[str, str]): The code, keyed by file name.
+        
+    Returns:
+        Dict[str, Any]: The results, keyed by file name.
+    """
+    semaphore = asyncio.Semaphore(MAX_TOOL_WORKERS)
+    
+    async def _apply(code: str) -> Any:
+        async with semaphore:
+            return await asyncio.to_thread(func, code)
+    
+    results = await asyncio.gather(*[_apply(code) for code in codes.values()])
+    return dict(zip(codes, results))
+
+# Functions longer than this many lines are reported as a maintainability issue
+MAX_FUNCTION_LINES = 50
+
+def _parse_python(code: str) -> Optional[ast.Module]:
+    """
+    Parse Python source.
+    
+    Args:
+        code (str): The source to parse.
+        
+    Returns:
+        Optional[ast.Module]: The syntax tree, or None if the code is not valid Python.
+    """
+    try:
+        return ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+@dataclass
+class ScanResult:
+    """Structural facts about a source string, gathered in a single scan."""
+    function_count: int = 0
+    class_count: int = 0
+    control_structures: int = 0
+    has_function: bool = False
+    has_type_hints: bool = False
+    has_try: bool = False
+    has_docstring: bool = False
+    has_tests: bool = False
+
+def _scan_once(code: str) -> ScanResult:
+    """
+    Walk the code once, collecting the facts the code analysis tool reports on.
+    
+    Args:
+        code (str): The code to scan.
+        
+    Returns:
+        ScanResult: The collected facts.
+    """
+    result = ScanResult(
+        has_docstring='"""' in code,
+        has_tests="unittest" in code or "pytest" in code
+    )
+    
+    for match in _SCAN.finditer(code):
+        kind = match.lastgroup
+        if kind == "ctrl":
+            result.control_structures += 1
+        elif kind == "func":
+            result.function_count += 1
+            result.has_function = True
+            if not result.has_type_hints and _RETURN_HINT.match(code, match.end()):
+                result.has_type_hints = True
+            if match.group(0)[3:].lstrip().startswith("test_"):
+                result.has_tests = True
+        elif kind == "cls":
+            result.class_count += 1
+        elif kind == "bare_def":
+            result.has_function = True
+            if match.group(0)[3:].lstrip().startswith("test_"):
+                result.has_tests = True
+        elif kind == "try":
+            result.has_try = True
+    
+    return result
+
+class _SourceIndex:
+    """
+    Structural facts about one source string, shared by every tool.
+    
+    Each fact is computed on first use, so a tool only pays for the scans it
+    needs and the next tool to inspect the same code reuses them.
+    """
+    
+    def __init__(self, code: str):
+        """
+        Initialize the index.
+        
+        Args:
+            code (str): The source to index.
+        """
+        self.code = code
+    
+    @cached_property
+    def scan(self) -> ScanResult:
+        """Facts gathered by the combined structural scan."""
+        return _scan_once(self.code)
+    
+    @cached_property
+    def line_count(self) -> int:
+        """Number of lines, not counting an empty line after a trailing newline."""
+        code = self.code
+        return code.count("\n") + (bool(code) and not code.endswith("\n"))
+    
+    @cached_property
+    def tree(self) -> Optional[ast.Module]:
+        """The syntax tree, or None if the code is not valid Python."""
+        return _parse_python(self.code)
+    
+    @cached_property
+    def functions(self) -> List[Tuple[str, str, Optional[str]]]:
+        """(name, parameters, return annotation) for every function definition."""
+        return [match.groups() for match in _FUNC_DEF.finditer(self.code)]
+    
+    @cached_property
+    def classes(self) -> List[str]:
+        """Names of every class definition."""
+        return _CLASS_DEF.findall(self.code)
+    
+    @cached_property
+    def import_lines(self) -> List[str]:
+        """Every import statement line."""
+        return _IMPORT_LINE.findall(self.code)
+    
+    @cached_property
+    def imported_names(self) -> List[str]:
+        """Imported module and symbol names, without duplicates, in order of appearance."""
+        return list(dict.fromkeys(
+            name for imp in _IMPORT_NAMES.findall(self.code) for name in imp if name
+        ))
+    
+    @cached_property
+    def identifier_counts(self) -> Counter:
+        """Number of occurrences of each identifier."""
+        return Counter(_IDENTIFIER.findall(self.code))
+    
+    @cached_property
+    def security_hits(self) -> frozenset:
+        """Names of the _SECURITY_SCAN groups that match somewhere in the code."""
+        hits = set()
+        for match in _SECURITY_SCAN.finditer(self.code):
+            hits.add(match.lastgroup)
+            if len(hits) == len(_SECURITY_PATTERNS):
+                break
+        return frozenset(hits)
+    
+    @cached_property
+    def module_docstring(self) -> Optional[str]:
+        """The module docstring, if the code opens with one."""
+        match = _MODULE_DOCSTRING.search(self.code)
+        return match.group(1).strip() if match else None
+    
+    @cached_property
+    def documented_classes(self) -> List[Tuple[str, Optional[str], List[Tuple[str, str, str, Optional[str]]]]]:
+        """(name, docstring, methods) for every class, each method as (name, parameters, return type, docstring)."""
+        classes = []
+        for match in _CLASS_BLOCK.finditer(self.code):
+            class_body = match.group(2)
+            methods = [
+                (method.group(1), method.group(2), method.group(3) or "None", _docstring(method.group(4)))
+                for method in _METHOD_BLOCK.finditer(class_body)
+            ]
+            classes.append((match.group(1), _docstring(class_body), methods))
+        return classes
+    
+    @cached_property
+    def documented_functions(self) -> List[Tuple[str, str, str, Optional[str]]]:
+        """(name, parameters, return type, docstring) for every top-level function."""
+        return [
+            (match.group(1), match.group(2), match.group(3) or "None", _docstring(match.group(4)))
+            for match in _FUNCTION_BLOCK.finditer(self.code)
+        ]
+
+def _docstring(body: str) -> Optional[str]:
+    """Get the first docstring in a block of code, stripped."""
+    match = _DOCSTRING.search(body)
+    return match.group(1).strip() if match else None
+
+@lru_cache(maxsize=32)
+def _source_index(code: str) -> _SourceIndex:
+    """
+    Get the shared index for a source string.
+    
+    Args:
+        code (str): The source.
+        
+    Returns:
+        _SourceIndex: The index, reused for as long as the code stays in the cache.
+    """
+    return _SourceIndex(code)
 
 class CodeAnalysisTool(BaseTool):
     """Tool for analyzing code quality and suggesting improvements."""
@@ -12,31 +457,88 @@ class CodeAnalysisTool(BaseTool):
     name = "code_analysis_tool"
     description = "Analyzes code quality and suggests improvements"
     
-    def _run(self, code: str) -> str:
+    @_memoized_run
+    def _analyze(self, code: str) -> Dict[str, Any]:
         """
-        Run code analysis.
+        Analyze a single source file.
         
         Args:
             code (str): The code to analyze.
             
         Returns:
-            str: Analysis results.
+            Dict[str, Any]: Metrics, issues, and recommendations for the code.
         """
         # This is a simplified implementation
+        index = _source_index(code)
+        scan = index.scan
         analysis_results = {
             "metrics": {
-                "lines_of_code": len(code.split("\n")),
-                "complexity": self._calculate_complexity(code),
-                "function_count": len(re.findall(r"def\s+\w+\s*\(", code)),
-                "class_count": len(re.findall(r"class\s+\w+\s*[:\(]", code)),
+                "lines_of_code": index.line_count,
+                "complexity": self._calculate_complexity(scan),
+                "function_count": scan.function_count,
+                "class_count": scan.class_count,
             },
-            "issues": self._identify_issues(code),
-            "recommendations": self._generate_recommendations(code)
+            "issues": self._identify_issues(index),
+            "recommendations": self._generate_recommendations(scan)
         }
         
-        return json.dumps(analysis_results, indent=2)
+        return analysis_results
     
-    def _arun(self, code: str) -> str:
+    def _run(self, code: str) -> str:
+        """
+        Run code analysis.
+        
+        Args:
+            code (str): The code to analyze.
+            
+        Returns:
+            str: Analysis results.
+        """
+        return _dumps(self._analyze(code))
+    
+    def _summarize(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine per-file analyses into one report with project totals.
+        
+        Args:
+            results (Dict[str, Dict[str, Any]]): Analysis results keyed by file name.
+            
+        Returns:
+            Dict[str, Any]: The combined report.
+        """
+        totals = dict.fromkeys(("lines_of_code", "complexity", "function_count", "class_count"), 0)
+        for analysis in results.values():
+            for metric in totals:
+                totals[metric] += analysis["metrics"][metric]
+        
+        return {"metrics": totals, "files": results}
+    
+    def _run_batch(self, codes: Dict[str, str]) -> str:
+        """
+        Run code analysis over several files, serializing the report once.
+        
+        Args:
+            codes (Dict[str, str]): The code to analyze, keyed by file name.
+            
+        Returns:
+            str: Combined analysis results.
+        """
+        return _dumps(analyze_project(codes))
+    
+    async def _arun_batch(self, codes: Dict[str, str]) -> str:
+        """
+        Run code analysis over several files concurrently.
+        
+        Args:
+            codes (Dict[str, str]): The code to analyze, keyed by file name.
+            
+        Returns:
+            str: Combined analysis results.
+        """
+        results = await _gather_in_threads(self._analyze, codes)
+        return _dumps(self._summarize(results))
+    
+    async def _arun(self, code: str) -> str:
         """
         Run code analysis asynchronously.
         
@@ -46,32 +548,28 @@ class CodeAnalysisTool(BaseTool):
         Returns:
             str: Analysis results.
         """
-        # For now, just call the synchronous version
-        return self._run(code)
+        # Run the scan in a worker thread so concurrent tool calls don't block the event loop
+        return await asyncio.to_thread(self._run, code)
     
-    def _calculate_complexity(self, code: str) -> int:
+    def _calculate_complexity(self, scan: ScanResult) -> int:
         """
         Calculate code complexity.
         
         Args:
-            code (str): The code to analyze.
+            scan (ScanResult): The scanned code.
             
         Returns:
             int: Complexity score.
         """
         # Simple complexity metric based on control structures
-        control_structures = len(re.findall(r"\b(if|for|while|elif|else)\b", code))
-        functions = len(re.findall(r"def\s+\w+\s*\(", code))
-        classes = len(re.findall(r"class\s+\w+\s*[:\(]", code))
-        
-        return control_structures + functions * 2 + classes * 3
+        return scan.control_structures + scan.function_count * 2 + scan.class_count * 3
     
-    def _identify_issues(self, code: str) -> List[Dict[str, Any]]:
+    def _identify_issues(self, index: _SourceIndex) -> List[Dict[str, Any]]:
         """
         Identify potential issues in the code.
         
         Args:
-            code (str): The code to analyze.
+            index (_SourceIndex): The index of the code to analyze.
             
         Returns:
             List[Dict[str, Any]]: List of identified issues.
@@ -79,7 +577,7 @@ class CodeAnalysisTool(BaseTool):
         issues = []
         
         # Check for hardcoded credentials
-        if re.search(r"(password|api_key|secret|token)\s*=\s*['\"][^'\"]+['\"]", code, re.IGNORECASE):
+        if "creds" in index.security_hits:
             issues.append({
                 "severity": "high",
                 "type": "security",
@@ -88,19 +586,7 @@ class CodeAnalysisTool(BaseTool):
             })
         
         # Check for overly long functions
-        long_functions = []
-        function_pattern = r"def\s+(\w+)\s*\([^)]*\):"
-        for match in re.finditer(function_pattern, code):
-            function_name = match.group(1)
-            function_start = match.start()
-            # Find the next function or class definition
-            next_def = re.search(r"(def|class)\s+", code[function_start+1:])
-            if next_def:
-                function_end = function_start + 1 + next_def.start()
-                function_code = code[function_start:function_end]
-                function_lines = function_code.count("\n")
-                if function_lines > 50:
-                    long_functions.append(function_name)
+        long_functions = self._find_long_functions(index)
         
         if long_functions:
             issues.append({
@@ -111,18 +597,9 @@ class CodeAnalysisTool(BaseTool):
             })
         
         # Check for unused imports
-        imports = re.findall(r"import\s+(\w+)|from\s+[\w.]+\s+import\s+(\w+)(?:\s*,\s*(\w+))*", code)
-        imported_modules = []
-        for imp in imports:
-            for module in imp:
-                if module and module not in imported_modules:
-                    imported_modules.append(module)
-        
-        unused_imports = []
-        for module in imported_modules:
-            # Check if the module is used anywhere else in the code
-            if not re.search(rf"\b{module}\b", code[code.find(module)+len(module):]):
-                unused_imports.append(module)
+        # A module is used if its name appears again after the import itself
+        identifier_counts = index.identifier_counts
+        unused_imports = [module for module in index.imported_names if identifier_counts[module] < 2]
         
         if unused_imports:
             issues.append({
@@ -134,12 +611,49 @@ class CodeAnalysisTool(BaseTool):
         
         return issues
     
-    def _generate_recommendations(self, code: str) -> List[str]:
+    def _find_long_functions(self, index: _SourceIndex) -> List[str]:
+        """
+        Find functions longer than MAX_FUNCTION_LINES lines.
+        
+        Python sources are measured from their syntax tree, which also covers
+        nested and trailing functions; anything else falls back to a regex scan.
+        
+        Args:
+            index (_SourceIndex): The index of the code to analyze.
+            
+        Returns:
+            List[str]: Names of the overly long functions.
+        """
+        tree = index.tree
+        if tree is not None:
+            return [
+                node.name for node in ast.walk(tree)
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and node.end_lineno - node.lineno > MAX_FUNCTION_LINES
+            ]
+        
+        code = index.code
+        # Offsets of every function or class definition, collected in one pass
+        def_starts = [match.start() for match in _DEF_OR_CLASS.finditer(code)]
+        
+        long_functions = []
+        for match in _SIMPLE_FUNC_DEF.finditer(code):
+            function_start = match.start()
+            # A function runs up to the next function or class definition
+            next_def = bisect.bisect_right(def_starts, function_start)
+            if next_def < len(def_starts):
+                function_lines = code.count("\n", function_start, def_starts[next_def])
+                if function_lines > MAX_FUNCTION_LINES:
+                    long_functions.append(match.group(1))
+        
+        return long_functions
+    
+    def _generate_recommendations(self, scan: ScanResult) -> List[str]:
         """
         Generate recommendations for improving the code.
         
         Args:
-            code (str): The code to analyze.
+            scan (ScanResult): The scanned code.
             
         Returns:
             List[str]: List of recommendations.
@@ -147,19 +661,19 @@ class CodeAnalysisTool(BaseTool):
         recommendations = []
         
         # Check for missing docstrings
-        if not re.search(r'"""', code):
+        if not scan.has_docstring:
             recommendations.append("Add docstrings to improve code documentation")
         
         # Check for missing type hints
-        if not re.search(r"def\s+\w+\s*\([^)]*\)\s*->\s*\w+\s*:", code):
+        if not scan.has_type_hints:
             recommendations.append("Add type hints to improve code maintainability")
         
         # Check for missing error handling
-        if re.search(r"def\s+\w+", code) and not re.search(r"try\s*:", code):
+        if scan.has_function and not scan.has_try:
             recommendations.append("Add error handling to improve code robustness")
         
         # Check for missing tests
-        if not re.search(r"def\s+test_", code) and not re.search(r"unittest|pytest", code):
+        if not scan.has_tests:
             recommendations.append("Add unit tests to ensure code correctness")
         
         return recommendations
@@ -170,6 +684,28 @@ class SecurityScanTool(BaseTool):
     name = "security_scan_tool"
     description = "Scans code for security vulnerabilities"
     
+    @_memoized_run
+    def _scan(self, code: str) -> List[Dict[str, Any]]:
+        """
+        Scan a single source file for vulnerabilities.
+        
+        Args:
+            code (str): The code to scan.
+            
+        Returns:
+            List[Dict[str, Any]]: The detected vulnerabilities.
+        """
+        # This is a simplified implementation: one pass finds every pattern
+        hits = set(_source_index(code).security_hits)
+        
+        # User input is only a finding when nothing looks like it is validated
+        if "request_input" in hits and "validation" not in hits:
+            hits.add("missing_input_validation")
+        
+        vulnerabilities = [dict(finding) for groups, finding in _VULNERABILITIES if hits.intersection(groups)]
+        
+        return vulnerabilities
+    
     def _run(self, code: str) -> str:
         """
         Run security scan.
@@ -180,79 +716,48 @@ class SecurityScanTool(BaseTool):
         Returns:
             str: Security scan results.
         """
-        # This is a simplified implementation
-        vulnerabilities = []
-        
-        # Check for SQL injection vulnerabilities
-        if re.search(r"execute\(\s*f?['\"].*\{.*\}.*['\"]", code) or re.search(r"execute\(\s*['\"].*\%s.*['\"].*%" , code):
-            vulnerabilities.append({
-                "severity": "critical",
-                "type": "sql_injection",
-                "description": "Potential SQL injection vulnerability detected",
-                "recommendation": "Use parameterized queries instead of string formatting"
-            })
-        
-        # Check for command injection vulnerabilities
-        if re.search(r"os\.system\(|subprocess\.call\(|subprocess\.run\(|subprocess\.Popen\(", code):
-            vulnerabilities.append({
-                "severity": "high",
-                "type": "command_injection",
-                "description": "Potential command injection vulnerability detected",
-                "recommendation": "Validate and sanitize user input before using it in system commands"
-            })
-        
-        # Check for hardcoded credentials
-        if re.search(r"(password|api_key|secret|token)\s*=\s*['\"][^'\"]+['\"]", code, re.IGNORECASE):
-            vulnerabilities.append({
-                "severity": "high",
-                "type": "hardcoded_credentials",
-                "description": "Hardcoded credentials detected",
-                "recommendation": "Use environment variables or a secure vault for storing credentials"
-            })
+        scan_results = {
+            "vulnerabilities": self._scan(code),
+            "secure_coding_checklist": SECURE_CODING_CHECKLIST
+        }
         
-        # Check for insecure deserialization
-        if re.search(r"pickle\.loads|yaml\.load\s*\((?!.*Loader=yaml\.SafeLoader)", code):
-            vulnerabilities.append({
-                "severity": "high",
-                "type": "insecure_deserialization",
-                "description": "Insecure deserialization detected",
-                "recommendation": "Use secure deserialization methods (pickle.loads with trusted data only, yaml.safe_load)"
-            })
+        return _dumps(scan_results)
+    
+    def _run_batch(self, codes: Dict[str, str]) -> str:
+        """
+        Run the security scan over several files, serializing the report once.
         
-        # Check for insecure file operations
-        if re.search(r"open\(\s*.*\+\s*['\"]w['\"]", code):
-            vulnerabilities.append({
-                "severity": "medium",
-                "type": "insecure_file_operations",
-                "description": "Insecure file operations detected",
-                "recommendation": "Ensure proper file permissions and validate file paths"
-            })
+        Args:
+            codes (Dict[str, str]): The code to scan, keyed by file name.
+            
+        Returns:
+            str: Combined security scan results.
+        """
+        scan_results = {
+            "vulnerabilities": {file_name: self._scan(code) for file_name, code in codes.items()},
+            "secure_coding_checklist": SECURE_CODING_CHECKLIST
+        }
         
-        # Check for missing input validation
-        if re.search(r"request\.form|request\.args|request\.json", code) and not re.search(r"validate|sanitize|clean", code):
-            vulnerabilities.append({
-                "severity": "medium",
-                "type": "missing_input_validation",
-                "description": "Missing input validation detected",
-                "recommendation": "Add input validation for all user-provided data"
-            })
+        return _dumps(scan_results)
+    
+    async def _arun_batch(self, codes: Dict[str, str]) -> str:
+        """
+        Run the security scan over several files concurrently.
         
+        Args:
+            codes (Dict[str, str]): The code to scan, keyed by file name.
+            
+        Returns:
+            str: Combined security scan results.
+        """
         scan_results = {
-            "vulnerabilities": vulnerabilities,
-            "secure_coding_checklist": [
-                "Use parameterized queries for database operations",
-                "Validate and sanitize all user inputs",
-                "Store credentials in environment variables",
-                "Implement proper error handling",
-                "Use HTTPS for all external communications",
-                "Implement proper authentication and authorization",
-                "Keep dependencies up to date"
-            ]
+            "vulnerabilities": await _gather_in_threads(self._scan, codes),
+            "secure_coding_checklist": SECURE_CODING_CHECKLIST
         }
         
-        return json.dumps(scan_results, indent=2)
+        return _dumps(scan_results)
     
-    def _arun(self, code: str) -> str:
+    async def _arun(self, code: str) -> str:
         """
         Run security scan asynchronously.
         
@@ -262,8 +767,8 @@ class SecurityScanTool(BaseTool):
         Returns:
             str: Security scan results.
         """
-        # For now, just call the synchronous version
-        return self._run(code)
+        # Run the scan in a worker thread so concurrent tool calls don't block the event loop
+        return await asyncio.to_thread(self._run, code)
 
 class TestGenerationTool(BaseTool):
     """Tool for generating unit tests for code."""
@@ -271,6 +776,7 @@ class TestGenerationTool(BaseTool):
     name = "test_generation_tool"
     description = "Generates unit tests for code"
     
+    @_memoized_run
     def _run(self, code: str, framework: str = "pytest") -> str:
         """
         Generate unit tests for the given code.
@@ -283,147 +789,69 @@ class TestGenerationTool(BaseTool):
             str: Generated test code.
         """
         # This is a simplified implementation
-        function_matches = re.finditer(r"def\s+(\w+)\s*\(([^)]*)\)(?:\s*->\s*([^:]+))?:", code)
+        index = _source_index(code)
+        template = _TEST_TEMPLATES.get(framework)
         
-        class_matches = re.finditer(r"class\s+(\w+)(?:\([^)]*\))?:", code)
+        parts = [f"# Generated test code using {framework}\n"]
         
-        test_code = f"# Generated test code using {framework}\n"
-        
-        if framework == "pytest":
-            test_code += "import pytest\n"
-        elif framework == "unittest":
-            test_code += "import unittest\n"
+        if template:
+            parts.append(template["import"])
         
         # Add imports from the original code
-        imports = re.findall(r"(import\s+.*|from\s+.*import\s+.*)", code)
-        for imp in imports:
-            test_code += imp + "\n"
+        for imp in index.import_lines:
+            parts.append(imp + "\n")
         
-        test_code += "\n\n"
+        parts.append("\n\n")
         
         # Generate tests for functions
-        for match in function_matches:
-            function_name = match.group(1)
-            
+        for function_name, parameters, return_type in index.functions:
             # Skip if it's already a test function
             if function_name.startswith("test_"):
                 continue
             
-            parameters = match.group(2)
-            return_type = match.group(3) if match.group(3) else "Any"
-            
-            param_list = [p.strip() for p in parameters.split(",") if p.strip()]
-            
-            if framework == "pytest":
-                test_code += f"def test_{function_name}():\n"
-                test_code += f"    # Arrange\n"
-                
-                # Generate test parameter values
-                for param in param_list:
-                    param_name = param.split(":")[0].strip()
-                    param_type = param.split(":")[-1].strip() if ":" in param else "Any"
-                    
-                    if "int" in param_type:
-                        test_code += f"    {param_name} = 0\n"
-                    elif "float" in param_type:
-                        test_code += f"    {param_name} = 0.0\n"
-                    elif "str" in param_type:
-                        test_code += f"    {param_name} = \"\"\n"
-                    elif "bool" in param_type:
-                        test_code += f"    {param_name} = False\n"
-                    elif "list" in param_type or "List" in param_type:
-                        test_code += f"    {param_name} = []\n"
-                    elif "dict" in param_type or "Dict" in param_type:
-                        test_code += f"    {param_name} = {{}}\n"
-                    else:
-                        test_code += f"    {param_name} = None\n"
-                
-                # Call the function
-                param_names = [p.split(":")[0].strip() for p in param_list]
-                param_str = ", ".join(param_names)
-                
-                test_code += f"    \n    # Act\n"
-                test_code += f"    result = {function_name}({param_str})\n"
-                test_code += f"    \n    # Assert\n"
+            if template:
+                return_type = return_type or "Any"
+                params = _parse_params(parameters)
+                indent = template["indent"]
                 
-                if "None" not in return_type:
-                    test_code += f"    assert result is not None\n"
-                else:
-                    test_code += f"    assert result is None\n"
-            
-            elif framework == "unittest":
-                test_code += f"class Test{function_name.capitalize()}(unittest.TestCase):\n"
-                test_code += f"    def test_{function_name}(self):\n"
-                test_code += f"        # Arrange\n"
+                parts.append(template["function"].format(name=function_name, title=function_name.capitalize()))
+                parts.append(f"{indent}# Arrange\n")
                 
                 # Generate test parameter values
-                for param in param_list:
-                    param_name = param.split(":")[0].strip()
-                    param_type = param.split(":")[-1].strip() if ":" in param else "Any"
-                    
-                    if "int" in param_type:
-                        test_code += f"        {param_name} = 0\n"
-                    elif "float" in param_type:
-                        test_code += f"        {param_name} = 0.0\n"
-                    elif "str" in param_type:
-                        test_code += f"        {param_name} = \"\"\n"
-                    elif "bool" in param_type:
-                        test_code += f"        {param_name} = False\n"
-                    elif "list" in param_type or "List" in param_type:
-                        test_code += f"        {param_name} = []\n"
-                    elif "dict" in param_type or "Dict" in param_type:
-                        test_code += f"        {param_name} = {{}}\n"
-                    else:
-                        test_code += f"        {param_name} = None\n"
+                for param_name, value in params:
+                    parts.append(f"{indent}{param_name} = {value}\n")
                 
                 # Call the function
-                param_names = [p.split(":")[0].strip() for p in param_list]
-                param_str = ", ".join(param_names)
+                param_str = ", ".join(param_name for param_name, _ in params)
                 
-                test_code += f"        \n        # Act\n"
-                test_code += f"        result = {function_name}({param_str})\n"
-                test_code += f"        \n        # Assert\n"
+                parts.append(f"{indent}\n{indent}# Act\n")
+                parts.append(f"{indent}result = {function_name}({param_str})\n")
+                parts.append(f"{indent}\n{indent}# Assert\n")
                 
                 if "None" not in return_type:
-                    test_code += f"        self.assertIsNotNone(result)\n"
+                    parts.append(f"{indent}{template['assert_not_none']}\n")
                 else:
-                    test_code += f"        self.assertIsNone(result)\n"
+                    parts.append(f"{indent}{template['assert_none']}\n")
             
-            test_code += "\n\n"
+            parts.append("\n\n")
         
         # Generate tests for classes
-        for match in class_matches:
-            class_name = match.group(1)
-            
+        for class_name in index.classes:
             # Skip if it's already a test class
             if class_name.startswith("Test"):
                 continue
             
-            if framework == "pytest":
-                test_code += f"class TestClass{class_name}:\n"
-                test_code += f"    def test_init(self):\n"
-                test_code += f"        # Arrange & Act\n"
-                test_code += f"        instance = {class_name}()\n"
-                test_code += f"        \n        # Assert\n"
-                test_code += f"        assert instance is not None\n"
-                
-            elif framework == "unittest":
-                test_code += f"class Test{class_name}(unittest.TestCase):\n"
-                test_code += f"    def test_init(self):\n"
-                test_code += f"        # Arrange & Act\n"
-                test_code += f"        instance = {class_name}()\n"
-                test_code += f"        \n        # Assert\n"
-                test_code += f"        self.assertIsNotNone(instance)\n"
+            if template:
+                parts.append(template["class"].format(name=class_name))
             
-            test_code += "\n\n"
+            parts.append("\n\n")
         
-        if framework == "unittest":
-            test_code += "if __name__ == '__main__':\n"
-            test_code += "    unittest.main()\n"
+        if template:
+            parts.append(template["footer"])
         
-        return test_code
+        return "".join(parts)
     
-    def _arun(self, code: str, framework: str = "pytest") -> str:
+    async def _arun(self, code: str, framework: str = "pytest") -> str:
         """
         Generate unit tests asynchronously.
         
@@ -434,8 +862,8 @@ class TestGenerationTool(BaseTool):
         Returns:
             str: Generated test code.
         """
-        # For now, just call the synchronous version
-        return self._run(code, framework)
+        # Run the generation in a worker thread so concurrent tool calls don't block the event loop
+        return await asyncio.to_thread(self._run, code, framework)
 
 class DocumentationGeneratorTool(BaseTool):
     """Tool for generating documentation for code."""
@@ -443,108 +871,98 @@ class DocumentationGeneratorTool(BaseTool):
     name = "documentation_generator_tool"
     description = "Generates documentation for code"
     
-    def _run(self, code: str, format: str = "markdown") -> str:
+    def _run_stream(self, code: str, format: str = "markdown") -> Iterator[str]:
         """
-        Generate documentation for the given code.
+        Generate documentation for the given code, piece by piece.
+        
+        Callers writing the documentation to a file can pass the chunks to
+        writelines instead of building the whole document in memory.
         
         Args:
             code (str): The code to generate documentation for.
             format (str): The documentation format (markdown or rst).
             
-        Returns:
-            str: Generated documentation.
+        Yields:
+            str: Consecutive chunks of the generated documentation.
         """
         # This is a simplified implementation
-        docs = ""
-        
         if format == "markdown":
-            docs += "# Code Documentation\n\n"
+            yield "# Code Documentation\n\n"
         elif format == "rst":
-            docs += "Code Documentation\n=================\n\n"
+            yield "Code Documentation\n=================\n\n"
+        
+        index = _source_index(code)
         
         # Extract module docstring
-        module_docstring = re.search(r'^"""(.*?)"""', code, re.DOTALL)
+        module_docstring = index.module_docstring
         if module_docstring:
             if format == "markdown":
-                docs += "## Module Description\n\n"
-                docs += module_docstring.group(1).strip() + "\n\n"
+                yield "## Module Description\n\n"
+                yield module_docstring + "\n\n"
             elif format == "rst":
-                docs += "Module Description\n-----------------\n\n"
-                docs += module_docstring.group(1).strip() + "\n\n"
+                yield "Module Description\n-----------------\n\n"
+                yield module_docstring + "\n\n"
         
         # Extract classes
-        class_matches = re.finditer(r"class\s+(\w+)(?:\([^)]*\))?:(.*?)(?=\n\S|\Z)", code, re.DOTALL)
-        
         if format == "markdown":
-            docs += "## Classes\n\n"
+            yield "## Classes\n\n"
         elif format == "rst":
-            docs += "Classes\n-------\n\n"
+            yield "Classes\n-------\n\n"
         
-        for match in class_matches:
-            class_name = match.group(1)
-            class_body = match.group(2)
-            
+        for class_name, class_docstring, methods in index.documented_classes:
             if format == "markdown":
-                docs += f"### {class_name}\n\n"
+                yield f"### {class_name}\n\n"
             elif format == "rst":
-                docs += f"{class_name}\n{'~' * len(class_name)}\n\n"
+                yield f"{class_name}\n{'~' * len(class_name)}\n\n"
             
-            # Extract class docstring
-            class_docstring = re.search(r'"""(.*?)"""', class_body, re.DOTALL)
             if class_docstring:
-                docs += class_docstring.group(1).strip() + "\n\n"
+                yield class_docstring + "\n\n"
             
             # Extract methods
-            method_matches = re.finditer(r"def\s+(\w+)\s*\(([^)]*)\)(?:\s*->\s*([^:]+))?:(.*?)(?=\n\s*def|\n\S|\Z)", class_body, re.DOTALL)
-            
             if format == "markdown":
-                docs += "#### Methods\n\n"
+                yield "#### Methods\n\n"
             elif format == "rst":
-                docs += "Methods\n\"\"\"\"\"\"\n\n"
+                yield "Methods\n\"\"\"\"\"\"\n\n"
             
-            for method_match in method_matches:
-                method_name = method_match.group(1)
-                parameters = method_match.group(2)
-                return_type = method_match.group(3) if method_match.group(3) else "None"
-                method_body = method_match.group(4)
-                
+            for method_name, parameters, return_type, method_docstring in methods:
                 if format == "markdown":
-                    docs += f"##### `{method_name}({parameters}) -> {return_type}`\n\n"
+                    yield f"##### `{method_name}({parameters}) -> {return_type}`\n\n"
                 elif format == "rst":
-                    docs += f"**{method_name}({parameters}) -> {return_type}**\n\n"
+                    yield f"**{method_name}({parameters}) -> {return_type}**\n\n"
                 
-                # Extract method docstring
-                method_docstring = re.search(r'"""(.*?)"""', method_body, re.DOTALL)
                 if method_docstring:
-                    docs += method_docstring.group(1).strip() + "\n\n"
+                    yield method_docstring + "\n\n"
         
         # Extract standalone functions
-        function_matches = re.finditer(r"^def\s+(\w+)\s*\(([^)]*)\)(?:\s*->\s*([^:]+))?:(.*?)(?=^def|\Z)", code, re.DOTALL | re.MULTILINE)
-        
         if format == "markdown":
-            docs += "## Functions\n\n"
+            yield "## Functions\n\n"
         elif format == "rst":
-            docs += "Functions\n---------\n\n"
+            yield "Functions\n---------\n\n"
         
-        for match in function_matches:
-            function_name = match.group(1)
-            parameters = match.group(2)
-            return_type = match.group(3) if match.group(3) else "None"
-            function_body = match.group(4)
-            
+        for function_name, parameters, return_type, function_docstring in index.documented_functions:
             if format == "markdown":
-                docs += f"### `{function_name}({parameters}) -> {return_type}`\n\n"
+                yield f"### `{function_name}({parameters}) -> {return_type}`\n\n"
             elif format == "rst":
-                docs += f"**{function_name}({parameters}) -> {return_type}**\n\n"
+                yield f"**{function_name}({parameters}) -> {return_type}**\n\n"
             
-            # Extract function docstring
-            function_docstring = re.search(r'"""(.*?)"""', function_body, re.DOTALL)
             if function_docstring:
-                docs += function_docstring.group(1).strip() + "\n\n"
+                yield function_docstring + "\n\n"
+    
+    @_memoized_run
+    def _run(self, code: str, format: str = "markdown") -> str:
+        """
+        Generate documentation for the given code.
         
-        return docs
+        Args:
+            code (str): The code to generate documentation for.
+            format (str): The documentation format (markdown or rst).
+            
+        Returns:
+            str: Generated documentation.
+        """
+        return "".join(self._run_stream(code, format))
     
-    def _arun(self, code: str, format: str = "markdown") -> str:
+    async def _arun(self, code: str, format: str = "markdown") -> str:
         """
         Generate documentation asynchronously.
         
@@ -555,8 +973,18 @@ class DocumentationGeneratorTool(BaseTool):
         Returns:
             str: Generated documentation.
         """
-        # For now, just call the synchronous version
-        return self._run(code, format)
+        # Run the generation in a worker thread so concurrent tool calls don't block the event loop
+        return await asyncio.to_thread(self._run, code, format)
+
+@lru_cache(maxsize=1)
+def _build_sdlc_tools() -> Tuple[BaseTool, ...]:
+    """Build the SDLC tools once; they are stateless, so instances are shared."""
+    return (
+        CodeAnalysisTool(),
+        SecurityScanTool(),
+        TestGenerationTool(),
+        DocumentationGeneratorTool()
+    )
 
 def get_sdlc_tools() -> List[BaseTool]:
     """
@@ -565,9 +993,17 @@ def get_sdlc_tools() -> List[BaseTool]:
     Returns:
         List[BaseTool]: List of SDLC tools.
     """
-    return [
-        CodeAnalysisTool(),
-        SecurityScanTool(),
-        TestGenerationTool(),
-        DocumentationGeneratorTool()
-    ]
\ No newline at end of file
+    return list(_build_sdlc_tools())
+
+def analyze_project(files: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Analyze every file of a project and total the metrics.
+    
+    Args:
+        files (Dict[str, str]): The code, keyed by file name.
+        
+    Returns:
+        Dict[str, Any]: Project totals under "metrics" and per-file analyses under "files".
+    """
+    tool = _build_sdlc_tools()[0]
+    return tool._summarize({file_name: tool._analyze(code) for file_name, code in files.items()})
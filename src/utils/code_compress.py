@@ -0,0 +1,95 @@
+"""
+Token-reduction helpers for code sent to an LLM.
+"""
+import io
+import os
+import re
+import tokenize
+
+# Artifacts that carry no reviewable code
+SKIP_EXTENSIONS = frozenset({".md", ".txt", ".lock", ".svg", ".png"})
+
+# Files larger than this many characters are truncated
+MAX_FILE_CHARS = 4096
+
+# Runs of blank (or whitespace-only) lines
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+def is_code_file(file_name: str) -> bool:
+    """
+    Check whether an artifact should be sent to the LLM as code.
+    
+    Args:
+        file_name (str): The artifact file name.
+    
+    Returns:
+        bool: False for documentation, lock files and images.
+    """
+    return os.path.splitext(file_name)[1].lower() not in SKIP_EXTENSIONS
+
+def strip_python_comments(code: str) -> str:
+    """
+    Remove comments from Python source using the tokenizer.
+    
+    Args:
+        code (str): The Python source.
+    
+    Returns:
+        str: The source without comments, or the original if it does not tokenize.
+    """
+    # tokenize only counts "\n" as a line break, unlike str.splitlines
+    lines = code.split("\n")
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return code
+    
+    for token in reversed(tokens):
+        if token.type == tokenize.COMMENT:
+            row, col = token.start
+            lines[row - 1] = lines[row - 1][:col].rstrip()
+    return "\n".join(lines)
+
+def truncate(code: str, max_chars: int = MAX_FILE_CHARS) -> str:
+    """
+    Truncate code on a line boundary, noting how many lines were dropped.
+    
+    Args:
+        code (str): The code.
+        max_chars (int): Maximum number of characters to keep.
+    
+    Returns:
+        str: The truncated code.
+    """
+    if len(code) <= max_chars:
+        return code
+    
+    cut = code.rfind("\n", 0, max_chars)
+    if cut <= 0:
+        cut = max_chars
+    # Count the lines after the cut; a trailing newline doesn't start another line
+    rest = code[cut + 1:] if code[cut] == "\n" else code[cut:]
+    dropped = rest.count("\n") + (not rest.endswith("\n"))
+    return f"{code[:cut]}\n... [truncated, {dropped} lines]"
+
+def compact(code: str, file_name: str) -> str:
+    """
+    Shrink code before it goes into a prompt.
+    
+    Comments are stripped from Python files, blank-line runs are collapsed
+    and oversized files are truncated. Non-code files compact to "".
+    
+    Args:
+        code (str): The code.
+        file_name (str): The artifact file name, used to detect the language.
+    
+    Returns:
+        str: The compacted code.
+    """
+    if not is_code_file(file_name):
+        return ""
+    
+    if file_name.endswith(".py"):
+        code = strip_python_comments(code)
+    code = _BLANK_LINES_RE.sub("\n\n", code).strip("\n")
+    return truncate(code)
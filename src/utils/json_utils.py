@@ -0,0 +1,82 @@
+"""
+JSON extraction utilities for LLM responses.
+"""
+import re
+import json
+from typing import Any, Iterable, Tuple
+
+import orjson
+
+# Matches the body of a ```json ... ``` fenced block, preferred over any other fence
+_JSON_FENCE_RE = re.compile(r"```json\s*\n?(.*?)```", re.DOTALL)
+
+# Matches the body of a bare ``` ... ``` fenced block
+_FENCE_RE = re.compile(r"```\s*\n(.*?)```", re.DOTALL)
+
+# A ```json fenced block with nothing but whitespace after it
+_JSON_TAIL_RE = re.compile(r"```json\s*\n?(.*?)```\s*", re.DOTALL)
+
+# Opening characters of a JSON object or array
+_JSON_START_RE = re.compile(r"[\[{]")
+
+_DECODER = json.JSONDecoder()
+
+def parse_json_block(text: str, default: Any = None) -> Any:
+    """
+    Parse JSON from an LLM response, unwrapping a markdown code fence if present.
+    
+    Args:
+        text (str): The LLM response.
+        default (Any): The value to return if no JSON can be parsed.
+        
+    Returns:
+        Any: The parsed JSON, or the default.
+    """
+    match = _JSON_FENCE_RE.search(text) or _FENCE_RE.search(text)
+    payload = match.group(1) if match else text
+    
+    try:
+        return orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        pass
+    
+    # Fall back to decoding the first JSON value, ignoring surrounding prose
+    start = _JSON_START_RE.search(payload)
+    if start is None:
+        return default
+    try:
+        obj, _ = _DECODER.raw_decode(payload, start.start())
+        return obj
+    except ValueError:
+        return default
+
+def split_json_tail(text: str, required_keys: Iterable[str] = ()) -> Tuple[str, Any]:
+    """
+    Split a trailing fenced JSON block off a markdown LLM response.
+    
+    The block is only split off if it ends the response and parses to an object
+    with all the required keys; otherwise the response is returned whole.
+    
+    Args:
+        text (str): The LLM response, a markdown report optionally followed by a ```json block.
+        required_keys (Iterable[str]): Keys the JSON object must contain.
+        
+    Returns:
+        Tuple[str, Any]: The report without the block, and the parsed JSON (None if absent or invalid).
+    """
+    fence = text.rfind("```json")
+    if fence == -1:
+        return text, None
+    
+    match = _JSON_TAIL_RE.fullmatch(text, fence)
+    if match is None:
+        return text, None
+    
+    try:
+        data = orjson.loads(match.group(1))
+    except orjson.JSONDecodeError:
+        return text, None
+    
+    if not isinstance(data, dict) or not all(key in data for key in required_keys):
+        return text, None
+    return text[:fence].rstrip(), data
@@ -2,16 +2,76 @@
 LLM-based content generation utilities using Google Generative AI.
 """
 import os
+import re
+import json
+import time
+import random
+import asyncio
+from functools import lru_cache
+import orjson
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import PromptTemplate
+from src.LLMS.google_llm import TRANSPORT
 import traceback
 
+# Fenced blocks in LLM output: a ```json block, or any ``` block
+_JSON_FENCE_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+_FENCE_RE = re.compile(r"```\n(.*?)\n```", re.DOTALL)
+
+# A comma directly before a closing brace or bracket, which JSON does not allow
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+# A quoted file name key followed by the opening quote of its content
+_FILE_KEY_RE = re.compile(r'["\']([\w\d_\-\.]+)["\']:\s*["\']')
+
+# A relative file path with an extension, e.g. "src/app.py"
+_FILE_NAME_RE = re.compile(r"[\w\-./]+\.\w+")
+
+# Body of a string literal up to, not including, its unescaped closing quote
+_QUOTED_BODY_RE = {
+    '"': re.compile(r'(?:[^"\\]|\\.)*(?=")', re.DOTALL),
+    "'": re.compile(r"(?:[^'\\]|\\.)*(?=')", re.DOTALL),
+}
+
+# Candidate object starts tried when the response has text around its JSON
+MAX_DECODE_ATTEMPTS = 16
+
+_DECODER = json.JSONDecoder()
+
+def _decode_embedded_object(content):
+    """
+    Decode the first embedded JSON object mapping file names to code, trying each opening brace in turn.
+    
+    Objects whose keys don't all look like file names, or whose values aren't all
+    strings, are skipped so unrelated JSON in the text isn't mistaken for artifacts.
+    
+    Args:
+        content (str): The text to search.
+        
+    Returns:
+        dict: The decoded object, or None if none of the first MAX_DECODE_ATTEMPTS braces starts one.
+    """
+    start = content.find("{")
+    for _ in range(MAX_DECODE_ATTEMPTS):
+        if start == -1:
+            break
+        try:
+            obj, _ = _DECODER.raw_decode(content, start)
+            if isinstance(obj, dict) and obj and all(
+                _FILE_NAME_RE.fullmatch(key) and isinstance(value, str) for key, value in obj.items()
+            ):
+                return obj
+        except ValueError:
+            pass
+        start = content.find("{", start + 1)
+    return None
+
 # Initialize Google API key
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+@lru_cache(maxsize=8)
 def get_llm(temperature=0.7):
     """
-    Get a Google Generative AI LLM instance.
+    Get a Google Generative AI LLM instance, reused across calls with the same temperature.
     
     Args:
         temperature (float): The temperature for generation.
@@ -24,6 +84,7 @@ def get_llm(temperature=0.7):
         model="gemini-2.0-flash",  # Using Gemini 1.5 Pro model
         google_api_key=GOOGLE_API_KEY,
         temperature=temperature,
+        transport=TRANSPORT,
     )
 
 def generate_content(prompt_template, input_variables):
@@ -42,19 +103,13 @@ def generate_content(prompt_template, input_variables):
     retry_count = 0
     backoff_time = 2  # seconds
     
+    # Format prompt once; the templates use str.format syntax, so no PromptTemplate is needed
+    formatted_prompt = prompt_template.format_map(input_variables)
+    
     while retry_count < max_retries:
         try:
             llm = get_llm()
             
-            # Create prompt
-            prompt = PromptTemplate(
-                input_variables=list(input_variables.keys()),
-                template=prompt_template
-            )
-            
-            # Format prompt
-            formatted_prompt = prompt.format(**input_variables)
-            
             # Generate content
             response = llm.invoke(formatted_prompt)
             
@@ -69,9 +124,9 @@ def generate_content(prompt_template, input_variables):
             # If this is a service unavailable error, retry after backoff
             if "503" in error_msg or "Service Unavailable" in error_msg:
                 if retry_count < max_retries:
-                    import time
-                    wait_time = backoff_time * retry_count
-                    print(f"Service unavailable, retrying in {wait_time} seconds...")
+                    # Exponential backoff with jitter, so concurrent sessions don't retry in lockstep
+                    wait_time = backoff_time * 2 ** (retry_count - 1) * random.uniform(0.5, 1.5)
+                    print(f"Service unavailable, retrying in {wait_time:.1f} seconds...")
                     time.sleep(wait_time)
                     continue
             
@@ -265,6 +320,25 @@ Format your response using Markdown with appropriate headers, bullet points, and
         "user_stories": user_stories
     })
 
+async def agenerate_designs(requirements, user_stories):
+    """
+    Generate the functional and non-functional designs concurrently.
+    
+    The two documents depend only on the requirements and user stories, so
+    both LLM calls (with their retries) run at once in worker threads.
+    
+    Args:
+        requirements (str): The user requirements.
+        user_stories (str): The user stories.
+        
+    Returns:
+        tuple: (functional design, non-functional design)
+    """
+    return tuple(await asyncio.gather(
+        asyncio.to_thread(generate_functional_design, requirements, user_stories),
+        asyncio.to_thread(generate_non_functional_design, requirements, user_stories)
+    ))
+
 def generate_code_artifacts(requirements, functional_design, non_functional_design):
     """
     Generate code artifacts based on design documents.
@@ -318,13 +392,8 @@ The code should be complete, functional and ready to execute.
     # Generate code with lower temperature for more predictable output
     llm = get_llm(temperature=0.2)
     
-    prompt = PromptTemplate(
-        input_variables=["requirements", "functional_design", "non_functional_design"],
-        template=prompt_template
-    )
-    
     # Format prompt
-    formatted_prompt = prompt.format(
+    formatted_prompt = prompt_template.format(
         requirements=requirements, 
         functional_design=functional_design, 
         non_functional_design=non_functional_design
@@ -335,59 +404,37 @@ The code should be complete, functional and ready to execute.
         response = llm.invoke(formatted_prompt)
         content = response.content
         
-        # Extract JSON content if it's embedded in a code block
-        import re
-        import json
-        
-        # First try to extract JSON from code blocks
-        if "```json" in content or "```" in content:
-            # Look for ```json blocks first
-            json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-            if json_match:
-                content = json_match.group(1)
-            # Then try any ``` code blocks
-            else:
-                json_match = re.search(r'```\n(.*?)\n```', content, re.DOTALL)
-                if json_match:
-                    content = json_match.group(1)
+        # Extract JSON content if it's embedded in a code block: ```json blocks first, then any ``` block
+        json_match = _JSON_FENCE_RE.search(content) or _FENCE_RE.search(content)
+        if json_match:
+            content = json_match.group(1)
         
         # Clean up the content - remove any trailing commas in JSON which can cause parse errors
-        content = re.sub(r',\s*}', '}', content)
-        content = re.sub(r',\s*]', ']', content)
+        content = _TRAILING_COMMA_RE.sub(r"\1", content)
         
         # Try to parse JSON
         try:
-            code_artifacts = json.loads(content)
-        except json.JSONDecodeError:
+            code_artifacts = orjson.loads(content)
+        except orjson.JSONDecodeError:
             # If parsing fails, try to create a structured dictionary from the text
             # This is a fallback for when the LLM doesn't return proper JSON
             print(f"JSON parsing failed, attempting to structure response manually")
-            artifacts = {}
             
-            # Look for patterns like "filename.py": "content"
-            file_matches = re.finditer(r'["\']([\w\d_\-\.]+)["\']:\s*["\']', content)
-            for match in file_matches:
-                filename = match.group(1)
-                start_idx = match.end()
-                
-                # Find the closing quote, accounting for escaped quotes
-                in_escape = False
-                quote_char = content[start_idx-1]  # Get the quote character used
-                end_idx = start_idx
-                
-                for i in range(start_idx, len(content)):
-                    char = content[i]
-                    if char == '\\' and not in_escape:
-                        in_escape = True
-                    elif char == quote_char and not in_escape:
-                        end_idx = i
-                        break
-                    elif in_escape:
-                        in_escape = False
-                
-                if end_idx > start_idx:
-                    file_content = content[start_idx:end_idx]
-                    artifacts[filename] = file_content
+            # First look for a complete JSON object surrounded by other text
+            artifacts = _decode_embedded_object(content) or {}
+            
+            # Otherwise look for patterns like "filename.py": "content"
+            if not artifacts:
+                for match in _FILE_KEY_RE.finditer(content):
+                    filename = match.group(1)
+                    start_idx = match.end()
+                    
+                    # Find the closing quote, accounting for escaped quotes
+                    quote_char = content[start_idx-1]  # Get the quote character used
+                    body = _QUOTED_BODY_RE[quote_char].match(content, start_idx)
+                    
+                    if body and body.end() > start_idx:
+                        artifacts[filename] = body.group(0)
             
             # If we found files, use them
             if artifacts:
@@ -404,6 +451,26 @@ The code should be complete, functional and ready to execute.
             "error.py": f"# Error generating code artifacts\n# {str(e)}"
         }
 
+@lru_cache(maxsize=8)
+def _join_code_artifacts(items):
+    """Join (filename, code) pairs into one markdown string; cached per artifact set."""
+    return "\n\n".join(f"### {filename}\n```python\n{code}\n```" for filename, code in items)
+
+def format_code_artifacts(code_artifacts):
+    """
+    Combine code artifacts into a single markdown string for a prompt.
+    
+    The result is memoized on the artifact contents, so the security review
+    and test case generators build it only once for the same code.
+    
+    Args:
+        code_artifacts (dict): The code artifacts.
+        
+    Returns:
+        str: The combined code.
+    """
+    return _join_code_artifacts(tuple(code_artifacts.items()))
+
 def generate_security_findings(code_artifacts):
     """
     Generate security findings for the code artifacts.
@@ -415,7 +482,7 @@ def generate_security_findings(code_artifacts):
         str: The generated security findings.
     """
     # Combine all code into a single string for analysis
-    code_combined = "\n\n".join([f"### {filename}\n```python\n{code}\n```" for filename, code in code_artifacts.items()])
+    code_combined = format_code_artifacts(code_artifacts)
     
     prompt_template = """
 You are an expert security auditor. Conduct a security review of the following code artifacts and provide your findings.
@@ -463,7 +530,7 @@ def generate_test_cases(requirements, user_stories, code_artifacts):
         str: The generated test cases.
     """
     # Combine all code into a single string for analysis
-    code_combined = "\n\n".join([f"### {filename}\n```python\n{code}\n```" for filename, code in code_artifacts.items()])
+    code_combined = format_code_artifacts(code_artifacts)
     
     prompt_template = """
 You are an expert in software testing. Create comprehensive test cases for the application based on the following requirements, user stories, and code artifacts.
@@ -501,6 +568,25 @@ Format your response using Markdown with appropriate headers and sections.
         "code_artifacts": code_combined
     })
 
+async def agenerate_security_findings_and_test_cases(requirements, user_stories, code_artifacts):
+    """
+    Generate the security findings and test cases concurrently.
+    
+    Both only read the code artifacts, so the two LLM calls run at once in worker threads.
+    
+    Args:
+        requirements (str): The user requirements.
+        user_stories (str): The user stories.
+        code_artifacts (dict): The code artifacts.
+        
+    Returns:
+        tuple: (security findings, test cases)
+    """
+    return tuple(await asyncio.gather(
+        asyncio.to_thread(generate_security_findings, code_artifacts),
+        asyncio.to_thread(generate_test_cases, requirements, user_stories, code_artifacts)
+    ))
+
 def generate_test_results(test_cases):
     """
     Generate test results based on test cases.
@@ -2,18 +2,27 @@
 Module for initializing and configuring the vector store.
 """
 import os
+import hashlib
+from functools import lru_cache
+import faiss
 from dotenv import load_dotenv
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.schema import Document
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 # Load environment variables
 load_dotenv()
 
+# Texts embedded per forward pass
+EMBEDDING_BATCH_SIZE = 64
+
+@lru_cache(maxsize=4)
 def initialize_embeddings(model_name: str = "all-MiniLM-L6-v2"):
     """
-    Initialize the embeddings model.
+    Initialize the embeddings model, loading its weights once per process and model name.
     
     Args:
         model_name (str): The name of the model to use.
@@ -30,11 +39,41 @@ def initialize_embeddings(model_name: str = "all-MiniLM-L6-v2"):
     embeddings = HuggingFaceEmbeddings(
         model_name=model_name,
         model_kwargs={"device": "cpu"},
-        encode_kwargs={"normalize_embeddings": True}
+        encode_kwargs={"normalize_embeddings": True, "batch_size": EMBEDDING_BATCH_SIZE}
     )
     
     return embeddings
 
+def create_fp16_vectorstore(texts: List[str], embeddings, metadatas: List[Dict[str, Any]]) -> FAISS:
+    """
+    Create a FAISS vector store whose vectors are stored as float16.
+    
+    Embeddings are normalized, so inner product ranks like cosine similarity.
+    A float16 scalar quantizer halves the index size and the bytes scanned
+    per search compared with the default float32 flat index, and needs no training.
+    
+    Args:
+        texts (List[str]): Texts to seed the store with.
+        embeddings: The embeddings model to use.
+        metadatas (List[Dict[str, Any]]): Metadata for each seed text.
+        
+    Returns:
+        FAISS: The vector store.
+    """
+    vectors = embeddings.embed_documents(texts)
+    index = faiss.IndexScalarQuantizer(len(vectors[0]), faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+    
+    vectorstore = FAISS(
+        embeddings,
+        index,
+        InMemoryDocstore(),
+        {},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+    vectorstore.add_embeddings(zip(texts, vectors), metadatas=metadatas)
+    
+    return vectorstore
+
 def initialize_vectorstore(embeddings=None, persist_directory: str = "/tmp/sdlc_vectorstore"):
     """
     Initialize the vector store.
@@ -61,10 +100,13 @@ def initialize_vectorstore(embeddings=None, persist_directory: str = "/tmp/sdlc_
             embeddings,
             allow_dangerous_deserialization=True
         )
+        # Stores created before the float16 index still use the L2 flat index
+        if vectorstore.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            vectorstore.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
     else:
         # Create new vectorstore
-        vectorstore = FAISS.from_texts(
-            ["SDLC Agent Vectorstore"], 
+        vectorstore = create_fp16_vectorstore(
+            ["SDLC Agent Vectorstore"],
             embeddings,
             metadatas=[{"source": "initialization"}]
         )
@@ -93,17 +135,76 @@ def add_document_to_vectorstore(
     Returns:
         str: The document ID.
     """
-    # Add session_id and stage to metadata
-    metadata["session_id"] = session_id
-    metadata["stage"] = stage
+    return add_documents_batch(vectorstore, [(text, metadata)], session_id, stage)[0]
+
+def add_documents_batch(
+    vectorstore: FAISS,
+    items: List[Tuple[str, Dict[str, Any]]],
+    session_id: str,
+    stage: str
+) -> List[str]:
+    """
+    Add several documents to the vector store in one call.
+    
+    All texts are embedded together, in batches, instead of one model call per document.
+    
+    Args:
+        vectorstore (FAISS): The vector store.
+        items (List[Tuple[str, Dict[str, Any]]]): (text, metadata) pairs.
+        session_id (str): The session ID.
+        stage (str): The SDLC stage.
+        
+    Returns:
+        List[str]: The document IDs, in the order of the items.
+    """
+    documents = [
+        Document(page_content=text, metadata={**metadata, "session_id": session_id, "stage": stage})
+        for text, metadata in items
+    ]
     
-    # Create document
-    document = Document(page_content=text, metadata=metadata)
+    return vectorstore.add_documents(documents)
+
+def hash_content(text: str) -> str:
+    """
+    Get the SHA-256 hash used as the document ID for a text.
+    
+    Args:
+        text (str): The document text.
+        
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def add_to_vectorstore(
+    vectorstore: FAISS,
+    text: str,
+    metadata: Dict[str, Any],
+    content_hash: Optional[str] = None
+) -> str:
+    """
+    Add a document to the vector store unless identical text is already stored.
+    
+    Documents are stored under the hash of their text, so replays and retries
+    that regenerate the same content skip the embedding call and the write.
+    
+    Args:
+        vectorstore (FAISS): The vector store.
+        text (str): The document text.
+        metadata (Dict[str, Any]): The document metadata.
+        content_hash (Optional[str]): Precomputed hash of the text, if available.
+        
+    Returns:
+        str: The document ID.
+    """
+    document_id = content_hash or hash_content(text)
     
-    # Add document to vectorstore
-    ids = vectorstore.add_documents([document])
+    # Skip content that is already stored
+    if isinstance(vectorstore.docstore.search(document_id), Document):
+        return document_id
     
-    return ids[0]
+    vectorstore.add_documents([Document(page_content=text, metadata=metadata)], ids=[document_id])
+    return document_id
 
 def search_vectorstore(
     vectorstore: FAISS, 
@@ -27,12 +27,14 @@ def create_directory_structure():
         full_path = base_dir / dir_path
         full_path.mkdir(parents=True, exist_ok=True)
         
-        # Create __init__.py in each Python directory
+        # Create __init__.py in each Python directory, leaving existing ones untouched
         init_file = full_path / "__init__.py"
-        init_file.touch()
+        if not init_file.exists():
+            init_file.touch()
 
-        ## Create main.py in src directory
-        main_file = base_dir / "src" / "main.py"
+    ## Create main.py in src directory
+    main_file = base_dir / "src" / "main.py"
+    if not main_file.exists():
         main_file.touch()
     
     # Create other directories without __init__.py files
@@ -61,7 +63,8 @@ def create_directory_structure():
 
     # Create .gitkeep in workflows directory
     workflows_gitkeep = base_dir / ".github" / "workflows" / ".gitkeep"
-    workflows_gitkeep.touch()
+    if not workflows_gitkeep.exists():
+        workflows_gitkeep.touch()
 
 def main():
     try: